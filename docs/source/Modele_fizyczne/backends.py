@@ -0,0 +1,15 @@
+import importlib.util
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_backend(name):
+    """
+    Loads sqlite/lib.py or postgresql/lib.py as a module (both files are called lib.py,
+    so they cannot be imported side by side by their module name).
+    """
+    spec = importlib.util.spec_from_file_location(f'{name}_lib', os.path.join(BASE_DIR, name, 'lib.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,158 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+from datetime import datetime
+
+from backends import load_backend
+
+
+def summarize(timings_ms):
+    """
+    Computes latency statistics (in milliseconds) from a list of timings.
+    """
+    percentiles = statistics.quantiles(timings_ms, n=100, method='inclusive') if len(timings_ms) > 1 else timings_ms * 99
+    return {
+        'min': min(timings_ms),
+        'mean': statistics.fmean(timings_ms),
+        'p50': percentiles[49],
+        'p95': percentiles[94],
+        'p99': percentiles[98],
+        'max': max(timings_ms),
+    }
+
+
+def prepare_sqlite(lib, scale, seed):
+    """
+    Creates a fresh SQLite database with a generated dataset of the given scale.
+    """
+    db_path = f'benchmark_sqlite_{scale}.db'
+    for path in (db_path, db_path + '-wal', db_path + '-shm'):
+        if os.path.exists(path):
+            os.remove(path)
+    sklep = lib.SklepWedkarskiSQLite(db_path, profile='bulk_load')
+    sklep.create_tables()
+    sklep.create_indexes()
+    sklep.import_chunks(sklep.generate_scaled_data(num_orders=scale, seed=seed))
+    sklep.conn.execute('ANALYZE')
+    sklep.set_profile('read_only_analytics')
+    return sklep
+
+
+def prepare_postgresql(lib, scale, seed, creds):
+    """
+    Loads a generated dataset of the given scale into the PostgreSQL database.
+    """
+    sklep = lib.SklepWedkarskiPostgreSQL(creds)
+    sklep.create_tables()
+    sklep.create_indexes()
+    sklep.import_binary(sklep.generate_scaled_data(num_orders=scale, seed=seed))
+    with sklep.conn.cursor() as cur:
+        for table in lib.TABLE_COLUMNS:
+            cur.execute(f'ANALYZE {table}')
+    sklep.conn.commit()
+    return sklep
+
+
+def run_benchmark(backends=('sqlite', 'postgresql'), scales=(10_000, 100_000), creds=None,
+                  warmup=3, repetitions=20, seed=42):
+    """
+    Loads every backend at every scale factor, runs its query workload and
+    returns a report with latency percentiles and query plans.
+    """
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'warmup': warmup,
+        'repetitions': repetitions,
+        'seed': seed,
+        'results': [],
+    }
+    for backend in backends:
+        lib = load_backend(backend)
+        for scale in scales:
+            print(f"Benchmark: {backend}, {scale} orders...")
+            if backend == 'sqlite':
+                sklep = prepare_sqlite(lib, scale, seed)
+                version = lib.sqlite3.sqlite_version
+            else:
+                sklep = prepare_postgresql(lib, scale, seed, creds)
+                version = sklep.conn.info.server_version
+            workload = sklep.run_query_workload(warmup=warmup, repetitions=repetitions)
+            for name, result in workload.items():
+                timings = result['timings_ms']
+                report['results'].append({
+                    'backend': backend,
+                    'version': version,
+                    'scale': scale,
+                    'query': name,
+                    'rows': result['rows'],
+                    'latency_ms': summarize(timings),
+                    'plan': result['plan'],
+                    'plan_analyze': result.get('plan_analyze'),
+                })
+            sklep.close_connection()
+    return report
+
+
+def compare_reports(baseline, current, threshold=1.2):
+    """
+    Lists queries whose median latency grew by more than the threshold factor
+    between two reports, and queries whose plan changed.
+    """
+    old = {(r['backend'], r['scale'], r['query']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        previous = old.get((result['backend'], result['scale'], result['query']))
+        if previous is None:
+            continue
+        ratio = result['latency_ms']['p50'] / max(previous['latency_ms']['p50'], 1e-9)
+        if ratio > threshold or result['plan'] != previous['plan']:
+            regressions.append({
+                'backend': result['backend'],
+                'scale': result['scale'],
+                'query': result['query'],
+                'p50_before_ms': previous['latency_ms']['p50'],
+                'p50_after_ms': result['latency_ms']['p50'],
+                'ratio': ratio,
+                'plan_changed': result['plan'] != previous['plan'],
+            })
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query benchmark for the SQLite and PostgreSQL shop databases.")
+    parser.add_argument('--backends', nargs='+', default=['sqlite', 'postgresql'], choices=['sqlite', 'postgresql'])
+    parser.add_argument('--scales', nargs='+', type=int, default=[10_000, 100_000], help="Numbers of orders to load.")
+    parser.add_argument('--creds', default='database_creds.json', help="PostgreSQL credentials file.")
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--repetitions', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmark_report.json')
+    parser.add_argument('--compare', help="Earlier report to check for regressions.")
+    args = parser.parse_args()
+
+    creds = None
+    if 'postgresql' in args.backends:
+        with open(args.creds) as db_con_file:
+            creds = json.loads(db_con_file.read())
+
+    report = run_benchmark(args.backends, args.scales, creds, args.warmup, args.repetitions, args.seed)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+    print(f"Report written to {args.output}.")
+
+    for r in report['results']:
+        print(f"{r['backend']:<10} {r['scale']:>9} {r['query']:<24} "
+              f"p50 {r['latency_ms']['p50']:8.2f} ms  p95 {r['latency_ms']['p95']:8.2f} ms")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare_reports(json.load(f), report)
+        for r in regressions:
+            print(f"Regression: {r['backend']} {r['scale']} {r['query']}: "
+                  f"{r['p50_before_ms']:.2f} -> {r['p50_after_ms']:.2f} ms"
+                  f"{' (plan changed)' if r['plan_changed'] else ''}")
+        if regressions:
+            raise SystemExit(1)
@@ -0,0 +1,185 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+
+import psycopg
+from psycopg.conninfo import make_conninfo
+
+from backends import load_backend
+
+# Scale of the DECIMAL(10,2) columns in PostgreSQL
+CENTS = Decimal('0.01')
+
+
+def convert_value(value, pg_type):
+    """
+    Converts a value read from SQLite to the Python type expected by the binary
+    COPY dumper of the target column: REAL -> Decimal rounded to cents,
+    ISO text date -> date. Nulls stay None.
+    """
+    if value is None:
+        return None
+    if pg_type == 'numeric':
+        return Decimal(repr(value)).quantize(CENTS)
+    if pg_type == 'date':
+        return date.fromisoformat(value[:10])
+    if pg_type == 'int4':
+        return int(value)
+    return value
+
+
+def canonical_value(value):
+    """
+    Canonical text of a value used for checksums, independent of how either database
+    stores it: numbers as plain decimals without trailing zeros (SQLite REAL 12.5 and
+    PostgreSQL NUMERIC 12.50 both give '12.5'), dates in ISO format.
+    """
+    if isinstance(value, float):
+        value = Decimal(repr(value))
+    if isinstance(value, Decimal):
+        return format(value.normalize(), 'f')
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def row_digest(row):
+    """
+    Canonical encoding of a row used for checksums. A raw SQLite row and the same row
+    read back from PostgreSQL give the same bytes only when convert_value kept its values,
+    so the checksums verify the conversion as well as the transfer.
+    """
+    return '\x1f'.join('\x00' if v is None else canonical_value(v) for v in row).encode('utf-8') + b'\x1e'
+
+
+def iter_sqlite_batches(conn, table, columns, batch_size):
+    """
+    Reads a SQLite table in id order in batches of at most batch_size raw rows
+    (keyset pagination, so memory use does not depend on the table size).
+    """
+    sql = f"SELECT {', '.join(columns)} FROM {table} WHERE id > ? ORDER BY id LIMIT ?"
+    last_id = 0
+    while True:
+        rows = conn.execute(sql, (last_id, batch_size)).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def copy_table(pg_lib, sqlite_path, conninfo, table, batch_size):
+    """
+    Streams one table from SQLite into PostgreSQL with binary COPY in its own
+    connection and transaction. Returns (number of rows, checksum of the source rows
+    before conversion).
+    """
+    columns, types = pg_lib.TABLE_COLUMNS[table], pg_lib.TABLE_TYPES[table]
+    source = sqlite3.connect(sqlite_path)
+    checksum = hashlib.sha256()
+    rows = 0
+    try:
+        with psycopg.connect(conninfo) as target, target.cursor() as cur:
+            with cur.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN (FORMAT BINARY)") as copy:
+                copy.set_types(list(types))
+                for batch in iter_sqlite_batches(source, table, columns, batch_size):
+                    for row in batch:
+                        copy.write_row(tuple(convert_value(v, t) for v, t in zip(row, types)))
+                        checksum.update(row_digest(row))
+                    rows += len(batch)
+    finally:
+        source.close()
+    return rows, checksum.hexdigest()
+
+
+def target_checksum(pg_lib, conninfo, table, batch_size):
+    """
+    Reads a PostgreSQL table back in id order with a server-side cursor
+    and returns (number of rows, checksum).
+    """
+    checksum = hashlib.sha256()
+    rows = 0
+    with psycopg.connect(conninfo) as conn:
+        with conn.cursor(name=f'checksum_{table}') as cur:
+            cur.itersize = batch_size
+            cur.execute(f"SELECT {', '.join(pg_lib.TABLE_COLUMNS[table])} FROM {table} ORDER BY id")
+            for row in cur:
+                checksum.update(row_digest(row))
+                rows += 1
+    return rows, checksum.hexdigest()
+
+
+def migrate(sqlite_path, creds, batch_size=10_000, workers=2, verify=True):
+    """
+    Migrates the shop database from SQLite to PostgreSQL without intermediate files:
+    every table is read in bounded batches, converted to PostgreSQL types and streamed
+    into binary COPY. Tables of one stage of LOAD_STAGES do not reference each other,
+    so they are copied in parallel; stages run in foreign key order. Afterwards the id
+    sequences are moved past the loaded ids and, with verify, row counts and checksums
+    of both sides are compared.
+    Returns a report {table: {...}}; raises RuntimeError when verification fails.
+    """
+    pg_lib = load_backend('postgresql')
+    conninfo = make_conninfo(dbname=creds['db_name'], user=creds['user_name'], password=creds['password'],
+                             host=creds['host_name'], port=creds['port_number'])
+    start = time.perf_counter()
+    with psycopg.connect(conninfo) as conn:
+        for ddl in pg_lib.TABLE_DDL.values():
+            conn.execute(ddl)
+        conn.execute(f"TRUNCATE TABLE {', '.join(pg_lib.TABLE_COLUMNS)} RESTART IDENTITY CASCADE")
+
+    report = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for stage in pg_lib.LOAD_STAGES:
+            futures = {table: executor.submit(copy_table, pg_lib, sqlite_path, conninfo, table, batch_size)
+                       for table in stage}
+            for table, future in futures.items():
+                rows, checksum = future.result()
+                report[table] = {'rows': rows, 'source_checksum': checksum}
+                print(f"{table}: {rows} rows copied.")
+
+    with psycopg.connect(conninfo) as conn:
+        for table in pg_lib.TABLE_COLUMNS:
+            conn.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                         f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)")
+            conn.execute(f'ANALYZE {table}')
+    print(f"Migration finished in {time.perf_counter() - start:.2f} s.")
+
+    if verify:
+        source = sqlite3.connect(sqlite_path)
+        failed = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = {table: executor.submit(target_checksum, pg_lib, conninfo, table, batch_size)
+                       for table in pg_lib.TABLE_COLUMNS}
+            for table, future in results.items():
+                source_rows = source.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                target_rows, checksum = future.result()
+                entry = report[table]
+                entry.update({'source_rows': source_rows, 'target_rows': target_rows, 'target_checksum': checksum})
+                entry['ok'] = source_rows == target_rows == entry['rows'] and checksum == entry['source_checksum']
+                if not entry['ok']:
+                    failed.append(table)
+        source.close()
+        if failed:
+            raise RuntimeError(f"Verification failed for tables: {', '.join(failed)}")
+        print("Row counts and checksums match.")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streams the shop database from SQLite into PostgreSQL.")
+    parser.add_argument('sqlite_path', nargs='?', default='sklepWedkarski.db')
+    parser.add_argument('--creds', default='database_creds.json', help="PostgreSQL credentials file.")
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, default=2, help="Tables copied in parallel.")
+    parser.add_argument('--no-verify', action='store_true', help="Skip row count and checksum verification.")
+    args = parser.parse_args()
+
+    with open(args.creds) as db_con_file:
+        creds = json.loads(db_con_file.read())
+    report = migrate(args.sqlite_path, creds, args.batch_size, args.workers, not args.no_verify)
+    print(json.dumps(report, indent=4))
@@ -1,110 +1,2007 @@
- import psycopg
+import psycopg
+import psycopg.rows
+from psycopg.conninfo import make_conninfo
+from psycopg.copy import QueuedLibpqWriter
 import pandas as pd
+import asyncio
+import bisect
+import gzip
 import json
+import logging
+import os
+import queue
 import random
-from datetime import datetime, timedelta
+import re
+import sys
+import threading
+import time
+import numpy as np
+try:
+    from psycopg_pool import AsyncConnectionPool, ConnectionPool
+except ImportError: # psycopg_pool is only needed for the pooled and asynchronous modes
+    AsyncConnectionPool = ConnectionPool = None
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError: # pyarrow is only needed for the Parquet export and import
+    pa = pc = pa_csv = pq = None
+try:
+    import zstandard as zstd
+except ImportError: # zstandard is only needed for zstd-compressed CSV exports
+    zstd = None
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from itertools import takewhile
+
+# Dictionaries used by the scalable data generator
+ORDER_STATUSES = ['nowe', 'w_realizacji', 'zrealizowane']
+PAYMENT_METHODS = ['przelew', 'karta', 'gotowka']
+FIRST_NAMES = ['Jan', 'Anna', 'Piotr', 'Maria', 'Krzysztof', 'Ewa', 'Tomasz', 'Katarzyna',
+               'Andrzej', 'Agnieszka', 'Paweł', 'Magdalena', 'Michał', 'Joanna', 'Marcin', 'Barbara']
+LAST_NAMES = ['Kowalski', 'Wiśniewska', 'Nowak', 'Zając', 'Lewandowski', 'Dąbrowska', 'Wójcik',
+              'Kamińska', 'Kowalczyk', 'Zielińska', 'Szymański', 'Woźniak', 'Kozłowski', 'Mazur']
+STREETS = ['Gdańska', 'Krakowska', 'Warszawska', 'Poznańska', 'Wrocławska', 'Łódzka', 'Katowicka',
+           'Lubelska', 'Szczecińska', 'Toruńska', 'Kielecka', 'Opolska']
+# Fixed reference date so that generated datasets are reproducible between runs
+REFERENCE_DATE = date(2025, 1, 1)
+# Table columns in COPY order; tables are listed in foreign key order
+TABLE_COLUMNS = {
+    'kategorie': ('id', 'nazwa', 'opis'),
+    'produkty': ('id', 'nazwa', 'opis', 'cena', 'stan_magazynowy', 'kategoria_id'),
+    'klienci': ('id', 'imie', 'nazwisko', 'email', 'telefon', 'adres'),
+    'zamowienia': ('id', 'klient_id', 'data_zamowienia', 'status'),
+    'platnosci': ('id', 'zamowienie_id', 'kwota', 'metoda_platnosci', 'data_platnosci'),
+}
+# PostgreSQL types of the columns above, declared for binary COPY
+TABLE_TYPES = {
+    'kategorie': ('int4', 'varchar', 'text'),
+    'produkty': ('int4', 'varchar', 'text', 'numeric', 'int4', 'int4'),
+    'klienci': ('int4', 'varchar', 'varchar', 'varchar', 'varchar', 'text'),
+    'zamowienia': ('int4', 'int4', 'date', 'varchar'),
+    'platnosci': ('int4', 'int4', 'numeric', 'varchar', 'date'),
+}
+# Load stages for the parallel import: tables within a stage do not reference each other
+LOAD_STAGES = [('kategorie', 'klienci'), ('produkty', 'zamowienia'), ('platnosci',)]
+# Tables whose CSV files may be split at line boundaries (no quoted multi-line text values)
+SPLITTABLE_TABLES = ('zamowienia', 'platnosci')
+# Size of the blocks streamed to COPY
+COPY_BLOCK_SIZE = 1 << 20
+# Rows encoded into an asynchronous COPY between yields to the event loop
+ASYNC_COPY_YIELD_ROWS = 1_000
+# Foreign keys and indexes dropped for a bulk load, kept until they are rebuilt,
+# so a failed load can be repeated without losing their definitions
+SCHEMA_REBUILD_DDL = '''
+    CREATE TABLE IF NOT EXISTS odbudowa_schematu (
+        seq BIGSERIAL PRIMARY KEY,
+        kind TEXT NOT NULL,
+        name TEXT NOT NULL,
+        statement TEXT NOT NULL
+    )
+'''
+# Ids per file of a snapshot table; files of one table are written and restored in parallel
+SNAPSHOT_PART_ROWS = 1_000_000
+# Table definitions in foreign key order
+TABLE_DDL = {
+    'kategorie': '''
+        CREATE TABLE IF NOT EXISTS kategorie (
+            id SERIAL PRIMARY KEY,
+            nazwa VARCHAR(100) NOT NULL,
+            opis TEXT
+        )
+    ''',
+    'produkty': '''
+        CREATE TABLE IF NOT EXISTS produkty (
+            id SERIAL PRIMARY KEY,
+            nazwa VARCHAR(100) NOT NULL,
+            opis TEXT,
+            cena DECIMAL(10,2) NOT NULL,
+            stan_magazynowy INTEGER NOT NULL,
+            kategoria_id INTEGER,
+            FOREIGN KEY (kategoria_id) REFERENCES kategorie(id)
+        )
+    ''',
+    'klienci': '''
+        CREATE TABLE IF NOT EXISTS klienci (
+            id SERIAL PRIMARY KEY,
+            imie VARCHAR(100) NOT NULL,
+            nazwisko VARCHAR(100) NOT NULL,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            telefon VARCHAR(20),
+            adres TEXT
+        )
+    ''',
+    'zamowienia': '''
+        CREATE TABLE IF NOT EXISTS zamowienia (
+            id SERIAL PRIMARY KEY,
+            klient_id INTEGER,
+            data_zamowienia DATE NOT NULL,
+            status VARCHAR(50) CHECK(status IN ('nowe', 'w_realizacji', 'zrealizowane')),
+            FOREIGN KEY (klient_id) REFERENCES klienci(id)
+        )
+    ''',
+    'platnosci': '''
+        CREATE TABLE IF NOT EXISTS platnosci (
+            id SERIAL PRIMARY KEY,
+            zamowienie_id INTEGER,
+            kwota DECIMAL(10,2) NOT NULL,
+            metoda_platnosci VARCHAR(50) NOT NULL,
+            data_platnosci DATE NOT NULL,
+            FOREIGN KEY (zamowienie_id) REFERENCES zamowienia(id)
+        )
+    ''',
+}
+# Partitioned layout of the order history tables: monthly range partitions by date.
+# The primary key has to include the partition key, so zamowienia.id alone is no longer
+# unique and platnosci cannot reference it with a foreign key in this layout.
+PARTITION_KEYS = {'zamowienia': 'data_zamowienia', 'platnosci': 'data_platnosci'}
+PARTITIONED_TABLE_DDL = {
+    'zamowienia': '''
+        CREATE TABLE IF NOT EXISTS zamowienia (
+            id SERIAL,
+            klient_id INTEGER,
+            data_zamowienia DATE NOT NULL,
+            status VARCHAR(50) CHECK(status IN ('nowe', 'w_realizacji', 'zrealizowane')),
+            PRIMARY KEY (id, data_zamowienia),
+            FOREIGN KEY (klient_id) REFERENCES klienci(id)
+        ) PARTITION BY RANGE (data_zamowienia)
+    ''',
+    'platnosci': '''
+        CREATE TABLE IF NOT EXISTS platnosci (
+            id SERIAL,
+            zamowienie_id INTEGER,
+            kwota DECIMAL(10,2) NOT NULL,
+            metoda_platnosci VARCHAR(50) NOT NULL,
+            data_platnosci DATE NOT NULL,
+            PRIMARY KEY (id, data_platnosci)
+        ) PARTITION BY RANGE (data_platnosci)
+    ''',
+}
+# Date-range reports used to compare the single-table and partitioned layouts: name -> (SQL, parameters)
+PARTITION_BENCHMARK_QUERIES = {
+    'przychody_miesiaca': ("""
+        SELECT metoda_platnosci, COUNT(*), SUM(kwota)
+        FROM platnosci
+        WHERE data_platnosci >= %s AND data_platnosci < %s
+        GROUP BY metoda_platnosci
+    """, ('2024-06-01', '2024-07-01')),
+    'zamowienia_kwartalu': ("""
+        SELECT status, COUNT(*)
+        FROM zamowienia
+        WHERE data_zamowienia >= %s AND data_zamowienia < %s
+        GROUP BY status
+    """, ('2024-07-01', '2024-10-01')),
+    'sprzedaz_dzienna_tygodnia': ("""
+        SELECT data_platnosci, SUM(kwota)
+        FROM platnosci
+        WHERE data_platnosci BETWEEN %s AND %s
+        GROUP BY data_platnosci
+        ORDER BY data_platnosci
+    """, ('2024-11-04', '2024-11-10')),
+}
+# Secondary indexes (recommendations from chapter 4): name -> definition after "CREATE INDEX name"
+INDEXES = {
+    # Foreign keys used in joins
+    'idx_produkty_kategoria_id': 'ON produkty (kategoria_id)',
+    'idx_zamowienia_klient_id': 'ON zamowienia (klient_id) INCLUDE (id)',
+    # Covering index for the per-customer spend query: join and SUM(kwota) as an index-only scan
+    'idx_platnosci_zamowienie_id': 'ON platnosci (zamowienie_id) INCLUDE (kwota)',
+    # Filters from chapter 4
+    'idx_zamowienia_status': 'ON zamowienia (status)',
+    'idx_zamowienia_data': 'ON zamowienia (data_zamowienia)',
+    'idx_produkty_cena': 'ON produkty (cena)',
+    # varchar_pattern_ops lets prefix searches (LIKE 'A%') use the index under any collation
+    'idx_produkty_nazwa': 'ON produkty (nazwa varchar_pattern_ops)',
+    # Partial index covering only open orders (usually a small part of the table)
+    'idx_zamowienia_otwarte': "ON zamowienia (data_zamowienia, klient_id) WHERE status IN ('nowe', 'w_realizacji')",
+}
+# Query workload from the analysis in chapter 4 used by benchmarks: name -> (SQL, parameters)
+BENCHMARK_QUERIES = {
+    'suma_zakupow': ("""
+        SELECT k.imie || ' ' || k.nazwisko AS nazwa_klienta, SUM(p.kwota) AS suma_zakupow
+        FROM klienci k
+        JOIN zamowienia z ON z.klient_id = k.id
+        JOIN platnosci p ON p.zamowienie_id = z.id
+        GROUP BY k.id
+        ORDER BY suma_zakupow DESC
+        LIMIT 100
+    """, ()),
+    'suma_zakupow_klienta': ("""
+        SELECT SUM(p.kwota)
+        FROM zamowienia z
+        JOIN platnosci p ON p.zamowienie_id = z.id
+        WHERE z.klient_id = %s
+    """, (1,)),
+    'produkty_cena': ('SELECT * FROM produkty WHERE cena > %s', (100,)),
+    'produkty_nazwa_prefiks': ('SELECT * FROM produkty WHERE nazwa LIKE %s', ('A%',)),
+    'zamowienia_status': ('SELECT COUNT(*) FROM zamowienia WHERE status = %s', ('zrealizowane',)),
+    'zamowienia_otwarte_od': ("""
+        SELECT * FROM zamowienia
+        WHERE status IN ('nowe', 'w_realizacji') AND data_zamowienia >= %s
+        ORDER BY data_zamowienia
+        LIMIT 1000
+    """, ('2024-12-01',)),
+}
+# Materialized views with report summaries; each needs a unique index for REFRESH ... CONCURRENTLY
+SUMMARY_VIEWS = {
+    'podsumowanie_klientow': ('''
+        SELECT z.klient_id, COUNT(*) AS liczba_platnosci, SUM(p.kwota) AS suma_zakupow
+        FROM platnosci p JOIN zamowienia z ON z.id = p.zamowienie_id
+        WHERE z.klient_id IS NOT NULL
+        GROUP BY z.klient_id
+    ''', ['CREATE UNIQUE INDEX IF NOT EXISTS ux_podsumowanie_klientow ON podsumowanie_klientow (klient_id)',
+          'CREATE INDEX IF NOT EXISTS idx_podsumowanie_klientow_suma ON podsumowanie_klientow (suma_zakupow DESC)']),
+    'podsumowanie_przychodow': ('''
+        SELECT date_trunc('month', data_platnosci)::date AS miesiac, metoda_platnosci,
+               COUNT(*) AS liczba_platnosci, SUM(kwota) AS suma_kwot
+        FROM platnosci
+        GROUP BY 1, 2
+    ''', ['CREATE UNIQUE INDEX IF NOT EXISTS ux_podsumowanie_przychodow '
+          'ON podsumowanie_przychodow (miesiac, metoda_platnosci)']),
+}
+# Report queries over the summary views, shared by the synchronous and asynchronous classes
+REPORT_QUERIES = {
+    'top_customers': '''
+        SELECT s.klient_id, k.imie, k.nazwisko, s.liczba_platnosci, s.suma_zakupow
+        FROM podsumowanie_klientow s JOIN klienci k ON k.id = s.klient_id
+        ORDER BY s.suma_zakupow DESC
+        LIMIT %s
+    ''',
+    'customer_total_spend': 'SELECT suma_zakupow FROM podsumowanie_klientow WHERE klient_id = %s',
+    'revenue_by_month': '''
+        SELECT miesiac, SUM(liczba_platnosci), SUM(suma_kwot)
+        FROM podsumowanie_przychodow
+        WHERE %(method)s::varchar IS NULL OR metoda_platnosci = %(method)s
+        GROUP BY miesiac
+        ORDER BY miesiac
+    ''',
+    'revenue_by_payment_method': '''
+        SELECT metoda_platnosci, SUM(liczba_platnosci), SUM(suma_kwot)
+        FROM podsumowanie_przychodow
+        GROUP BY metoda_platnosci
+        ORDER BY metoda_platnosci
+    ''',
+}
+# Read replicas: seconds a replica is behind the primary, given the primary's current WAL position.
+# A replica that has replayed everything the primary has written is 0 seconds behind (also when the
+# primary is idle); otherwise the lag is the age of the last replayed transaction. A server that is
+# not in recovery (e.g. a promoted replica) is never behind.
+REPLICA_LAG_QUERY = '''
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_replay_lsn() >= %s::pg_lsn THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 'Infinity')
+    END
+'''
+REPLICA_POLICIES = ('round_robin', 'least_connections')
+# Seconds to wait when connecting to a replica, so an unreachable one does not stall the lag checks
+REPLICA_CONNECT_TIMEOUT = 2
+# Longest pause in seconds between reconnect attempts to a server that is down
+REPLICA_MAX_BACKOFF = 30.0
+# Order placement: product rows are locked in id order, so concurrent orders never deadlock on them
+STOCK_LOCK_QUERY = 'SELECT id, cena, stan_magazynowy FROM produkty WHERE id = ANY(%s) ORDER BY id FOR UPDATE'
+STOCK_UPDATE = '''
+    UPDATE produkty p SET stan_magazynowy = p.stan_magazynowy - o.ilosc
+    FROM unnest(%s::int[], %s::int[]) AS o(produkt_id, ilosc)
+    WHERE p.id = o.produkt_id
+'''
+ORDER_INSERT = "INSERT INTO zamowienia (klient_id, data_zamowienia, status) VALUES (%s, CURRENT_DATE, 'nowe') RETURNING id"
+PAYMENT_INSERT = 'INSERT INTO platnosci (zamowienie_id, kwota, metoda_platnosci, data_platnosci) VALUES (%s, %s, %s, CURRENT_DATE)'
+# Product change log read by the catalog cache to invalidate entries. Every entry records the
+# id of the transaction that wrote it: sequence numbers are taken before commit, so a reader
+# could pass a smaller number that commits later, while the transaction ids not visible in the
+# snapshot of the last check are exactly the changes committed since then. An entry without
+# a product (written by TRUNCATE) invalidates the whole cache.
+PRODUCT_CHANGE_LOG = [
+    '''
+    CREATE TABLE IF NOT EXISTS zmiany_produktow (
+        seq BIGSERIAL PRIMARY KEY,
+        produkt_id INTEGER,
+        kategoria_id INTEGER,
+        stara_kategoria_id INTEGER,
+        czas TIMESTAMPTZ NOT NULL DEFAULT now(),
+        xid xid8 NOT NULL DEFAULT pg_current_xact_id()
+    )
+    ''',
+    # Logs created before the transaction ids were recorded
+    '''
+    ALTER TABLE zmiany_produktow
+        ADD COLUMN IF NOT EXISTS xid xid8 NOT NULL DEFAULT pg_current_xact_id(),
+        ALTER COLUMN produkt_id DROP NOT NULL
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_zmiany_produktow_xid ON zmiany_produktow (xid)',
+    '''
+    CREATE OR REPLACE FUNCTION log_zmiany_produktow() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            INSERT INTO zmiany_produktow (produkt_id) VALUES (NULL);
+        ELSIF TG_OP = 'DELETE' THEN
+            INSERT INTO zmiany_produktow (produkt_id, kategoria_id) VALUES (OLD.id, OLD.kategoria_id);
+        ELSIF TG_OP = 'UPDATE' THEN
+            INSERT INTO zmiany_produktow (produkt_id, kategoria_id, stara_kategoria_id)
+            VALUES (NEW.id, NEW.kategoria_id, OLD.kategoria_id);
+        ELSE
+            INSERT INTO zmiany_produktow (produkt_id, kategoria_id) VALUES (NEW.id, NEW.kategoria_id);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    ''',
+    # Covers price and stock changes, but also the other columns kept in the cache
+    '''
+    CREATE OR REPLACE TRIGGER trg_zmiany_produktow
+    AFTER INSERT OR UPDATE OR DELETE ON produkty
+    FOR EACH ROW EXECUTE FUNCTION log_zmiany_produktow()
+    ''',
+    # Bulk imports and restore() empty the tables with TRUNCATE, which fires no row triggers
+    '''
+    CREATE OR REPLACE TRIGGER trg_truncate_produktow
+    AFTER TRUNCATE ON produkty
+    FOR EACH STATEMENT EXECUTE FUNCTION log_zmiany_produktow()
+    ''',
+]
+# Changes committed after the snapshot of the last check, together with the current snapshot
+PRODUCT_CHANGES_QUERY = '''
+    SELECT s.snapshot::text, z.seq, z.produkt_id, z.kategoria_id, z.stara_kategoria_id
+    FROM (SELECT pg_current_snapshot() AS snapshot) s
+    LEFT JOIN zmiany_produktow z
+        ON z.xid >= pg_snapshot_xmin(%(last)s::pg_snapshot)
+        AND NOT pg_visible_in_snapshot(z.xid, %(last)s::pg_snapshot)
+'''
+
+# Product search: Polish letters are folded to ASCII and lower case both in the indexed
+# text (sklep_fold) and in the search phrase (fold_search_text), so "zylka" finds "Żyłka".
+# unaccent() would need an extension and is not IMMUTABLE, so it cannot be used in an index.
+FOLD_FROM = 'ĄĆĘŁŃÓŚŹŻąćęłńóśźż'
+FOLD_TO = 'ACELNOSZZacelnoszz'
+FOLD_TABLE = str.maketrans(FOLD_FROM, FOLD_TO)
+SEARCH_FUNCTIONS = [
+    f'''
+    CREATE OR REPLACE FUNCTION sklep_fold(text) RETURNS text AS $$
+        SELECT lower(translate($1, '{FOLD_FROM}', '{FOLD_TO}'))
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    ''',
+    # The name weighs more (A) than the description (B) in ts_rank; the 'simple'
+    # configuration does not stem, so partial words are matched with prefix queries
+    '''
+    CREATE OR REPLACE FUNCTION produkty_tsvector(nazwa text, opis text) RETURNS tsvector AS $$
+        SELECT setweight(to_tsvector('simple', sklep_fold(nazwa)), 'A')
+            || setweight(to_tsvector('simple', sklep_fold(coalesce(opis, ''))), 'B')
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    ''',
+    # Stored rather than an expression index only: ts_rank would otherwise rebuild the
+    # tsvector of every matching row (about 7x slower for a word found in many products)
+    '''
+    ALTER TABLE produkty ADD COLUMN IF NOT EXISTS wyszukiwanie tsvector
+        GENERATED ALWAYS AS (produkty_tsvector(nazwa, opis)) STORED
+    ''',
+]
+SEARCH_INDEXES = {
+    'idx_produkty_fts': 'ON produkty USING gin (wyszukiwanie)',
+    # The "C" collation lets LIKE 'prefix%' use the index and keeps name order for ORDER BY
+    'idx_produkty_nazwa_fold': 'ON produkty ((sklep_fold(nazwa)) COLLATE "C")',
+}
+# Needs the pg_trgm extension; skipped when it is not available on the server
+TRIGRAM_INDEX = ('idx_produkty_nazwa_trgm', 'ON produkty USING gin (sklep_fold(nazwa) gin_trgm_ops)')
+SEARCH_QUERY = '''
+    SELECT id, nazwa, opis, cena, stan_magazynowy, kategoria_id,
+           ts_rank(wyszukiwanie, to_tsquery('simple', %(tsquery)s)) {similarity} AS ranking
+    FROM produkty
+    WHERE wyszukiwanie @@ to_tsquery('simple', %(tsquery)s) {fuzzy}
+    ORDER BY ranking DESC, id
+    LIMIT %(limit)s
+'''
+# With pg_trgm names similar to the phrase (e.g. with a typo) are found too and rank higher
+TRIGRAM_SEARCH = {
+    'similarity': "+ word_similarity(%(phrase)s, sklep_fold(nazwa))",
+    'fuzzy': "OR %(phrase)s <%% sklep_fold(nazwa)",
+}
+PREFIX_SEARCH_QUERY = '''
+    SELECT id, nazwa, opis, cena, stan_magazynowy, kategoria_id
+    FROM produkty
+    WHERE sklep_fold(nazwa) COLLATE "C" LIKE %s
+    ORDER BY sklep_fold(nazwa) COLLATE "C"
+    LIMIT %s
+'''
+# Columnar dataset: dictionary-encoded columns with their initial dictionaries (a code is a list index)
+ENCODED_COLUMNS = {
+    ('zamowienia', 'status'): ORDER_STATUSES,
+    ('platnosci', 'metoda_platnosci'): PAYMENT_METHODS,
+}
+# Number of rows a columnar dataset decodes at a time for the loaders
+DATASET_BATCH_SIZE = 100_000
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket has no upper bound
+LATENCY_BUCKETS_MS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10_000, 30_000)
+# Statements the slow-query log can EXPLAIN (other statements are logged without a plan)
+EXPLAINABLE_STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'VALUES', 'TABLE')
+
+
+def fold_search_text(text):
+    """
+    Folds a search phrase the same way as sklep_fold (Polish letters to ASCII, lower case).
+    """
+    return text.translate(FOLD_TABLE).lower()
+
+
+class InsufficientStockError(ValueError):
+    """
+    Raised by place_order when an ordered product does not exist or its stock is lower than the ordered quantity.
+    """
+    def __init__(self, produkt_id, ilosc):
+        super().__init__(f"Insufficient stock of product {produkt_id} for quantity {ilosc}.")
+        self.produkt_id = produkt_id
+        self.ilosc = ilosc
+
+
+def _order_quantities(pozycje):
+    """
+    Sums the ordered quantities per product and returns them sorted by product id (the lock order).
+    """
+    quantities = {}
+    for produkt_id, ilosc in pozycje:
+        quantities[produkt_id] = quantities.get(produkt_id, 0) + ilosc
+    return sorted(quantities.items())
+
+
+def _check_stock(quantities, locked_rows):
+    """
+    Checks the locked (id, cena, stan_magazynowy) rows against the ordered quantities
+    and returns the order total.
+    """
+    products = {row[0]: row for row in locked_rows}
+    total = Decimal(0)
+    for produkt_id, ilosc in quantities:
+        if produkt_id not in products or products[produkt_id][2] < ilosc:
+            raise InsufficientStockError(produkt_id, ilosc)
+        total += products[produkt_id][1] * ilosc
+    return total
+
+
+class CatalogCache:
+    """
+    Bounded, thread-safe LRU cache with a time to live (TTL) per entry and hit/miss counters.
+    A value loaded while an invalidation happens is not stored, so an invalidation
+    is never overwritten with older data.
+    """
+    def __init__(self, max_entries=10_000, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, load):
+        """
+        Returns the cached value, or calls load() and caches its result when the entry is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+        value = load()
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, *keys):
+        """
+        Removes the given entries.
+        """
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns the cache counters.
+        """
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'invalidations': self.invalidations}
+
+
+class ReplicaRouter:
+    """
+    Chooses the read replica for each read-only unit of work. A background thread measures
+    the replication lag of every replica once every check_interval seconds over separate
+    autocommit monitoring connections, so readers never wait for a check and always use the
+    last measured lags. Replicas that are unreachable, failed a query or are more than
+    max_lag seconds behind the primary are skipped until a later check finds them usable;
+    reconnecting to a server that is down is retried with an exponential backoff (up to
+    REPLICA_MAX_BACKOFF seconds). Among the usable replicas the policy picks either the next
+    one in turn ('round_robin') or the one with the fewest connections in use
+    ('least_connections'). choose() returns None when no replica qualifies (also before the
+    first check completes), and the caller then reads from the primary.
+    """
+    def __init__(self, primary_conninfo, conninfos, policy='round_robin', max_lag=5.0, check_interval=1.0):
+        if policy not in REPLICA_POLICIES:
+            raise ValueError(f"Unknown replica policy {policy!r}, expected one of {REPLICA_POLICIES}.")
+        self.primary_conninfo = primary_conninfo
+        self.conninfos = list(conninfos)
+        self.policy = policy
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        # Lag in seconds at the last check, None when the replica is unavailable
+        self.lags = [None] * len(self.conninfos)
+        self.in_use = [0] * len(self.conninfos)
+        self.reads = [0] * len(self.conninfos)
+        self.fallbacks = 0
+        self.checks = 0
+        # Monitoring connections and reconnect backoff, used only by the checking thread
+        self._monitors = {}
+        self._failures = {}
+        self._retry_at = {}
+        self._next = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._checker = threading.Thread(target=self._run, name='replica-lag-check', daemon=True)
+        self._checker.start()
+
+    def _run(self):
+        """
+        Checks the lags every check_interval seconds until close().
+        """
+        while True:
+            self._check()
+            if self._stop.wait(self.check_interval):
+                return
+
+    def _monitor(self, conninfo):
+        """
+        Returns the monitoring connection to a server, opening it if needed,
+        or None while the server is in its reconnect backoff.
+        """
+        conn = self._monitors.get(conninfo)
+        if conn is not None and not conn.closed:
+            return conn
+        if time.monotonic() < self._retry_at.get(conninfo, 0.0):
+            return None
+        try:
+            conn = psycopg.connect(conninfo, autocommit=True, connect_timeout=REPLICA_CONNECT_TIMEOUT)
+        except psycopg.Error:
+            self._failures[conninfo] = self._failures.get(conninfo, 0) + 1
+            self._retry_at[conninfo] = time.monotonic() + min(
+                REPLICA_MAX_BACKOFF, self.check_interval * 2 ** self._failures[conninfo])
+            raise
+        self._failures.pop(conninfo, None)
+        self._monitors[conninfo] = conn
+        return conn
+
+    def _check(self):
+        """
+        Measures the lag of every replica against the current WAL position of the primary
+        and publishes the new lags. If the primary cannot be reached, replicas report
+        their lag on their own.
+        """
+        primary_lsn = None
+        try:
+            monitor = self._monitor(self.primary_conninfo)
+            if monitor is not None:
+                primary_lsn = monitor.execute('SELECT pg_current_wal_lsn()').fetchone()[0]
+        except psycopg.Error:
+            self._close_monitor(self.primary_conninfo)
+        lags = []
+        for conninfo in self.conninfos:
+            try:
+                monitor = self._monitor(conninfo)
+                lags.append(None if monitor is None
+                            else float(monitor.execute(REPLICA_LAG_QUERY, (primary_lsn,)).fetchone()[0]))
+            except psycopg.Error:
+                self._close_monitor(conninfo)
+                lags.append(None)
+        with self._lock:
+            self.lags = lags
+            self.checks += 1
+
+    def _close_monitor(self, conninfo):
+        conn = self._monitors.pop(conninfo, None)
+        if conn is not None:
+            conn.close()
+
+    def choose(self):
+        """
+        Returns the index of the replica for the next read and counts it as in use
+        (release() ends the use), or None when the read should go to the primary.
+        """
+        with self._lock:
+            candidates = [i for i, lag in enumerate(self.lags) if lag is not None and lag <= self.max_lag]
+            if not candidates:
+                self.fallbacks += 1
+                return None
+            if self.policy == 'least_connections':
+                replica = min(candidates, key=lambda i: (self.in_use[i], self.reads[i]))
+            else:
+                replica = candidates[self._next % len(candidates)]
+                self._next += 1
+            self.in_use[replica] += 1
+            self.reads[replica] += 1
+            return replica
+
+    def release(self, replica, failed=False):
+        """
+        Ends a use of a replica; a failed one is skipped until the next lag check.
+        """
+        with self._lock:
+            self.in_use[replica] -= 1
+            if failed:
+                self.lags[replica] = None
+
+    def wait_for_check(self, timeout=None):
+        """
+        Waits until the next lag check completes. Returns False on timeout.
+        """
+        with self._lock:
+            target = self.checks + 1
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.checks < target:
+            if self._stop.is_set() or (deadline is not None and time.monotonic() >= deadline):
+                return False
+            time.sleep(0.01)
+        return True
+
+    def status(self):
+        """
+        Returns the state of every replica and the number of reads sent to the primary
+        because no replica qualified.
+        """
+        with self._lock:
+            return {'replicas': [{'lag_s': lag, 'available': lag is not None and lag <= self.max_lag,
+                                  'in_use': in_use, 'reads': reads}
+                                 for lag, in_use, reads in zip(self.lags, self.in_use, self.reads)],
+                    'primary_fallbacks': self.fallbacks}
+
+    def close(self):
+        """
+        Stops the checking thread and closes the monitoring connections.
+        """
+        self._stop.set()
+        self._checker.join()
+        for conninfo in list(self._monitors):
+            self._close_monitor(conninfo)
+
+
+# String and numeric literals replaced by '?' in the statement metrics keys
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|(?<![\w$])\d+(?:\.\d+)?")
+
+
+@lru_cache(maxsize=1024)
+def _normalize_sql(sql):
+    """
+    Collapses whitespace in a statement text.
+    """
+    return ' '.join(sql.split())
+
+
+@lru_cache(maxsize=1024)
+def _statement_key(sql):
+    """
+    Returns the statement metrics key: the text with collapsed whitespace and literals replaced
+    by '?', so statements differing only in values (e.g. SET TRANSACTION SNAPSHOT) share a histogram.
+    """
+    return SQL_LITERALS.sub('?', _normalize_sql(sql))
+
+
+class LatencyHistogram:
+    """
+    Latency histogram with the fixed buckets of LATENCY_BUCKETS_MS, so its size does not
+    grow with the number of samples. Percentiles are reported as the upper bound of the
+    bucket they fall into (at most the largest sample). Not thread-safe on its own.
+    """
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+
+    def record(self, ms):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if self.min_ms is None or ms < self.min_ms:
+            self.min_ms = ms
+        if self.max_ms is None or ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, p):
+        if not self.count:
+            return None
+        rank = p / 100 * self.count
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total_ms / self.count if self.count else None,
+            'min_ms': self.min_ms,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': self.max_ms,
+        }
+
+
+class MetricsSink:
+    """
+    Instrumentation sink aggregating events in process: latency histograms per statement,
+    per operation and per connection wait source, row and byte totals of operations,
+    and the last max_slow_queries slow queries. Thread-safe.
+    :param max_statements: Maximum number of distinct statements with their own histogram;
+                           further ones share the OTHER_STATEMENTS histogram.
+    """
+    OTHER_STATEMENTS = '<other>'
+
+    def __init__(self, max_slow_queries=100, max_statements=1000):
+        self._lock = threading.Lock()
+        self.max_statements = max_statements
+        self.statements = {}
+        self.operations = {}
+        self.connection_waits = {}
+        self.slow_queries = deque(maxlen=max_slow_queries)
+
+    def emit(self, event):
+        with self._lock:
+            if event['type'] == 'statement':
+                key = event['sql']
+                if key not in self.statements and len(self.statements) >= self.max_statements:
+                    key = self.OTHER_STATEMENTS
+                histogram = self.statements.get(key)
+                if histogram is None:
+                    histogram = self.statements[key] = LatencyHistogram()
+                histogram.record(event['ms'])
+            elif event['type'] == 'operation':
+                entry = self.operations.get(event['name'])
+                if entry is None:
+                    entry = self.operations[event['name']] = {
+                        'latency': LatencyHistogram(), 'rows': 0, 'bytes': 0, 'seconds': 0.0, 'errors': 0}
+                entry['latency'].record(event['ms'])
+                entry['rows'] += event['rows']
+                entry['bytes'] += event['bytes']
+                entry['seconds'] += event['ms'] / 1000
+                entry['errors'] += event['error'] is not None
+            elif event['type'] == 'connection_wait':
+                histogram = self.connection_waits.get(event['source'])
+                if histogram is None:
+                    histogram = self.connection_waits[event['source']] = LatencyHistogram()
+                histogram.record(event['ms'])
+            elif event['type'] == 'slow_query':
+                self.slow_queries.append(event)
+
+    def snapshot(self):
+        """
+        Returns the aggregated metrics as a dictionary; rates are computed over the total operation time.
+        """
+        with self._lock:
+            operations = {}
+            for name, entry in self.operations.items():
+                seconds = entry['seconds']
+                operations[name] = {
+                    **entry['latency'].snapshot(),
+                    'rows': entry['rows'],
+                    'bytes': entry['bytes'],
+                    'rows_per_s': entry['rows'] / seconds if entry['rows'] and seconds else None,
+                    'bytes_per_s': entry['bytes'] / seconds if entry['bytes'] and seconds else None,
+                    'errors': entry['errors'],
+                }
+            return {
+                'statements': {sql: h.snapshot() for sql, h in self.statements.items()},
+                'operations': operations,
+                'connection_waits': {source: h.snapshot() for source, h in self.connection_waits.items()},
+                'slow_queries': list(self.slow_queries),
+            }
+
+
+class LoggingSink:
+    """
+    Instrumentation sink writing events to a logger as JSON: slow queries as warnings,
+    operations as info and the remaining events as debug messages.
+    """
+    LEVELS = {'slow_query': logging.WARNING, 'operation': logging.INFO}
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger('sklep_wedkarski.postgresql')
+
+    def emit(self, event):
+        level = self.LEVELS.get(event['type'], logging.DEBUG)
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, '%s', json.dumps(event, default=str))
+
+
+class JsonFileSink:
+    """
+    Instrumentation sink appending events to a file as JSON lines.
+    :param types: Event types to write (e.g. {'operation', 'slow_query'}), None for all.
+    """
+    def __init__(self, path, types=None):
+        self.types = types
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def emit(self, event):
+        if self.types is None or event['type'] in self.types:
+            line = json.dumps(event, default=str) + '\n'
+            with self._lock:
+                self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Instrumentation:
+    """
+    Instrumentation of a shop instance (see SklepWedkarskiPostgreSQL.enable_instrumentation).
+    Turns statement timings, operations and connection waits into events (dictionaries with
+    a 'type' key) passed to every sink, i.e. any object with an emit(event) method.
+    Statements taking at least slow_query_ms are also reported as 'slow_query' events,
+    with their EXPLAIN plan (estimated, the statement is not executed again) when explain is set.
+    """
+    def __init__(self, sinks=None, slow_query_ms=100.0, explain=True):
+        self.sinks = list(sinks) if sinks is not None else [MetricsSink()]
+        self.slow_query_ms = slow_query_ms
+        self.explain = explain
+
+    def emit(self, event):
+        event['time'] = time.time()
+        for sink in self.sinks:
+            sink.emit(event)
+
+    def record_statement(self, cur, query, params, seconds, explain=True):
+        """
+        Records one executed statement; cur is the cursor that executed it.
+        """
+        if not isinstance(query, str):
+            query = query.as_string(cur)
+        ms = seconds * 1000
+        self.emit({'type': 'statement', 'sql': _statement_key(query), 'ms': ms, 'rows': cur.rowcount})
+        if self.slow_query_ms is not None and ms >= self.slow_query_ms:
+            plan = self._explain(cur.connection, query, params) if self.explain and explain else None
+            self.emit({'type': 'slow_query', 'sql': _normalize_sql(query),
+                       'params': None if params is None else repr(params)[:500], 'ms': ms, 'rows': cur.rowcount, 'plan': plan})
+
+    def _explain(self, conn, query, params):
+        """
+        Returns the EXPLAIN plan of a statement as a list of lines, or None if it cannot be explained.
+        EXPLAIN runs in a savepoint on a plain cursor, so a failure does not abort the caller's transaction.
+        """
+        words = query.split(None, 1)
+        if not words or words[0].upper() not in EXPLAINABLE_STATEMENTS:
+            return None
+        if conn.info.transaction_status == psycopg.pq.TransactionStatus.INERROR:
+            return None
+        try:
+            with conn.transaction(), psycopg.Cursor(conn) as cur:
+                cur.execute(f'EXPLAIN {query}', params)
+                return [row[0] for row in cur.fetchall()]
+        except psycopg.Error:
+            return None
+
+    def record_wait(self, source, seconds):
+        """
+        Records the time spent waiting for a connection ('connect' or 'pool').
+        """
+        self.emit({'type': 'connection_wait', 'source': source, 'ms': seconds * 1000})
+
+    @contextmanager
+    def operation(self, name):
+        """
+        Times one operation (e.g. an import). Yields a dictionary in which the operation
+        sets its 'rows' and 'bytes' for the throughput figures of the 'operation' event.
+        """
+        stats = {'rows': 0, 'bytes': 0}
+        error = None
+        start = time.perf_counter()
+        try:
+            yield stats
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self.emit({
+                'type': 'operation',
+                'name': name,
+                'ms': seconds * 1000,
+                'rows': stats['rows'],
+                'bytes': stats['bytes'],
+                'rows_per_s': stats['rows'] / seconds if stats['rows'] and seconds else None,
+                'bytes_per_s': stats['bytes'] / seconds if stats['bytes'] and seconds else None,
+                'error': error,
+            })
+
+    def snapshot(self):
+        """
+        Returns the metrics of the first MetricsSink, or None if there is none.
+        """
+        for sink in self.sinks:
+            if isinstance(sink, MetricsSink):
+                return sink.snapshot()
+        return None
+
+    def close(self):
+        for sink in self.sinks:
+            if hasattr(sink, 'close'):
+                sink.close()
+
+
+class InstrumentedCursor(psycopg.Cursor):
+    """
+    Cursor reporting every execute, executemany and COPY to the Instrumentation
+    stored in its connection (set by SklepWedkarskiPostgreSQL._instrument).
+    """
+    def execute(self, query, params=None, **kwargs):
+        start = time.perf_counter()
+        result = super().execute(query, params, **kwargs)
+        self.connection.instrumentation.record_statement(self, query, params, time.perf_counter() - start)
+        return result
+
+    def executemany(self, query, params_seq, **kwargs):
+        start = time.perf_counter()
+        super().executemany(query, params_seq, **kwargs)
+        self.connection.instrumentation.record_statement(self, query, None, time.perf_counter() - start, explain=False)
+
+    @contextmanager
+    def copy(self, statement, params=None, **kwargs):
+        start = time.perf_counter()
+        with super().copy(statement, params, **kwargs) as copy:
+            yield copy
+        self.connection.instrumentation.record_statement(self, statement, params, time.perf_counter() - start,
+                                                         explain=False)
+
+
+class SplitCsvWriter:
+    """
+    Writes a stream of CSV lines of one table to files of at most max_file_size
+    uncompressed bytes, optionally gzip or zstd compressed. Every file starts with
+    the header, so each one can be loaded on its own. Incoming data may end in the
+    middle of a line; files are only cut at line ends (values of the shop tables
+    contain no line breaks).
+    """
+    EXTENSIONS = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+    def __init__(self, directory, table, columns, compression=None, max_file_size=None):
+        if compression not in self.EXTENSIONS:
+            raise ValueError(f"Unknown compression: {compression}")
+        if compression == 'zstd' and zstd is None:
+            raise RuntimeError("zstd compression requires the 'zstandard' package.")
+        self.directory = directory
+        self.table = table
+        self.header = (','.join(columns) + '\n').encode()
+        self.compression = compression
+        self.max_file_size = max_file_size
+        self.files = []
+        self._file = None
+        self._pending = b''
+
+    def _open(self):
+        suffix = '' if self.max_file_size is None else f'.{len(self.files):04d}'
+        name = f'{self.table}{suffix}.csv{self.EXTENSIONS[self.compression]}'
+        path = os.path.join(self.directory, name)
+        if self.compression == 'gzip':
+            self._file = gzip.open(path, 'wb', compresslevel=6)
+        elif self.compression == 'zstd':
+            self._file = zstd.open(path, 'wb')
+        else:
+            self._file = open(path, 'wb')
+        self._file.write(self.header)
+        self.files.append({'file': name, 'rows': 0, 'bytes': len(self.header)})
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self.files[-1]['compressed_bytes'] = os.path.getsize(os.path.join(self.directory, self.files[-1]['file']))
+
+    def write(self, data):
+        """
+        Writes a block of CSV data; an unfinished last line is kept for the next call.
+        """
+        data = self._pending + bytes(data)
+        end = data.rfind(b'\n') + 1
+        self._pending = data[end:]
+        view = memoryview(data)[:end]
+        while view:
+            if self._file is None:
+                self._open()
+            current = self.files[-1]
+            take = len(view)
+            if self.max_file_size is not None and current['bytes'] + take > self.max_file_size:
+                take = bytes(view[:max(self.max_file_size - current['bytes'], 0)]).rfind(b'\n') + 1
+                if take == 0 and current['rows'] == 0:
+                    # A single line longer than the limit still gets a file of its own
+                    take = bytes(view).find(b'\n') + 1
+            if take:
+                block = view[:take]
+                self._file.write(block)
+                current['rows'] += bytes(block).count(b'\n')
+                current['bytes'] += take
+                view = view[take:]
+            if view:
+                self._close_file()
+
+    def close(self):
+        """
+        Writes the remaining data and closes the last file (an empty table gets one header-only file).
+        """
+        if self._pending:
+            self.write(b'\n')
+        if not self.files:
+            self._open()
+        self._close_file()
+        return self.files
+
+
+class NumericColumn:
+    """
+    Column of int4 or numeric values in a growable array.array buffer (4-byte ints,
+    8-byte floats). Nulls are kept as a sentinel value: the smallest int4 or NaN.
+    """
+    def __init__(self, typecode):
+        self.buffer = array(typecode)
+        self.dtype = np.dtype(np.int32 if typecode == 'i' else np.float64)
+        self.null = np.iinfo(np.int32).min if typecode == 'i' else np.nan
+
+    def __len__(self):
+        return len(self.buffer)
+
+    @property
+    def nbytes(self):
+        return len(self.buffer) * self.buffer.itemsize
+
+    def encode(self, values):
+        """
+        Converts a chunk of values (array, Series or list, with None/NaN as nulls) to the buffer type.
+        """
+        return pd.to_numeric(pd.Series(values, copy=False)).to_numpy(dtype=self.dtype, na_value=self.null)
+
+    def extend(self, encoded):
+        self.buffer.frombytes(encoded.tobytes())
+
+    def decode(self, start, stop):
+        """
+        Returns rows start:stop as a NumPy array, or as objects with None when they contain nulls.
+        """
+        values = np.frombuffer(self.buffer, dtype=self.dtype)[start:stop].copy()
+        nulls = np.isnan(values) if self.dtype.kind == 'f' else values == self.null
+        if nulls.any():
+            values = values.astype(object)
+            values[nulls] = None
+        return values
+
+
+class DateColumn(NumericColumn):
+    """
+    Column of dates kept as 4-byte day numbers since 1970-01-01. Accepts ISO strings,
+    date objects and datetime64 values; decodes to ISO strings like generate_scaled_data.
+    """
+    def __init__(self):
+        super().__init__('i')
+
+    def encode(self, values):
+        days = np.asarray(values, dtype='datetime64[D]')
+        nulls = np.isnat(days)
+        days = days.astype(np.int64)
+        days[nulls] = self.null
+        return days.astype(np.int32)
+
+    def decode(self, start, stop):
+        days = np.frombuffer(self.buffer, dtype=np.int32)[start:stop]
+        nulls = days == self.null
+        values = np.datetime_as_string(days.astype('datetime64[D]'), unit='D').astype(object)
+        values[nulls] = None
+        return values
+
+
+class DictionaryColumn:
+    """
+    Dictionary-encoded text column: one-byte codes indexing a list of distinct values
+    (-1 is null). Values missing from the dictionary are added on first use.
+    """
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.index = {value: code for code, value in enumerate(self.values)}
+        self.codes = array('b')
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return len(self.codes)
+
+    def _code(self, value):
+        code = self.index.get(value)
+        if code is None:
+            if len(self.values) == 127:
+                raise ValueError("Dictionary-encoded column has more than 127 distinct values.")
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def encode(self, values):
+        """
+        Maps a chunk of values to codes; a pandas Categorical (e.g. from the generator)
+        is translated through its categories without looking at every value.
+        """
+        categorical = values if isinstance(values, pd.Categorical) else pd.Categorical(values)
+        # The extra -1 at the end is picked by the -1 (null) codes of the Categorical
+        mapping = np.array([self._code(value) for value in categorical.categories] + [-1], dtype=np.int8)
+        return mapping[categorical.codes]
+
+    def extend(self, encoded):
+        self.codes.frombytes(encoded.tobytes())
+
+    def decode(self, start, stop):
+        return np.array(self.values + [None], dtype=object)[np.frombuffer(self.codes, dtype=np.int8)[start:stop]]
+
+
+class TextColumn:
+    """
+    Text column kept as one UTF-8 buffer with the end offset of every value
+    (an 8-byte offset instead of a Python string object per row). The null mask
+    is only allocated when the first null arrives.
+    """
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('q', [0])
+        self.nulls = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        return len(self.data) + len(self.offsets) * self.offsets.itemsize + len(self.nulls or b'')
+
+    def encode(self, values):
+        series = pd.Series(values, dtype=object, copy=False)
+        nulls = series.isna().to_numpy()
+        encoded = [str(value).encode('utf-8') for value in series.where(~nulls, '')]
+        ends = np.cumsum([len(value) for value in encoded], dtype=np.int64)
+        return b''.join(encoded), ends, nulls
+
+    def extend(self, encoded):
+        data, ends, nulls = encoded
+        if nulls.any() and self.nulls is None:
+            self.nulls = bytearray(len(self))
+        if self.nulls is not None:
+            self.nulls += nulls.astype(np.uint8).tobytes()
+        self.offsets.frombytes((ends + len(self.data)).tobytes())
+        self.data += data
+
+    def decode(self, start, stop):
+        offsets = self.offsets
+        with memoryview(self.data) as data:
+            values = np.array([str(data[offsets[i]:offsets[i + 1]], 'utf-8') for i in range(start, stop)]
+                              + [None], dtype=object)[:-1]
+        if self.nulls is not None:
+            values[np.frombuffer(self.nulls, dtype=np.uint8)[start:stop].astype(bool)] = None
+        return values
+
+
+def _dataset_column(table, column, pg_type):
+    """
+    Creates the column buffer for a column of a given PostgreSQL type.
+    """
+    if (table, column) in ENCODED_COLUMNS:
+        return DictionaryColumn(ENCODED_COLUMNS[table, column])
+    if pg_type == 'int4':
+        return NumericColumn('i')
+    if pg_type == 'numeric':
+        return NumericColumn('d')
+    if pg_type == 'date':
+        return DateColumn()
+    return TextColumn()
+
+
+class ColumnarDataset:
+    """
+    In-memory dataset of the shop tables stored column by column in compact buffers
+    instead of rows of Python objects: int4 and numeric columns as 4- and 8-byte
+    numbers, dates as day numbers, status and metoda_platnosci dictionary-encoded
+    in one byte, other text as UTF-8 with offsets (see the column classes above).
+    Iterating over a dataset yields (table_name, DataFrame) chunks of batch_size rows
+    in foreign key order, decoded one at a time - the same chunks as generate_scaled_data,
+    so a dataset can be passed to import_binary, sync_chunks or export_chunks_to_csv.
+    """
+    def __init__(self, batch_size=DATASET_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.tables = {table: {column: _dataset_column(table, column, pg_type)
+                               for column, pg_type in zip(TABLE_COLUMNS[table], TABLE_TYPES[table])}
+                       for table in TABLE_COLUMNS}
+
+    @classmethod
+    def from_chunks(cls, chunks, batch_size=DATASET_BATCH_SIZE):
+        """
+        Builds a dataset from (table_name, data) chunks, e.g. from generate_scaled_data.
+        """
+        dataset = cls(batch_size)
+        for table, data in chunks:
+            dataset.append(table, data)
+        return dataset
+
+    def append(self, table, data):
+        """
+        Appends rows to a table: a DataFrame or dict of columns, or a list of dicts.
+        All columns are converted before any is extended, so a chunk that fails
+        to convert leaves the table unchanged.
+        """
+        if not isinstance(data, (pd.DataFrame, dict)):
+            data = pd.DataFrame(list(data), columns=TABLE_COLUMNS[table])
+        columns = self.tables[table]
+        encoded = [column.encode(data[name]) for name, column in columns.items()]
+        for column, values in zip(columns.values(), encoded):
+            column.extend(values)
+
+    def num_rows(self, table):
+        return len(self.tables[table]['id'])
+
+    def __len__(self):
+        return sum(self.num_rows(table) for table in self.tables)
+
+    def batches(self, table, batch_size=None):
+        """
+        Yields the rows of a table as DataFrames of at most batch_size rows.
+        """
+        batch_size = batch_size or self.batch_size
+        columns = self.tables[table]
+        for start in range(0, self.num_rows(table), batch_size):
+            stop = min(start + batch_size, self.num_rows(table))
+            yield pd.DataFrame({name: column.decode(start, stop) for name, column in columns.items()})
+
+    def __iter__(self):
+        for table in self.tables:
+            for df in self.batches(table):
+                yield table, df
+
+    def memory_usage(self):
+        """
+        Returns the size of the column buffers in bytes per table.
+        """
+        return {table: sum(column.nbytes for column in columns.values()) for table, columns in self.tables.items()}
+
 
 class SklepWedkarskiPostgreSQL:
-    def __init__(self, creds):
+    def __init__(self, creds, replicas=None, replica_policy='round_robin', max_replica_lag=5.0):
         """
         Initializes the SklepWedkarskiPostgreSQL class.
-        :param creds: Dictionary containing PostgreSQL database credentials.
+        :param creds: Dictionary containing PostgreSQL database credentials (of the primary server).
                       Expected keys: 'db_name', 'user_name', 'password', 'host_name', 'port_number'.
+        :param replicas: Optional list of read replicas (connection strings or dictionaries
+                         like creds) receiving the read-only work, see enable_replicas.
+        :param replica_policy: 'round_robin' or 'least_connections'.
+        :param max_replica_lag: Seconds a replica may be behind the primary and still be read from.
         """
         self.creds = creds
         self.conn = None
+        self.pool = None
+        self._pool_options = None
+        # ReplicaRouter and the replica connections (or pools) when replicas are configured
+        self.replicas = None
+        self._replica_conns = []
+        self._replica_pools = []
+        self.catalog_cache = None
+        self._cache_poll_lock = threading.Lock()
+        self.instrumentation = None
+        # Whether the pg_trgm index exists; checked on the first search
+        self._trigram_search = None
         self.setup_connection()
+        if replicas:
+            self.enable_replicas(replicas, replica_policy, max_replica_lag)
 
     def setup_connection(self):
         """
         Establishes a connection to the PostgreSQL database.
         """
         try:
-            self.conn = psycopg.connect(
-                dbname=self.creds['db_name'],
-                user=self.creds['user_name'],
-                password=self.creds['password'],
-                host=self.creds['host_name'],
-                port=self.creds['port_number']
-            )
+            self.conn = self._connect()
             print("Connected to PostgreSQL database.")
         except psycopg.Error as e:
             print(f"Error connecting to PostgreSQL: {e}")
             self.conn = None
 
-    def create_tables(self):
+    def _conninfo(self):
+        """
+        Builds a connection string from the stored credentials.
+        """
+        return make_conninfo(
+            dbname=self.creds['db_name'],
+            user=self.creds['user_name'],
+            password=self.creds['password'],
+            host=self.creds['host_name'],
+            port=self.creds['port_number']
+        )
+
+    def _connect(self, conninfo=None):
+        """
+        Opens a new connection using the stored credentials (or to another server of the same database).
+        """
+        start = time.perf_counter()
+        conn = psycopg.connect(conninfo or self._conninfo())
+        if self.instrumentation is not None:
+            self.instrumentation.record_wait('connect', time.perf_counter() - start)
+            self._instrument(conn)
+        return conn
+
+    def _instrument(self, conn):
+        """
+        Makes a connection report its statements to self.instrumentation.
+        """
+        conn.instrumentation = self.instrumentation
+        conn.cursor_factory = InstrumentedCursor
+
+    def enable_instrumentation(self, sinks=None, slow_query_ms=100.0, explain=True):
+        """
+        Enables instrumentation: every statement executed through the connections of this
+        instance (including pooled and worker connections) is timed, imports, exports,
+        delta imports and order placement are reported as operations with their row and
+        byte rates, and the time spent opening or waiting for connections is recorded.
+        Statements slower than slow_query_ms go to the slow-query log with their EXPLAIN plan.
+        Server-side (named) cursors are not instrumented.
+        :param sinks: Objects receiving the events (MetricsSink, LoggingSink, JsonFileSink
+                      or any object with an emit(event) method); a MetricsSink by default.
+        :param slow_query_ms: Slow-query threshold in milliseconds, None to disable the log.
+        :param explain: Attach the EXPLAIN plan to slow queries.
+        :return: The Instrumentation object; its snapshot() returns the aggregated metrics.
+        """
+        self.instrumentation = Instrumentation(sinks, slow_query_ms, explain)
+        if self.conn and not self.conn.closed:
+            self._instrument(self.conn)
+        return self.instrumentation
+
+    def _operation(self, name):
+        """
+        Context manager timing an operation when instrumentation is enabled;
+        yields the dictionary for its 'rows' and 'bytes' either way.
+        """
+        if self.instrumentation is None:
+            return nullcontext({'rows': 0, 'bytes': 0})
+        return self.instrumentation.operation(name)
+
+    def enable_pool(self, min_size=2, max_size=10, max_lifetime=3600.0, max_idle=600.0, timeout=30.0):
+        """
+        Enables the pooled mode: connection() hands out connections from a bounded,
+        thread-safe psycopg_pool.ConnectionPool instead of the single self.conn.
+        Connections are health-checked when taken from the pool and recycled
+        after max_lifetime seconds.
+        :param min_size: Number of connections kept open.
+        :param max_size: Maximum number of connections.
+        :param max_lifetime: Seconds after which a connection is closed and replaced.
+        :param max_idle: Seconds after which an idle connection above min_size is closed.
+        :param timeout: Seconds to wait for a free connection before raising PoolTimeout.
+        """
+        if ConnectionPool is None:
+            raise RuntimeError("The pooled mode requires the 'psycopg_pool' package.")
+        if self.pool is None:
+            self._pool_options = {'min_size': min_size, 'max_size': max_size, 'max_lifetime': max_lifetime,
+                                  'max_idle': max_idle, 'timeout': timeout}
+            self.pool = self._open_pool(self._conninfo())
+            self.pool.wait()
+            if self.replicas is not None:
+                self._replica_pools = [self._open_pool(conninfo) for conninfo in self.replicas.conninfos]
+            print(f"Connection pool ready ({min_size}-{max_size} connections).")
+
+    def _open_pool(self, conninfo):
+        """
+        Opens a connection pool to a server with the options given to enable_pool.
+        """
+        return ConnectionPool(conninfo, check=ConnectionPool.check_connection, open=True, **self._pool_options)
+
+    def enable_replicas(self, replicas, policy='round_robin', max_lag=5.0, check_interval=1.0):
+        """
+        Sends read-only work - reports, product search, catalog reads without the catalog
+        cache, dump_table and print_all_tables - to streaming replicas of the database, while
+        writes and everything else stay on the primary. Each read goes to a replica chosen by
+        the policy among those at most max_lag seconds behind the primary (checked in the
+        background every check_interval seconds, see ReplicaRouter), or to the primary when
+        there is none. Waits for the first check so that reads use the replicas right away.
+        A replica whose connection fails is skipped until the next check; the failing read
+        raises its error. Reads may therefore miss up to max_lag seconds of the latest
+        writes; use connection() directly for reads that must see them.
+        Replicas use a single connection each, or a pool like the primary in the pooled mode.
+        :param replicas: Connection strings or dictionaries like creds, one per replica.
+        :param policy: 'round_robin' or 'least_connections'.
+        """
+        conninfos = [make_conninfo(dbname=r['db_name'], user=r['user_name'], password=r['password'],
+                                   host=r['host_name'], port=r['port_number'])
+                     if isinstance(r, dict) else r for r in replicas]
+        self.replicas = ReplicaRouter(self._conninfo(), conninfos, policy, max_lag, check_interval)
+        self.replicas.wait_for_check(REPLICA_CONNECT_TIMEOUT * (len(conninfos) + 1) + check_interval)
+        self._replica_conns = [None] * len(conninfos)
+        if self.pool is not None:
+            self._replica_pools = [self._open_pool(conninfo) for conninfo in conninfos]
+        print(f"Routing reads to {len(conninfos)} replicas ({policy}, max lag {max_lag} s).")
+
+    @staticmethod
+    @contextmanager
+    def _unit_of_work(conn):
+        """
+        Ends the transaction of a shared connection after a unit of work the way the pool
+        does when a connection is returned: committed on success, rolled back on error.
+        """
+        try:
+            yield conn
+        except BaseException:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        if not conn.closed:
+            conn.commit()
+
+    @contextmanager
+    def connection(self):
+        """
+        Provides a connection for one unit of work: a pooled connection returned to the
+        pool afterwards in the pooled mode, otherwise the shared self.conn. In both modes
+        the transaction is committed at the end of the block, or rolled back on error,
+        so a transaction the caller left open on self.conn ends there too.
+        """
+        if self.pool is None:
+            with self._unit_of_work(self.conn):
+                yield self.conn
+            return
+        start = time.perf_counter()
+        with self.pool.connection() as conn:
+            if self.instrumentation is not None:
+                self.instrumentation.record_wait('pool', time.perf_counter() - start)
+                self._instrument(conn)
+            yield conn
+
+    @contextmanager
+    def read_connection(self):
+        """
+        Provides a connection for one unit of read-only work: to a replica chosen by
+        self.replicas when replicas are enabled and one is within the maximum lag,
+        otherwise connection() to the primary. As with connection(), the transaction ends
+        with the block.
+        """
+        replica = self.replicas.choose() if self.replicas is not None else None
+        if replica is None:
+            with self.connection() as conn:
+                yield conn
+            return
+        failed = False
+        try:
+            if self._replica_pools:
+                start = time.perf_counter()
+                with self._replica_pools[replica].connection() as conn:
+                    if self.instrumentation is not None:
+                        self.instrumentation.record_wait('pool', time.perf_counter() - start)
+                        self._instrument(conn)
+                    yield conn
+            else:
+                conn = self._replica_conns[replica]
+                if conn is None or conn.closed:
+                    conn = self._replica_conns[replica] = self._connect(self.replicas.conninfos[replica])
+                with self._unit_of_work(conn):
+                    yield conn
+        except psycopg.OperationalError:
+            failed = True
+            raise
+        finally:
+            self.replicas.release(replica, failed)
+
+    def create_tables(self, partitioned=False, months_ahead=3):
         """
         Creates tables in the PostgreSQL database if they do not already exist.
         Uses PostgreSQL-specific data types (SERIAL, VARCHAR, DECIMAL).
         The 'pozycje_zamowienia' table has been removed.
+        :param partitioned: Create 'zamowienia' and 'platnosci' as tables partitioned by month
+                            (PARTITIONED_TABLE_DDL), each with a DEFAULT partition and partitions
+                            up to months_ahead months ahead. Existing tables are not converted.
+        :param months_ahead: Number of future monthly partitions to create (see ensure_partitions).
+        """
+        if self.conn:
+            try:
+                with self.connection() as conn, conn.cursor() as cur:
+                    for table, ddl in TABLE_DDL.items():
+                        cur.execute(PARTITIONED_TABLE_DDL[table] if partitioned and table in PARTITIONED_TABLE_DDL else ddl)
+                    if partitioned:
+                        for table in PARTITIONED_TABLE_DDL:
+                            cur.execute(f'CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT')
+                        self._ensure_partitions(cur, months_ahead)
+                    print("Tables created successfully.")
+            except psycopg.Error as e:
+                print(f"Error creating PostgreSQL tables: {e}")
+        else:
+            print("Skipped table creation (no database connection).")
+
+    def _partitioned_tables(self, cur):
+        """
+        Returns the tables of PARTITION_KEYS that exist as partitioned tables.
+        """
+        cur.execute("SELECT relname FROM pg_class WHERE relkind = 'p' AND relname = ANY(%s) "
+                    "AND relnamespace = 'public'::regnamespace", (list(PARTITION_KEYS),))
+        return [row[0] for row in cur.fetchall()]
+
+    def _create_partition(self, cur, table, month):
+        """
+        Creates the monthly partition of a table for the month starting at the given date,
+        unless it exists. Rows of that month already stored in the DEFAULT partition are
+        moved into the new partition before it is attached.
+        """
+        name = f'{table}_p{month:%Y_%m}'
+        cur.execute('SELECT to_regclass(%s), EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(%s))',
+                    (name, name))
+        exists, attached = cur.fetchone()
+        if exists is not None:
+            if not attached:
+                print(f"Table {name} exists but is not a partition of {table} (detached?); "
+                      f"rows of that month stay in {table}_default.")
+            return
+        key = PARTITION_KEYS[table]
+        next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+        cur.execute(f'CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cur.execute(f'''
+            WITH moved AS (DELETE FROM {table}_default WHERE {key} >= %s AND {key} < %s RETURNING *)
+            INSERT INTO {name} SELECT * FROM moved
+        ''', (month, next_month))
+        cur.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{month}') TO ('{next_month}')")
+
+    def _ensure_partitions(self, cur, months_ahead=3, start=None):
+        """
+        Creates the missing monthly partitions from start (default: the current month)
+        up to months_ahead months ahead.
+        """
+        month = (start or date.today()).replace(day=1)
+        tables = self._partitioned_tables(cur)
+        for _ in range(months_ahead + 1):
+            for table in tables:
+                self._create_partition(cur, table, month)
+            month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    def ensure_partitions(self, months_ahead=3):
+        """
+        Creates monthly partitions of the partitioned tables for the current month and
+        months_ahead months ahead. Meant to run periodically (e.g. daily from cron or a
+        scheduler), so new orders never land in the DEFAULT partition.
+        """
+        with self.connection() as conn:
+            with conn.transaction(), conn.cursor() as cur:
+                self._ensure_partitions(cur, months_ahead)
+
+    def _split_default_partitions(self, cur):
+        """
+        Moves the rows that landed in the DEFAULT partitions (e.g. from a CSV import)
+        into newly created monthly partitions.
+        """
+        for table in self._partitioned_tables(cur):
+            key = PARTITION_KEYS[table]
+            cur.execute(f"SELECT DISTINCT date_trunc('month', {key})::date FROM {table}_default")
+            for (month,) in cur.fetchall():
+                self._create_partition(cur, table, month)
+
+    def _create_partitions_for(self, cur, table, data):
+        """
+        Creates the monthly partitions needed for the rows of a chunk before it is copied.
+        """
+        key = PARTITION_KEYS[table]
+        values = data[key] if isinstance(data, (pd.DataFrame, dict)) else [row[key] for row in data]
+        for month in pd.Series(values).dropna().astype(str).str[:7].unique():
+            self._create_partition(cur, table, date.fromisoformat(f'{month}-01'))
+
+    def drop_partitions_before(self, cutoff, detach_only=False):
+        """
+        Removes monthly partitions whose whole month is before cutoff: each is detached
+        (a metadata change, no rows are deleted one by one) and then dropped, unless
+        detach_only is set, in which case it stays as a standalone table, e.g. for archiving.
+        :param cutoff: Date; partitions of months ending on or before it are removed.
+        :return: List of the removed partitions.
+        """
+        cutoff = date.fromisoformat(cutoff) if isinstance(cutoff, str) else cutoff
+        removed = []
+        with self.connection() as conn:
+            with conn.transaction(), conn.cursor() as cur:
+                for table in self._partitioned_tables(cur):
+                    cur.execute("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                                "WHERE i.inhparent = %s::regclass AND c.relname LIKE %s ORDER BY 1",
+                                (table, f'{table}\\_p%'))
+                    for (name,) in cur.fetchall():
+                        month = date(int(name[-7:-3]), int(name[-2:]), 1)
+                        if (month.replace(day=28) + timedelta(days=4)).replace(day=1) > cutoff:
+                            continue
+                        cur.execute(f'ALTER TABLE {table} DETACH PARTITION {name}')
+                        if not detach_only:
+                            cur.execute(f'DROP TABLE {name}')
+                        removed.append(name)
+        print(f"{'Detached' if detach_only else 'Dropped'} partitions: {removed}")
+        return removed
+
+    def create_indexes(self):
+        """
+        Creates the secondary indexes defined in INDEXES and refreshes planner statistics.
+        """
+        if self.conn:
+            try:
+                with self.connection() as conn, conn.cursor() as cur:
+                    for name, definition in INDEXES.items():
+                        cur.execute(f'CREATE INDEX IF NOT EXISTS {name} {definition}')
+                    for table in TABLE_COLUMNS:
+                        cur.execute(f'ANALYZE {table}')
+                print("Indexes created successfully.")
+            except psycopg.Error as e:
+                print(f"Error creating PostgreSQL indexes: {e}")
+
+    def drop_indexes(self):
+        """
+        Drops the secondary indexes defined in INDEXES.
+        """
+        if self.conn:
+            try:
+                with self.connection() as conn, conn.cursor() as cur:
+                    for name in INDEXES:
+                        cur.execute(f'DROP INDEX IF EXISTS {name}')
+                print("Indexes dropped.")
+            except psycopg.Error as e:
+                print(f"Error dropping PostgreSQL indexes: {e}")
+
+    def reindex(self, concurrently=False):
+        """
+        Rebuilds the existing secondary indexes defined in INDEXES.
+        :param concurrently: Use REINDEX CONCURRENTLY, which does not block writes
+                             but has to run outside a transaction block.
+        """
+        if self.conn:
+            try:
+                with self.connection() as conn:
+                    conn.commit()
+                    conn.autocommit = concurrently
+                    try:
+                        with conn.cursor() as cur:
+                            cur.execute("SELECT indexname FROM pg_indexes WHERE schemaname = 'public'")
+                            existing = {row[0] for row in cur.fetchall()}
+                            for name in INDEXES:
+                                if name in existing:
+                                    cur.execute(f"REINDEX INDEX {'CONCURRENTLY ' if concurrently else ''}{name}")
+                    finally:
+                        if concurrently and not conn.closed:
+                            conn.autocommit = False
+                print("Indexes rebuilt.")
+            except psycopg.Error as e:
+                print(f"Error rebuilding PostgreSQL indexes: {e}")
+
+    def enable_catalog_cache(self, max_entries=10_000, ttl=30.0, poll_interval=1.0):
+        """
+        Enables the read-through catalog cache (get_product, get_products_by_category,
+        get_categories). Product changes (including price and stock) are recorded by a
+        trigger in the zmiany_produktow table; reads check it at most once every
+        poll_interval seconds for changes committed since the previous check and invalidate
+        the changed entries, or the whole cache after a TRUNCATE of the products. Data is
+        therefore stale for at most poll_interval after the commit, and no entry lives
+        longer than ttl regardless.
+        """
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                for statement in PRODUCT_CHANGE_LOG:
+                    cur.execute(statement)
+            conn.commit()
+            self._cache_snapshot = conn.execute('SELECT pg_current_snapshot()::text').fetchone()[0]
+            conn.commit()
+        self._cache_poll_interval = poll_interval
+        self._cache_last_poll = time.monotonic()
+        self.catalog_cache = CatalogCache(max_entries, ttl)
+
+    def _poll_product_changes(self):
+        """
+        Invalidates cache entries of products changed by transactions committed since the last check.
+        """
+        if time.monotonic() - self._cache_last_poll < self._cache_poll_interval:
+            return
+        if not self._cache_poll_lock.acquire(blocking=False):
+            return # Another thread is already checking the log
+        try:
+            changes = self._fetch_report(PRODUCT_CHANGES_QUERY, {'last': self._cache_snapshot}, replica=False)
+            keys = set()
+            truncated = False
+            for _, seq, produkt_id, kategoria_id, stara_kategoria_id in changes:
+                if seq is None:
+                    continue # No changes since the last check
+                if produkt_id is None:
+                    truncated = True
+                    continue
+                keys.update({('produkt', produkt_id), ('kategoria', kategoria_id), ('kategoria', stara_kategoria_id)})
+            self._cache_snapshot = changes[0][0]
+            if truncated:
+                self.catalog_cache.clear()
+            elif keys:
+                self.catalog_cache.invalidate(*keys)
+            self._cache_last_poll = time.monotonic()
+        finally:
+            self._cache_poll_lock.release()
+
+    def _catalog_read(self, key, sql, params, single=False):
+        """
+        Catalog read through the cache (when enabled).
+        """
+        def load():
+            # With the cache, entries are invalidated from the primary's change log, so they
+            # are loaded from the primary too: a lagging replica could cache the old row again
+            with (self.connection() if self.catalog_cache is not None else self.read_connection()) as conn:
+                with conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
+                    cur.execute(sql, params)
+                    rows = cur.fetchall()
+            return (rows[0] if rows else None) if single else rows
+
+        if self.catalog_cache is None:
+            return load()
+        self._poll_product_changes()
+        return self.catalog_cache.get(key, load)
+
+    def get_product(self, produkt_id):
+        """
+        Returns a product as a dictionary (None if it does not exist).
+        """
+        return self._catalog_read(('produkt', produkt_id),
+                                  f"SELECT {', '.join(TABLE_COLUMNS['produkty'])} FROM produkty WHERE id = %s",
+                                  (produkt_id,), single=True)
+
+    def get_products_by_category(self, kategoria_id):
+        """
+        Returns the list of products in a category.
+        """
+        return self._catalog_read(('kategoria', kategoria_id),
+                                  f"SELECT {', '.join(TABLE_COLUMNS['produkty'])} FROM produkty "
+                                  "WHERE kategoria_id = %s ORDER BY id", (kategoria_id,))
+
+    def get_categories(self):
+        """
+        Returns the list of categories.
+        """
+        return self._catalog_read(('kategorie',), 'SELECT * FROM kategorie ORDER BY id', ())
+
+    def update_product(self, produkt_id, cena=None, stan_magazynowy=None):
+        """
+        Changes the price and/or stock of a product and immediately invalidates its cache entries.
+        """
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute('''
+                    UPDATE produkty
+                    SET cena = COALESCE(%s, cena), stan_magazynowy = COALESCE(%s, stan_magazynowy)
+                    WHERE id = %s
+                    RETURNING kategoria_id
+                ''', (cena, stan_magazynowy, produkt_id))
+                row = cur.fetchone()
+            conn.commit()
+        if self.catalog_cache is not None and row is not None:
+            self.catalog_cache.invalidate(('produkt', produkt_id), ('kategoria', row[0]))
+        return row is not None
+
+    def prune_product_changes(self, max_age_seconds=3600):
+        """
+        Deletes product change log entries older than max_age_seconds
+        (must be longer than the poll_interval of every process using the log).
+        """
+        with self.connection() as conn:
+            conn.execute("DELETE FROM zmiany_produktow WHERE czas < now() - make_interval(secs => %s)",
+                         (max_age_seconds,))
+            conn.commit()
+
+    def _place_order_tx(self, cur, klient_id, pozycje, metoda_platnosci='karta'):
+        """
+        Places one order inside the current transaction: locks the ordered products,
+        checks and decrements their stock, then inserts the order and its payment.
+        """
+        quantities = _order_quantities(pozycje)
+        ids, amounts = [p for p, _ in quantities], [q for _, q in quantities]
+        cur.execute(STOCK_LOCK_QUERY, (ids,))
+        total = _check_stock(quantities, cur.fetchall())
+        cur.execute(STOCK_UPDATE, (ids, amounts))
+        cur.execute(ORDER_INSERT, (klient_id,))
+        zamowienie_id = cur.fetchone()[0]
+        cur.execute(PAYMENT_INSERT, (zamowienie_id, total, metoda_platnosci))
+        return zamowienie_id
+
+    def place_order(self, klient_id, pozycje, metoda_platnosci='karta', max_retries=3):
+        """
+        Places a customer order in one transaction: reserves stock of the ordered products
+        (rows locked with SELECT ... FOR UPDATE, so concurrent orders of the same product
+        wait for each other instead of overselling), inserts the order with status 'nowe'
+        and its payment for the current prices.
+        :param pozycje: List of (produkt_id, ilosc) pairs.
+        :return: Id of the new order.
+        :raises InsufficientStockError: A product does not exist or has too little stock.
+        """
+        return self.place_orders([(klient_id, pozycje, metoda_platnosci)], max_retries=max_retries)[0]
+
+    def place_orders(self, zamowienia, return_exceptions=False, max_retries=3):
+        """
+        Places many orders in one transaction (group commit): one commit, and one WAL
+        flush, for the whole batch instead of one per order. Every order runs in its own
+        savepoint. Deadlocks and serialization failures retry the whole batch after a
+        short random backoff, at most max_retries times.
+        :param zamowienia: List of (klient_id, pozycje[, metoda_platnosci]) tuples, as for place_order.
+        :param return_exceptions: Return InsufficientStockError in place of the id of a failed
+                                  order instead of rolling back the whole batch.
+        :return: List of new order ids, in the order of zamowienia.
+        """
+        with self._operation('place_orders') as op:
+            op['rows'] = len(zamowienia)
+            for attempt in range(max_retries + 1):
+                try:
+                    with self.connection() as conn:
+                        results = []
+                        with conn.transaction(), conn.cursor() as cur:
+                            for zamowienie in zamowienia:
+                                try:
+                                    with conn.transaction(): # savepoint
+                                        results.append(self._place_order_tx(cur, *zamowienie))
+                                except InsufficientStockError as e:
+                                    if not return_exceptions:
+                                        raise
+                                    results.append(e)
+                        return results
+                except (psycopg.errors.DeadlockDetected, psycopg.errors.SerializationFailure):
+                    if attempt == max_retries:
+                        raise
+                    time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+    def create_summary_views(self):
+        """
+        Creates the report summaries (total spend per customer, revenue per month and
+        payment method) as materialized views in SUMMARY_VIEWS, with their indexes.
+        Reports (top_customers, customer_total_spend, revenue_by_month) read from them
+        instead of joining the whole order history; refresh_summaries() brings them up to date.
+        """
+        if self.conn:
+            try:
+                with self.connection() as conn, conn.cursor() as cur:
+                    for name, (query, indexes) in SUMMARY_VIEWS.items():
+                        cur.execute(f'CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS {query}')
+                        for index in indexes:
+                            cur.execute(index)
+                print("Summary views created successfully.")
+            except psycopg.Error as e:
+                print(f"Error creating PostgreSQL summary views: {e}")
+
+    def refresh_summaries(self, concurrently=True):
+        """
+        Refreshes the summary views. Meant to be run periodically (e.g. by cron or a
+        scheduler) and after bulk imports.
+        :param concurrently: Use REFRESH ... CONCURRENTLY, which keeps the views readable
+                             during the refresh (the views must already be populated).
+        """
+        if self.conn:
+            try:
+                with self.connection() as conn, conn.cursor() as cur:
+                    for name in SUMMARY_VIEWS:
+                        cur.execute(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrently else ''}{name}")
+            except psycopg.Error as e:
+                print(f"Error refreshing PostgreSQL summary views: {e}")
+
+    def _fetch_report(self, sql, params=(), replica=True):
+        """
+        Runs a read-only query on read_connection() (connection() without replica).
+        """
+        with (self.read_connection() if replica else self.connection()) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall()
+        return rows
+
+    def top_customers(self, limit=10):
+        """
+        Returns the customers with the highest total spend:
+        (klient_id, imie, nazwisko, liczba_platnosci, suma_zakupow).
+        """
+        return self._fetch_report(REPORT_QUERIES['top_customers'], (limit,))
+
+    def customer_total_spend(self, klient_id):
+        """
+        Returns the total spend of a customer (0 if there are no payments).
+        """
+        rows = self._fetch_report(REPORT_QUERIES['customer_total_spend'], (klient_id,))
+        return rows[0][0] if rows else Decimal(0)
+
+    def revenue_by_month(self, metoda_platnosci=None):
+        """
+        Returns revenue per month (miesiac, liczba_platnosci, suma_kwot),
+        optionally for a single payment method.
+        """
+        return self._fetch_report(REPORT_QUERIES['revenue_by_month'], {'method': metoda_platnosci})
+
+    def revenue_by_payment_method(self):
+        """
+        Returns revenue per payment method (metoda_platnosci, liczba_platnosci, suma_kwot).
+        """
+        return self._fetch_report(REPORT_QUERIES['revenue_by_payment_method'])
+
+    def create_search_index(self):
+        """
+        Creates the product search indexes: a GIN index over the stored generated column
+        wyszukiwanie (weighted tsvector of the folded name and description), a folded-name
+        index for prefix searches and, when the pg_trgm extension can be created, a trigram
+        index used for fuzzy matching. The column and the expression indexes are maintained
+        by PostgreSQL itself, so they stay in sync with produkty without triggers.
+        Adding the column rewrites the table once.
         """
         if self.conn:
             try:
-                with self.conn.cursor() as cur:
-                    # KATEGORIE Table
-                    cur.execute('''
-                        CREATE TABLE IF NOT EXISTS kategorie (
-                            id SERIAL PRIMARY KEY,
-                            nazwa VARCHAR(100) NOT NULL,
-                            opis TEXT
-                        )
-                    ''')
-                    
-                    # PRODUKTY Table
-                    cur.execute('''
-                        CREATE TABLE IF NOT EXISTS produkty (
-                            id SERIAL PRIMARY KEY,
-                            nazwa VARCHAR(100) NOT NULL,
-                            opis TEXT,
-                            cena DECIMAL(10,2) NOT NULL,
-                            stan_magazynowy INTEGER NOT NULL,
-                            kategoria_id INTEGER,
-                            FOREIGN KEY (kategoria_id) REFERENCES kategorie(id)
-                        )
-                    ''')
-
-                    # KLIENCI Table
-                    cur.execute('''
-                        CREATE TABLE IF NOT EXISTS klienci (
-                            id SERIAL PRIMARY KEY,
-                            imie VARCHAR(100) NOT NULL,
-                            nazwisko VARCHAR(100) NOT NULL,
-                            email VARCHAR(255) UNIQUE NOT NULL,
-                            telefon VARCHAR(20),
-                            adres TEXT
-                        )
-                    ''')
-
-                    # ZAMOWIENIA Table
-                    cur.execute('''
-                        CREATE TABLE IF NOT EXISTS zamowienia (
-                            id SERIAL PRIMARY KEY,
-                            klient_id INTEGER,
-                            data_zamowienia DATE NOT NULL,
-                            status VARCHAR(50) CHECK(status IN ('nowe', 'w_realizacji', 'zrealizowane')),
-                            FOREIGN KEY (klient_id) REFERENCES klienci(id)
-                        )
-                    ''')
-
-                    # PLATNOSCI Table
-                    cur.execute('''
-                        CREATE TABLE IF NOT EXISTS platnosci (
-                            id SERIAL PRIMARY KEY,
-                            zamowienie_id INTEGER,
-                            kwota DECIMAL(10,2) NOT NULL,
-                            metoda_platnosci VARCHAR(50) NOT NULL,
-                            data_platnosci DATE NOT NULL,
-                            FOREIGN KEY (zamowienie_id) REFERENCES zamowienia(id)
-                        )
-                    ''')
-                    self.conn.commit()
-                    print("Tables created successfully.")
+                with self.connection() as conn, conn.cursor() as cur:
+                    for statement in SEARCH_FUNCTIONS:
+                        cur.execute(statement)
+                    for name, definition in SEARCH_INDEXES.items():
+                        cur.execute(f'CREATE INDEX IF NOT EXISTS {name} {definition}')
+                    try:
+                        with conn.transaction():
+                            cur.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+                            cur.execute(f'CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX[0]} {TRIGRAM_INDEX[1]}')
+                        self._trigram_search = True
+                    except psycopg.Error as e:
+                        print(f"Warning: pg_trgm is not available, fuzzy product search disabled ({e}).")
+                        self._trigram_search = False
+                    cur.execute('ANALYZE produkty')
+                print("Search indexes created successfully.")
             except psycopg.Error as e:
-                print(f"Error creating PostgreSQL tables: {e}")
-                if self.conn and not self.conn.closed:
-                    self.conn.rollback()
-        else:
-            print("Skipped table creation (no database connection).")
+                print(f"Error creating PostgreSQL search indexes: {e}")
+
+    def search_products(self, phrase, limit=20):
+        """
+        Finds products whose name or description contains every word of the phrase (each
+        also as the start of a longer word, e.g. "kolowr" finds "Kołowrotek"), regardless
+        of case and Polish diacritics. With pg_trgm names similar to the whole phrase are
+        found as well, so small typos are tolerated.
+        Results are ordered by ts_rank, with name matches weighing more than description
+        matches (plus trigram word similarity of the name). Requires create_search_index.
+        :return: List of (id, nazwa, opis, cena, stan_magazynowy, kategoria_id, ranking), best first.
+        """
+        folded = fold_search_text(phrase)
+        words = re.findall(r'\w+', folded)
+        if not words:
+            return []
+        if self._trigram_search is None:
+            self._trigram_search = bool(self._fetch_report(
+                'SELECT 1 FROM pg_indexes WHERE indexname = %s', (TRIGRAM_INDEX[0],)))
+        extras = TRIGRAM_SEARCH if self._trigram_search else {'similarity': '', 'fuzzy': ''}
+        params = {'tsquery': ' & '.join(f'{word}:*' for word in words), 'phrase': folded, 'limit': limit}
+        return self._fetch_report(SEARCH_QUERY.format(**extras), params)
+
+    def search_products_by_prefix(self, prefix, limit=20):
+        """
+        Returns products whose name starts with the prefix, regardless of case and Polish
+        diacritics - the indexed counterpart of nazwa LIKE 'prefix%'. Results come in the
+        order of the folded name straight from idx_produkty_nazwa_fold, so the scan stops
+        after limit rows. Requires create_search_index.
+        :return: List of (id, nazwa, opis, cena, stan_magazynowy, kategoria_id).
+        """
+        pattern = re.sub(r'([\\%_])', r'\\\1', fold_search_text(prefix)) + '%'
+        return self._fetch_report(PREFIX_SEARCH_QUERY, (pattern, limit))
 
     def generate_test_data(self):
         """
@@ -189,6 +2086,140 @@ class SklepWedkarskiPostgreSQL:
         
         return kategorie, produkty, klienci, zamowienia, platnosci
 
+    def generate_scaled_data(self, num_orders=10_000, seed=42, chunk_size=100_000,
+                             orders_per_customer=5, orders_per_product=1_000):
+        """
+        Generates a reproducible synthetic dataset of arbitrary size.
+        Columns are generated with NumPy in vectorised form and the data is yielded
+        as (table_name, DataFrame) chunks of at most chunk_size rows, table by table
+        in foreign key order, so the whole dataset never has to fit in memory.
+        Every chunk uses its own generator seeded with (seed, table, chunk number),
+        so the same arguments always produce the same data.
+        :param num_orders: Number of orders (and payments) to generate, e.g. 10_000 to 50_000_000.
+        :param seed: Seed of the random number generator.
+        :param chunk_size: Maximum number of rows in a single chunk.
+        :param orders_per_customer: Average number of orders per customer.
+        :param orders_per_product: Number of orders per one product in the catalogue.
+        """
+        # The hand-written catalogue from generate_test_data is the base of every dataset
+        base_kategorie, base_produkty, _, _, _ = self.generate_test_data()
+        num_customers = max(1, num_orders // orders_per_customer)
+        num_products = max(len(base_produkty), num_orders // orders_per_product)
+
+        yield 'kategorie', pd.DataFrame(base_kategorie)
+
+        # Products: the base catalogue followed by synthetic variants
+        yield 'produkty', pd.DataFrame(base_produkty)
+        for chunk_no, start in enumerate(range(len(base_produkty) + 1, num_products + 1, chunk_size)):
+            size = min(chunk_size, num_products + 1 - start)
+            rng = np.random.default_rng([seed, 1, chunk_no])
+            ids = np.arange(start, start + size)
+            base_names = np.array([p['nazwa'] for p in base_produkty], dtype=object)
+            yield 'produkty', pd.DataFrame({
+                'id': ids,
+                'nazwa': base_names[rng.integers(0, len(base_names), size)] + ' #' + ids.astype(str).astype(object),
+                'opis': 'Wariant produktu ' + ids.astype(str).astype(object),
+                'cena': np.round(rng.uniform(9.99, 999.99, size), 2),
+                'stan_magazynowy': rng.integers(0, 200, size),
+                'kategoria_id': rng.integers(1, len(base_kategorie) + 1, size),
+            })
+
+        # Customers
+        first_names = np.array(FIRST_NAMES, dtype=object)
+        last_names = np.array(LAST_NAMES, dtype=object)
+        streets = np.array(STREETS, dtype=object)
+        for chunk_no, start in enumerate(range(1, num_customers + 1, chunk_size)):
+            size = min(chunk_size, num_customers + 1 - start)
+            rng = np.random.default_rng([seed, 2, chunk_no])
+            ids = np.arange(start, start + size)
+            yield 'klienci', pd.DataFrame({
+                'id': ids,
+                'imie': first_names[rng.integers(0, len(first_names), size)],
+                'nazwisko': last_names[rng.integers(0, len(last_names), size)],
+                'email': 'klient' + ids.astype(str).astype(object) + '@email.pl',
+                'telefon': rng.integers(100_000_000, 1_000_000_000, size).astype(str),
+                'adres': 'ul. ' + streets[rng.integers(0, len(streets), size)]
+                         + ' ' + rng.integers(1, 200, size).astype(str).astype(object),
+            })
+
+        # Orders, then their payments (one payment per order, same id).
+        # Payment chunks regenerate the matching order chunk from its seed instead of keeping it in memory.
+        for table in ('zamowienia', 'platnosci'):
+            for chunk_no, start in enumerate(range(1, num_orders + 1, chunk_size)):
+                size = min(chunk_size, num_orders + 1 - start)
+                zamowienia, platnosci = self._generate_order_chunk(seed, chunk_no, start, size, num_customers)
+                yield table, zamowienia if table == 'zamowienia' else platnosci
+
+    def _generate_order_columns(self, seed, chunk_no, start, size, num_customers):
+        """
+        Generates one chunk of orders and the matching payments as two dicts of NumPy
+        columns: dates as datetime64, status and payment method as Categoricals.
+        """
+        rng = np.random.default_rng([seed, 3, chunk_no])
+        ids = np.arange(start, start + size)
+        order_dates = np.datetime64(REFERENCE_DATE, 'D') - rng.integers(1, 366, size)
+        payment_dates = order_dates + rng.integers(0, 8, size) # Payment up to 7 days after the order
+        zamowienia = {
+            'id': ids,
+            'klient_id': rng.integers(1, num_customers + 1, size),
+            'data_zamowienia': order_dates,
+            'status': pd.Categorical.from_codes(rng.integers(0, len(ORDER_STATUSES), size), ORDER_STATUSES),
+        }
+        platnosci = {
+            'id': ids,
+            'zamowienie_id': ids,
+            'kwota': np.round(rng.uniform(50.0, 1000.0, size), 2),
+            'metoda_platnosci': pd.Categorical.from_codes(rng.integers(0, len(PAYMENT_METHODS), size), PAYMENT_METHODS),
+            'data_platnosci': payment_dates,
+        }
+        return zamowienia, platnosci
+
+    def _generate_order_chunk(self, seed, chunk_no, start, size, num_customers):
+        """
+        Generates one chunk of orders and the matching payments as two DataFrames.
+        """
+        zamowienia, platnosci = self._generate_order_columns(seed, chunk_no, start, size, num_customers)
+        return (pd.DataFrame({**zamowienia,
+                              'data_zamowienia': np.datetime_as_string(zamowienia['data_zamowienia'], unit='D'),
+                              'status': np.asarray(zamowienia['status'])}),
+                pd.DataFrame({**platnosci,
+                              'metoda_platnosci': np.asarray(platnosci['metoda_platnosci']),
+                              'data_platnosci': np.datetime_as_string(platnosci['data_platnosci'], unit='D')}))
+
+    def generate_dataset(self, num_orders=10_000, seed=42, chunk_size=100_000,
+                         orders_per_customer=5, orders_per_product=1_000):
+        """
+        Generates the same data as generate_scaled_data with the same arguments, but
+        collects it in a ColumnarDataset: orders and payments go straight from the
+        NumPy generator into the column buffers, without DataFrames of strings.
+        Holds tens of millions of orders in memory (about 50 bytes per order with
+        its payment and share of customers) for repeated loads, e.g.
+        import_binary(dataset) or export_chunks_to_csv(dataset).
+        """
+        dataset = ColumnarDataset()
+        chunks = self.generate_scaled_data(num_orders, seed, chunk_size, orders_per_customer, orders_per_product)
+        for table, df in takewhile(lambda chunk: chunk[0] != 'zamowienia', chunks):
+            dataset.append(table, df)
+        num_customers = max(1, num_orders // orders_per_customer)
+        for chunk_no, start in enumerate(range(1, num_orders + 1, chunk_size)):
+            size = min(chunk_size, num_orders + 1 - start)
+            zamowienia, platnosci = self._generate_order_columns(seed, chunk_no, start, size, num_customers)
+            dataset.append('zamowienia', zamowienia)
+            dataset.append('platnosci', platnosci)
+        return dataset
+
+    def export_chunks_to_csv(self, chunks):
+        """
+        Writes (table_name, DataFrame) chunks, e.g. from generate_scaled_data,
+        to per-table CSV files without holding whole tables in memory.
+        """
+        written = set()
+        for table, df in chunks:
+            first = table not in written
+            df.to_csv(f'{table}.csv', mode='w' if first else 'a', index=False, header=first)
+            written.add(table)
+        print("Data chunks exported to CSV files.")
+
     def export_data_to_csv(self, kategorie, produkty, klienci, zamowienia, platnosci):
         """
         Exports generated data to separate CSV files.
@@ -200,14 +2231,84 @@ class SklepWedkarskiPostgreSQL:
         pd.DataFrame(platnosci).to_csv('platnosci.csv', index=False, header=True)
         print("Data exported to CSV files.")
 
-    def import_from_csv(self):
+    def _export_table_csv(self, table, snapshot, directory, compression, max_file_size):
+        """
+        Streams one table with COPY TO STDOUT into split CSV files on its own connection,
+        reading the snapshot exported by export_tables_to_csv. Returns the list of files.
+        """
+        writer = SplitCsvWriter(directory, table, TABLE_COLUMNS[table], compression, max_file_size)
+        try:
+            with self._connect() as conn:
+                conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+                conn.read_only = True
+                with conn.cursor() as cur:
+                    cur.execute(f"SET TRANSACTION SNAPSHOT '{snapshot}'")
+                    with cur.copy(f"COPY (SELECT {', '.join(TABLE_COLUMNS[table])} FROM {table} ORDER BY id) "
+                                  f"TO STDOUT (FORMAT CSV)") as copy:
+                        for data in copy:
+                            writer.write(data)
+                conn.rollback()
+        finally:
+            files = writer.close()
+        return files
+
+    def export_tables_to_csv(self, directory='export', workers=4, compression=None, max_file_size=None):
+        """
+        Exports the live tables to CSV files with COPY TO STDOUT. Tables are exported in
+        parallel, each on its own connection; all connections read one snapshot exported
+        by a coordinating transaction, so the files are consistent with each other.
+        COPY output is written as it arrives, so memory use does not depend on the table size.
+        A manifest.json with the files and row counts of every table is written last.
+        :param compression: None, 'gzip' or 'zstd' (needs the 'zstandard' package).
+        :param max_file_size: Uncompressed size limit of one file in bytes; with a limit the
+                              files are numbered (<table>.0000.csv...), without it every table
+                              is written to <table>.csv, which import_from_csv can load.
+        :return: The manifest dictionary.
+        """
+        if compression not in SplitCsvWriter.EXTENSIONS:
+            raise ValueError(f"Unknown compression: {compression}")
+        os.makedirs(directory, exist_ok=True)
+        start = time.perf_counter()
+        with self._operation('export_tables_to_csv') as op, self._connect() as coordinator:
+            coordinator.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+            coordinator.read_only = True
+            snapshot = coordinator.execute("SELECT pg_export_snapshot()").fetchone()[0]
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                tasks = {table: pool.submit(self._export_table_csv, table, snapshot, directory,
+                                            compression, max_file_size)
+                         for table in TABLE_COLUMNS}
+                files = {table: task.result() for table, task in tasks.items()}
+            coordinator.rollback()
+            op['rows'] = sum(f['rows'] for table_files in files.values() for f in table_files)
+            op['bytes'] = sum(f['bytes'] for table_files in files.values() for f in table_files)
+        manifest = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'backend': 'postgresql',
+            'compression': compression,
+            'max_file_size': max_file_size,
+            'tables': {table: {'columns': list(TABLE_COLUMNS[table]),
+                               'rows': sum(f['rows'] for f in files[table]),
+                               'files': files[table]}
+                       for table in TABLE_COLUMNS},
+        }
+        with open(os.path.join(directory, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=4)
+        print(f"Tables exported to {directory} in {time.perf_counter() - start:.2f} s.")
+        return manifest
+
+    def import_from_csv(self, delta=False):
         """
         Imports data from CSV files into the PostgreSQL database using COPY.
         Cleans tables and resets sequences beforehand.
+        Files are streamed to COPY in blocks of COPY_BLOCK_SIZE bytes.
+        :param delta: Apply only the differences instead of reloading everything (see sync_from_csv).
         """
+        if delta:
+            return self.sync_from_csv()
         if self.conn and not self.conn.closed:
             try:
-                with self.conn.cursor() as cur:
+                with self._operation('import_from_csv') as op, self.connection() as conn, conn.cursor() as cur:
+                    op['bytes'] = sum(os.path.getsize(f'{table}.csv') for table in TABLE_COLUMNS)
                     # Clear tables and reset sequences
                     print("Clearing tables and resetting sequences...")
                     cur.execute("TRUNCATE TABLE platnosci RESTART IDENTITY CASCADE;")
@@ -215,17 +2316,18 @@ class SklepWedkarskiPostgreSQL:
                     cur.execute("TRUNCATE TABLE produkty RESTART IDENTITY CASCADE;")
                     cur.execute("TRUNCATE TABLE klienci RESTART IDENTITY CASCADE;")
                     cur.execute("TRUNCATE TABLE kategorie RESTART IDENTITY CASCADE;")
-                    self.conn.commit()
+                    conn.commit()
                     print("Tables cleared.")
 
                     # Import categories
                     try:
                         print("Importing categories...")
-                        with open('kategorie.csv', 'r') as f_kategorie:
+                        with open('kategorie.csv', 'rb') as f_kategorie:
                             # Use cur.copy for psycopg3 or cur.copy_from for psycopg2
                             # Assuming psycopg3, using cur.copy
                             with cur.copy("COPY kategorie (id, nazwa, opis) FROM STDIN (FORMAT CSV, HEADER TRUE)") as copy_k:
-                                copy_k.write(f_kategorie.read().encode('utf-8'))
+                                self._stream_to_copy(f_kategorie, copy_k)
+                        op['rows'] += cur.rowcount
                         print(f"Imported data into 'kategorie'.")
                     except Exception as e:
                         print(f"Error during categories import: {e}")
@@ -234,9 +2336,10 @@ class SklepWedkarskiPostgreSQL:
                     # Import customers
                     try:
                         print("Importing customers...")
-                        with open('klienci.csv', 'r') as f_klienci:
+                        with open('klienci.csv', 'rb') as f_klienci:
                             with cur.copy("COPY klienci (id, imie, nazwisko, email, telefon, adres) FROM STDIN (FORMAT CSV, HEADER TRUE)") as copy_kl:
-                                copy_kl.write(f_klienci.read().encode('utf-8'))
+                                self._stream_to_copy(f_klienci, copy_kl)
+                        op['rows'] += cur.rowcount
                         print(f"Imported data into 'klienci'.")
                     except Exception as e:
                         print(f"Error during customers import: {e}")
@@ -245,9 +2348,10 @@ class SklepWedkarskiPostgreSQL:
                     # Import products
                     try:
                         print("Importing products...")
-                        with open('produkty.csv', 'r') as f_produkty:
+                        with open('produkty.csv', 'rb') as f_produkty:
                             with cur.copy("COPY produkty (id, nazwa, opis, cena, stan_magazynowy, kategoria_id) FROM STDIN (FORMAT CSV, HEADER TRUE)") as copy_p:
-                                copy_p.write(f_produkty.read().encode('utf-8'))
+                                self._stream_to_copy(f_produkty, copy_p)
+                        op['rows'] += cur.rowcount
                         print(f"Imported data into 'produkty'.")
                     except Exception as e:
                         print(f"Error during products import: {e}")
@@ -256,9 +2360,10 @@ class SklepWedkarskiPostgreSQL:
                     # Import orders
                     try:
                         print("Importing orders...")
-                        with open('zamowienia.csv', 'r') as f_zamowienia:
+                        with open('zamowienia.csv', 'rb') as f_zamowienia:
                             with cur.copy("COPY zamowienia (id, klient_id, data_zamowienia, status) FROM STDIN (FORMAT CSV, HEADER TRUE)") as copy_z:
-                                copy_z.write(f_zamowienia.read().encode('utf-8'))
+                                self._stream_to_copy(f_zamowienia, copy_z)
+                        op['rows'] += cur.rowcount
                         print(f"Imported data into 'zamowienia'.")
                     except Exception as e:
                         print(f"Error during orders import: {e}")
@@ -267,62 +2372,702 @@ class SklepWedkarskiPostgreSQL:
                     # Import payments
                     try:
                         print("Importing payments...")
-                        with open('platnosci.csv', 'r') as f_platnosci:
+                        with open('platnosci.csv', 'rb') as f_platnosci:
                             with cur.copy("COPY platnosci (id, zamowienie_id, kwota, metoda_platnosci, data_platnosci) FROM STDIN (FORMAT CSV, HEADER TRUE)") as copy_pl:
-                                copy_pl.write(f_platnosci.read().encode('utf-8'))
+                                self._stream_to_copy(f_platnosci, copy_pl)
+                        op['rows'] += cur.rowcount
                         print(f"Imported data into 'platnosci'.")
                     except Exception as e:
                         print(f"Error during payments import: {e}")
                         raise
-                    
-                    self.conn.commit()
+
+                    # Rows of partitioned tables are routed to the DEFAULT partitions, as the months are not known in advance
+                    self._split_default_partitions(cur)
                     print("Data imported successfully from CSV.")
             except psycopg.Error as e:
                 print(f"PostgreSQL error during CSV import: {e}")
-                if self.conn and not self.conn.closed:
-                    self.conn.rollback()
             except FileNotFoundError as e:
                 print(f"Error: CSV file not found: {e}")
-                if self.conn and not self.conn.closed:
-                    self.conn.rollback()
             except Exception as e: # Catch any re-raised exceptions
                 print(f"General error during CSV import: {e}")
-                if self.conn and not self.conn.closed:
-                    self.conn.rollback()
         else:
             print("Skipped PostgreSQL import (no connection).")
 
-    def print_all_tables(self):
+    def _stream_to_copy(self, f, copy, start=0, end=None, block_size=COPY_BLOCK_SIZE):
+        """
+        Streams a binary file object to an open COPY in fixed-size blocks,
+        optionally limited to the byte range [start, end).
+        """
+        f.seek(start)
+        remaining = None if end is None else end - start
+        while remaining is None or remaining > 0:
+            block = f.read(block_size if remaining is None else min(block_size, remaining))
+            if not block:
+                break
+            copy.write(block)
+            if remaining is not None:
+                remaining -= len(block)
+
+    def _split_csv(self, path, parts):
+        """
+        Splits a CSV file into up to 'parts' byte ranges that start and end at line boundaries.
+        The first range starts at the beginning of the file, so it contains the header.
+        """
+        size = os.path.getsize(path)
+        bounds = [0]
+        with open(path, 'rb') as f:
+            for i in range(1, parts):
+                f.seek(max(size * i // parts, bounds[-1]))
+                f.readline() # Move to the start of the next line
+                if f.tell() >= size:
+                    break
+                bounds.append(f.tell())
+        bounds.append(size)
+        return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1) if bounds[i] < bounds[i + 1]]
+
+    def _copy_csv_part(self, table, path, start, end, header):
+        """
+        Loads one byte range of a CSV file into a table on its own connection.
+        Returns the numbers of loaded rows and bytes.
+        """
+        columns = ', '.join(TABLE_COLUMNS[table])
+        with self._connect() as conn, conn.cursor() as cur:
+            with open(path, 'rb') as f:
+                with cur.copy(f"COPY {table} ({columns}) FROM STDIN (FORMAT CSV, HEADER {header})") as copy:
+                    self._stream_to_copy(f, copy, start, end)
+            rows = cur.rowcount
+        return rows, end - start
+
+    def _drop_constraints_and_indexes(self):
+        """
+        Drops foreign keys and secondary (non-constraint) indexes of the shop tables.
+        Their definitions are saved in odbudowa_schematu in the same transaction, so they
+        survive a failed load; definitions left there by an earlier failed load are
+        returned as well. Returns the (kind, name, statement) rows needed to recreate them,
+        see _rebuild_constraints_and_indexes.
+        """
+        tables = list(TABLE_COLUMNS)
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(SCHEMA_REBUILD_DDL)
+            cur.execute("""
+                SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+                FROM pg_constraint
+                WHERE contype = 'f' AND conrelid::regclass::text = ANY(%s)
+            """, (tables,))
+            foreign_keys = cur.fetchall()
+            cur.execute("""
+                SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+                FROM pg_index i
+                WHERE i.indrelid::regclass::text = ANY(%s)
+                  AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+            """, (tables,))
+            indexes = cur.fetchall()
+            for table, name, _ in foreign_keys:
+                cur.execute(f'ALTER TABLE {table} DROP CONSTRAINT {name}')
+            for name, _ in indexes:
+                cur.execute(f'DROP INDEX {name}')
+            # Indexes of partitioned tables are reported as "ON ONLY table", which would not cascade to the partitions
+            cur.executemany('INSERT INTO odbudowa_schematu (kind, name, statement) VALUES (%s, %s, %s)',
+                            [('index', name, definition.replace(' ON ONLY ', ' ON ')) for name, definition in indexes]
+                            + [('foreign_key', name, f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}')
+                               for table, name, definition in foreign_keys])
+            # Indexes first: a foreign key of an earlier load may need one of them
+            cur.execute("SELECT kind, name, statement FROM odbudowa_schematu ORDER BY kind = 'foreign_key', seq")
+            statements = cur.fetchall()
+        return statements
+
+    def _rebuild_constraints_and_indexes(self, statements):
+        """
+        Recreates the foreign keys and indexes dropped by _drop_constraints_and_indexes
+        (skipping those that exist again) in one transaction, and removes their saved
+        definitions. If that fails, e.g. because a partially loaded table violates a
+        foreign key, the definitions stay saved for the next load.
+        Returns whether the rebuild succeeded.
+        """
+        try:
+            with self.connection() as conn, conn.cursor() as cur:
+                for kind, name, statement in statements:
+                    if kind == 'index':
+                        cur.execute('SELECT to_regclass(%s) IS NOT NULL', (name,))
+                    else:
+                        cur.execute("SELECT EXISTS (SELECT 1 FROM pg_constraint WHERE contype = 'f' AND conname = %s)",
+                                    (name,))
+                    if not cur.fetchone()[0]:
+                        cur.execute(statement)
+                cur.execute('DELETE FROM odbudowa_schematu')
+            return True
+        except psycopg.Error as e:
+            print(f"Error rebuilding indexes and foreign keys, their definitions are kept "
+                  f"in odbudowa_schematu for the next import: {e}")
+            return False
+
+    def import_from_csv_parallel(self, workers=4, split_size=64 << 20):
+        """
+        Imports data from CSV files using several COPY streams at the same time.
+        Tables are loaded in stages (LOAD_STAGES): independent tables load in parallel
+        on separate connections, dependent tables follow in foreign key order.
+        CSV files of SPLITTABLE_TABLES larger than split_size bytes are split
+        at line boundaries and loaded by parallel COPY workers.
+        Foreign keys and secondary indexes are dropped for the load and built afterwards,
+        then sequences are reset and statistics refreshed.
+        Unlike import_from_csv the load is not a single transaction: after an error
+        the tables may be partially loaded and the import should be repeated. The dropped
+        foreign keys and indexes are rebuilt after an error too; if the partial data does
+        not allow that, their definitions are kept and the repeated import rebuilds them.
+        :param workers: Maximum number of concurrent COPY connections.
+        :param split_size: File size in bytes above which a file is split between workers.
+        """
+        if not (self.conn and not self.conn.closed):
+            print("Skipped PostgreSQL import (no connection).")
+            return
+        try:
+            with self._operation('import_from_csv_parallel') as op:
+                with self.connection() as conn, conn.cursor() as cur:
+                    print("Clearing tables and resetting sequences...")
+                    cur.execute(f"TRUNCATE TABLE {', '.join(TABLE_COLUMNS)} RESTART IDENTITY CASCADE;")
+                rebuild_statements = self._drop_constraints_and_indexes()
+
+                try:
+                    with ThreadPoolExecutor(max_workers=workers) as pool:
+                        for stage in LOAD_STAGES:
+                            tasks = []
+                            for table in stage:
+                                path = f'{table}.csv'
+                                parts = 1
+                                if table in SPLITTABLE_TABLES and os.path.getsize(path) > split_size:
+                                    parts = workers
+                                for i, (start, end) in enumerate(self._split_csv(path, parts)):
+                                    tasks.append(pool.submit(self._copy_csv_part, table, path, start, end, i == 0))
+                            for task in tasks:
+                                rows, size = task.result()
+                                op['rows'] += rows
+                                op['bytes'] += size
+                            print(f"Imported data into {', '.join(stage)}.")
+                finally:
+                    print("Rebuilding indexes and foreign keys...")
+                    rebuilt = self._rebuild_constraints_and_indexes(rebuild_statements)
+                if not rebuilt:
+                    return
+
+                with self.connection() as conn, conn.cursor() as cur:
+                    self._split_default_partitions(cur)
+                    self._reset_sequences(cur)
+                    for table in TABLE_COLUMNS:
+                        cur.execute(f"ANALYZE {table}")
+            print("Data imported successfully from CSV (parallel).")
+        except psycopg.Error as e:
+            print(f"PostgreSQL error during parallel CSV import: {e}")
+        except FileNotFoundError as e:
+            print(f"Error: CSV file not found: {e}")
+        except Exception as e:
+            print(f"General error during parallel CSV import: {e}")
+
+    def _reset_sequences(self, cur):
+        """
+        Moves the id sequence of every table past its largest id,
+        so rows loaded with explicit ids do not collide with later inserts.
+        """
+        for table in TABLE_COLUMNS:
+            cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                        f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)")
+
+    def _snapshot_part(self, table, snapshot, path, id_range):
+        """
+        Streams one id range of a table with binary COPY TO STDOUT into a file on its own
+        connection, reading the snapshot exported by snapshot(). Returns the numbers of rows and bytes.
+        """
+        with self._connect() as conn:
+            conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+            conn.read_only = True
+            with conn.cursor() as cur, open(path, 'wb') as f:
+                cur.execute(f"SET TRANSACTION SNAPSHOT '{snapshot}'")
+                with cur.copy(f"COPY (SELECT {', '.join(TABLE_COLUMNS[table])} FROM {table} "
+                              f"WHERE id BETWEEN %s AND %s) TO STDOUT (FORMAT BINARY)", id_range) as copy:
+                    for data in copy:
+                        f.write(data)
+                rows = cur.rowcount
+            conn.rollback()
+        return rows, os.path.getsize(path)
+
+    def snapshot(self, directory='snapshot', workers=4, part_rows=SNAPSHOT_PART_ROWS):
+        """
+        Saves a consistent copy of the data of all tables to a snapshot directory with binary
+        COPY TO STDOUT, restorable with restore(). Every table is split by id into files of at
+        most part_rows ids (<table>.<n>.bin), which are written in parallel on separate
+        connections; all of them read one snapshot exported by a coordinating transaction.
+        Binary COPY needs no text conversion, but the files can only be loaded into tables
+        with the same column types. A manifest.json with the files is written last.
+        :return: The manifest dictionary.
+        """
+        os.makedirs(directory, exist_ok=True)
+        start = time.perf_counter()
+        with self._operation('snapshot') as op, self._connect() as coordinator:
+            coordinator.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+            coordinator.read_only = True
+            snapshot = coordinator.execute("SELECT pg_export_snapshot()").fetchone()[0]
+            parts = {}
+            for table in TABLE_COLUMNS:
+                low, high = coordinator.execute(f'SELECT MIN(id), MAX(id) FROM {table}').fetchone()
+                parts[table] = [(first, min(first + part_rows - 1, high))
+                                for first in range(low, high + 1, part_rows)] if low is not None else []
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                tasks = {table: [(f'{table}.{n}.bin', pool.submit(self._snapshot_part, table, snapshot,
+                                                                  os.path.join(directory, f'{table}.{n}.bin'), id_range))
+                                 for n, id_range in enumerate(table_parts)]
+                         for table, table_parts in parts.items()}
+                files = {table: [] for table in tasks}
+                for table, table_tasks in tasks.items():
+                    for name, task in table_tasks:
+                        rows, size = task.result()
+                        files[table].append({'file': name, 'rows': rows, 'bytes': size})
+            coordinator.rollback()
+            op['rows'] = sum(f['rows'] for table_files in files.values() for f in table_files)
+            op['bytes'] = sum(f['bytes'] for table_files in files.values() for f in table_files)
+        manifest = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'backend': 'postgresql',
+            'format': 'binary',
+            'server_version': self.conn.info.server_version,
+            'tables': {table: {'columns': list(TABLE_COLUMNS[table]),
+                               'types': list(TABLE_TYPES[table]),
+                               'rows': sum(f['rows'] for f in files[table]),
+                               'files': files[table]}
+                       for table in TABLE_COLUMNS},
+        }
+        with open(os.path.join(directory, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=4)
+        print(f"Snapshot saved to {directory} in {time.perf_counter() - start:.2f} s.")
+        return manifest
+
+    def _restore_part(self, table, path):
+        """
+        Loads one snapshot file into a table with binary COPY FROM STDIN on its own connection.
+        Returns the numbers of loaded rows and bytes.
+        """
+        with self._connect() as conn, conn.cursor() as cur:
+            with open(path, 'rb') as f:
+                with cur.copy(f"COPY {table} ({', '.join(TABLE_COLUMNS[table])}) FROM STDIN (FORMAT BINARY)") as copy:
+                    self._stream_to_copy(f, copy)
+            rows = cur.rowcount
+        return rows, os.path.getsize(path)
+
+    def restore(self, directory='snapshot', workers=4):
+        """
+        Replaces the data of all tables with a snapshot saved by snapshot(). The tables are
+        truncated, foreign keys and secondary indexes dropped, and all snapshot files loaded
+        at the same time with binary COPY FROM STDIN on up to workers connections; then
+        the indexes and foreign keys are rebuilt (which also validates the references),
+        sequences reset, statistics and existing summary views refreshed.
+        Like import_from_csv_parallel the load is not a single transaction: after an error
+        the tables may be partially loaded and the restore should be repeated. The foreign
+        keys and indexes are rebuilt after an error too, or their saved definitions are
+        rebuilt by the repeated restore (see _drop_constraints_and_indexes).
+        :return: Dictionary {table: number of rows}.
+        """
+        with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        for table, entry in manifest['tables'].items():
+            if entry['columns'] != list(TABLE_COLUMNS[table]) or entry['types'] != list(TABLE_TYPES[table]):
+                raise ValueError(f"Snapshot table {table} does not match the current table definition.")
+        try:
+            start = time.perf_counter()
+            restored = {}
+            with self._operation('restore') as op:
+                with self.connection() as conn, conn.cursor() as cur:
+                    cur.execute(f"TRUNCATE TABLE {', '.join(TABLE_COLUMNS)} RESTART IDENTITY CASCADE;")
+                rebuild_statements = self._drop_constraints_and_indexes()
+
+                try:
+                    # Without foreign keys the tables do not depend on each other, so every file loads at once
+                    with ThreadPoolExecutor(max_workers=workers) as pool:
+                        tasks = [(table, pool.submit(self._restore_part, table, os.path.join(directory, f['file'])))
+                                 for table, entry in manifest['tables'].items() for f in entry['files']]
+                        for table, task in tasks:
+                            rows, size = task.result()
+                            restored[table] = restored.get(table, 0) + rows
+                            op['rows'] += rows
+                            op['bytes'] += size
+                finally:
+                    rebuilt = self._rebuild_constraints_and_indexes(rebuild_statements)
+                if not rebuilt:
+                    return None
+                with self.connection() as conn, conn.cursor() as cur:
+                    self._split_default_partitions(cur)
+                    self._reset_sequences(cur)
+                    for table in TABLE_COLUMNS:
+                        cur.execute(f"ANALYZE {table}")
+                    cur.execute('SELECT matviewname FROM pg_matviews WHERE matviewname = ANY(%s)', (list(SUMMARY_VIEWS),))
+                    for (name,) in cur.fetchall():
+                        cur.execute(f'REFRESH MATERIALIZED VIEW {name}')
+            if self.catalog_cache is not None:
+                self.catalog_cache.clear()
+            print(f"Snapshot restored from {directory} in {time.perf_counter() - start:.2f} s.")
+            return restored
+        except psycopg.Error as e:
+            print(f"PostgreSQL error during snapshot restore: {e}")
+        except Exception as e:
+            print(f"General error during snapshot restore: {e}")
+
+    @staticmethod
+    def _binary_column(values, pg_type):
+        """
+        Converts one column to the Python objects expected by the binary dumper
+        of its declared type (int, Decimal, date or str), keeping nulls as None.
+        """
+        values = pd.Series(values)
+        nulls = values.isna().to_numpy()
+        if pg_type == 'int4':
+            column = values.fillna(0).astype('int64').tolist()
+        elif pg_type == 'numeric':
+            column = list(map(Decimal, np.char.mod('%.2f', values.fillna(0).astype(float).to_numpy())))
+        elif pg_type == 'date':
+            column = list(map(date.fromisoformat, values.fillna('1970-01-01').astype(str).tolist()))
+        else:
+            column = values.astype(object).tolist()
+        for i in np.flatnonzero(nulls):
+            column[i] = None
+        return column
+
+    def copy_rows_binary(self, cur, table, data, into=None):
+        """
+        Streams rows straight into COPY ... FROM STDIN (FORMAT BINARY) with declared column types.
+        :param cur: Cursor of the connection (and transaction) to load with.
+        :param table: Table name, a key of TABLE_COLUMNS.
+        :param data: A DataFrame or a list of dicts with the table columns.
+        :param into: Table to load into instead of table (e.g. a staging table with the same columns).
+        :return: Number of rows written.
+        """
+        df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(list(data), columns=TABLE_COLUMNS[table])
+        columns = [self._binary_column(df[name], pg_type)
+                   for name, pg_type in zip(TABLE_COLUMNS[table], TABLE_TYPES[table])]
+        # The queued writer sends data from a separate thread, overlapping network I/O with row formatting
+        with cur.copy(f"COPY {into or table} ({', '.join(TABLE_COLUMNS[table])}) FROM STDIN (FORMAT BINARY)",
+                      writer=QueuedLibpqWriter(cur)) as copy:
+            copy.set_types(list(TABLE_TYPES[table]))
+            for row in zip(*columns):
+                copy.write_row(row)
+        return len(df)
+
+    def import_binary(self, chunks, truncate=True):
+        """
+        Loads data from Python objects using binary COPY, skipping the CSV files.
+        Accepts (table_name, DataFrame) chunks from generate_scaled_data, or tables
+        as lists of dicts, e.g. zip(TABLE_COLUMNS, self.generate_test_data()).
+        The whole load runs in one transaction.
+        :param truncate: Empty the tables and reset sequences before loading.
+        """
+        if not (self.conn and not self.conn.closed):
+            print("Skipped PostgreSQL import (no connection).")
+            return
+        try:
+            rows = {}
+            with self._operation('import_binary') as op, self.connection() as conn, conn.cursor() as cur:
+                if truncate:
+                    cur.execute(f"TRUNCATE TABLE {', '.join(TABLE_COLUMNS)} RESTART IDENTITY CASCADE;")
+                partitioned = self._partitioned_tables(cur)
+                for table, data in chunks:
+                    if table in partitioned:
+                        self._create_partitions_for(cur, table, data)
+                    rows[table] = rows.get(table, 0) + self.copy_rows_binary(cur, table, data)
+                self._reset_sequences(cur)
+                op['rows'] = sum(rows.values())
+            print(f"Data imported with binary COPY: {rows}")
+            return rows
+        except psycopg.Error as e:
+            print(f"PostgreSQL error during binary import: {e}")
+
+    def _parquet_schema(self, table):
+        """
+        Arrow schema of a table for the Parquet files (types follow TABLE_TYPES).
+        """
+        arrow_types = {'int4': pa.int32(), 'varchar': pa.string(), 'text': pa.string(),
+                       'numeric': pa.decimal128(10, 2), 'date': pa.date32()}
+        return pa.schema([(name, arrow_types[pg_type])
+                          for name, pg_type in zip(TABLE_COLUMNS[table], TABLE_TYPES[table])])
+
+    def export_to_parquet(self, directory='.', batch_size=100_000, compression='zstd'):
+        """
+        Exports every table to a Parquet file (<directory>/<table>.parquet). Rows are read
+        with a server-side cursor in batches of batch_size, and every batch is written as
+        one compressed row group, so memory use does not depend on the table size.
+        :param compression: Parquet codec ('zstd', 'snappy', 'gzip' or None).
+        :return: Dictionary {table: number of rows}.
+        """
+        if pa is None:
+            raise RuntimeError("The Parquet export requires the 'pyarrow' package.")
+        os.makedirs(directory, exist_ok=True)
+        rows = {}
+        with self._operation('export_to_parquet') as op, self.connection() as conn:
+            for table, columns in TABLE_COLUMNS.items():
+                schema = self._parquet_schema(table)
+                rows[table] = 0
+                with conn.cursor(name=f'parquet_{table}') as cur, \
+                        pq.ParquetWriter(os.path.join(directory, f'{table}.parquet'), schema,
+                                         compression=compression) as writer:
+                    cur.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id")
+                    while batch := cur.fetchmany(batch_size):
+                        writer.write_table(pa.Table.from_arrays(
+                            [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)],
+                            schema=schema))
+                        rows[table] += len(batch)
+                conn.rollback()
+                op['bytes'] += os.path.getsize(os.path.join(directory, f'{table}.parquet'))
+            op['rows'] = sum(rows.values())
+        print(f"Data exported to Parquet: {rows}")
+        return rows
+
+    def import_from_parquet(self, directory='.', batch_size=100_000, truncate=True):
+        """
+        Imports the Parquet files written by export_to_parquet (of either backend) with
+        COPY, in one transaction. Files are read in record batches of at most batch_size
+        rows; columns are cast to the types of TABLE_TYPES (e.g. double prices from SQLite
+        to DECIMAL(10,2)) and each batch is formatted as CSV by Arrow, so rows never pass
+        through Python objects.
+        :param truncate: Empty the tables and reset sequences before loading.
+        :return: Dictionary {table: number of rows}.
+        """
+        if pa is None:
+            raise RuntimeError("The Parquet import requires the 'pyarrow' package.")
+        rows = {}
+        with self._operation('import_from_parquet') as op, self.connection() as conn:
+            with conn.transaction(), conn.cursor() as cur:
+                if truncate:
+                    cur.execute(f"TRUNCATE TABLE {', '.join(TABLE_COLUMNS)} RESTART IDENTITY CASCADE;")
+                partitioned = self._partitioned_tables(cur)
+                for table, columns in TABLE_COLUMNS.items():
+                    path = os.path.join(directory, f'{table}.parquet')
+                    if not os.path.exists(path):
+                        continue
+                    schema = self._parquet_schema(table)
+                    rows[table] = 0
+                    op['bytes'] += os.path.getsize(path)
+                    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=list(columns)):
+                        arrays = []
+                        for name, field in zip(columns, schema):
+                            column = batch.column(name)
+                            if pa.types.is_floating(column.type) and pa.types.is_decimal(field.type):
+                                column = pc.round(column, 2)
+                            arrays.append(column.cast(field.type, safe=False))
+                        if table in partitioned:
+                            key = PARTITION_KEYS[table]
+                            self._create_partitions_for(cur, table, {key: arrays[columns.index(key)].to_pylist()})
+                        buffer = pa.BufferOutputStream()
+                        pa_csv.write_csv(pa.RecordBatch.from_arrays(arrays, schema=schema), buffer,
+                                         pa_csv.WriteOptions(include_header=False))
+                        with cur.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN (FORMAT CSV)") as copy:
+                            copy.write(buffer.getvalue())
+                        rows[table] += batch.num_rows
+                self._reset_sequences(cur)
+            op['rows'] = sum(rows.values())
+        print(f"Data imported from Parquet: {rows}")
+        return rows
+
+    def _stage_tables(self, cur, tables):
+        """
+        Creates empty temporary staging tables (staging_<table>) with the columns of the given tables,
+        dropped at the end of the transaction.
+        """
+        for table in tables:
+            cur.execute(f'CREATE TEMP TABLE staging_{table} (LIKE {table}) ON COMMIT DROP')
+
+    def _apply_staged(self, cur, tables):
+        """
+        Compares the staging tables with the target tables by id and the whole row,
+        and applies only the differences: new and changed rows as one INSERT ... ON CONFLICT
+        per table (parents first), then deletes of rows missing from the staging tables
+        (children first). Unchanged rows are neither written nor locked.
+        :return: Dictionary {table: {'inserted': n, 'updated': n, 'deleted': n}}.
+        """
+        stats = {}
+        partitioned = self._partitioned_tables(cur)
+        for table in tables:
+            cur.execute(f'ANALYZE staging_{table}')
+        for table in [t for t in TABLE_COLUMNS if t in tables]:
+            columns = TABLE_COLUMNS[table]
+            target_row = ', '.join(f't.{c}' for c in columns)
+            staged_row = ', '.join(f's.{c}' for c in columns)
+            conflict_key = 'id'
+            moved = 0
+            if table in partitioned:
+                # The primary key includes the partition key: a row whose date changed
+                # is deleted from its old partition and inserted into the new one
+                conflict_key = f'id, {PARTITION_KEYS[table]}'
+                cur.execute(f'DELETE FROM {table} t USING staging_{table} s '
+                            f'WHERE s.id = t.id AND s.{PARTITION_KEYS[table]} <> t.{PARTITION_KEYS[table]}')
+                moved = cur.rowcount
+            cur.execute(f'''
+                WITH changed AS (
+                    SELECT {staged_row}, t.id IS NULL AS is_new
+                    FROM staging_{table} s LEFT JOIN {table} t ON t.id = s.id
+                    WHERE t.id IS NULL OR ({target_row}) IS DISTINCT FROM ({staged_row})
+                ), upserted AS (
+                    INSERT INTO {table} ({', '.join(columns)})
+                    SELECT {', '.join(columns)} FROM changed
+                    ON CONFLICT ({conflict_key}) DO UPDATE SET {', '.join(f'{c} = EXCLUDED.{c}' for c in columns[1:])}
+                )
+                SELECT COUNT(*) FILTER (WHERE is_new), COUNT(*) FILTER (WHERE NOT is_new) FROM changed
+            ''')
+            inserted, updated = cur.fetchone()
+            stats[table] = {'inserted': inserted - moved, 'updated': updated + moved, 'deleted': 0}
+        for table in [t for t in reversed(TABLE_COLUMNS) if t in tables]:
+            cur.execute(f'DELETE FROM {table} t WHERE NOT EXISTS (SELECT 1 FROM staging_{table} s WHERE s.id = t.id)')
+            stats[table]['deleted'] = cur.rowcount
+        self._split_default_partitions(cur)
+        self._reset_sequences(cur)
+        return stats
+
+    def sync_chunks(self, chunks):
+        """
+        Delta import of (table_name, DataFrame) chunks, e.g. from generate_scaled_data:
+        the data is loaded with binary COPY into staging tables and only new, changed
+        and deleted rows are applied (see _apply_staged), in one transaction.
+        Tables absent from chunks are left untouched.
+        :return: Dictionary {table: {'inserted': n, 'updated': n, 'deleted': n}}.
+        """
+        with self._operation('sync_chunks') as op, self.connection() as conn:
+            with conn.transaction(), conn.cursor() as cur:
+                staged = []
+                for table, data in chunks:
+                    if table not in staged:
+                        self._stage_tables(cur, [table])
+                        staged.append(table)
+                    op['rows'] += self.copy_rows_binary(cur, table, data, into=f'staging_{table}')
+                stats = self._apply_staged(cur, staged)
+        print(f"Delta import: {stats}")
+        return stats
+
+    def sync_from_csv(self):
+        """
+        Delta import of the CSV files written by export_data_to_csv / export_chunks_to_csv
+        (the same files import_from_csv reads): each file is streamed with COPY into a
+        staging table and only new, changed and deleted rows are applied, in one transaction.
+        Reload time depends on the number of changes rather than on the size of the tables
+        (apart from reading the files once).
+        :return: Dictionary {table: {'inserted': n, 'updated': n, 'deleted': n}}.
+        """
+        with self._operation('sync_from_csv') as op, self.connection() as conn:
+            with conn.transaction(), conn.cursor() as cur:
+                self._stage_tables(cur, TABLE_COLUMNS)
+                for table, columns in TABLE_COLUMNS.items():
+                    with open(f'{table}.csv', 'rb') as f:
+                        with cur.copy(f"COPY staging_{table} ({', '.join(columns)}) "
+                                      f"FROM STDIN (FORMAT CSV, HEADER TRUE)") as copy:
+                            self._stream_to_copy(f, copy)
+                    op['rows'] += cur.rowcount
+                    op['bytes'] += os.path.getsize(f'{table}.csv')
+                stats = self._apply_staged(cur, list(TABLE_COLUMNS))
+        print(f"Delta import: {stats}")
+        return stats
+
+    def explain(self, sql, params=(), analyze=True):
+        """
+        Returns the query plan as a list of text lines.
+        :param analyze: Use EXPLAIN (ANALYZE, BUFFERS), which executes the query;
+                        otherwise EXPLAIN (COSTS OFF), whose output only changes with the plan shape.
+        """
+        options = '(ANALYZE, BUFFERS) ' if analyze else '(COSTS OFF) '
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f'EXPLAIN {options}{sql}', params)
+                plan = [row[0] for row in cur.fetchall()]
+            conn.rollback() # EXPLAIN ANALYZE executes the statement, which must not change anything
+        return plan
+
+    def run_query_workload(self, queries=None, warmup=3, repetitions=20):
+        """
+        Runs a named query workload (BENCHMARK_QUERIES by default): warmup untimed runs,
+        then repetitions timed runs, each fetching all rows.
+        Returns {name: {'timings_ms': [...], 'rows': n, 'plan': [...], 'plan_analyze': [...]}}.
+        """
+        results = {}
+        with self.connection() as conn, conn.cursor() as cur:
+            for name, (sql, params) in (queries or BENCHMARK_QUERIES).items():
+                for _ in range(warmup):
+                    cur.execute(sql, params)
+                    cur.fetchall()
+                timings = []
+                for _ in range(repetitions):
+                    start = time.perf_counter()
+                    cur.execute(sql, params)
+                    rows = cur.fetchall()
+                    timings.append((time.perf_counter() - start) * 1000)
+                results[name] = {'timings_ms': timings, 'rows': len(rows),
+                                 'plan': self.explain(sql, params, analyze=False),
+                                 'plan_analyze': self.explain(sql, params)}
+        return results
+
+    def dump_table(self, table, batch_size=1000, limit=None, offset=0, after_id=None, out=None, header=True):
+        """
+        Writes the rows of a table in a streaming way: a server-side (named) cursor
+        fetches itersize rows at a time and each batch is written to out in one call
+        and flushed, so memory stays constant and the first rows appear right away.
+        Reads from a replica when replicas are enabled (see read_connection). The cursor
+        lives in its own transaction block (a savepoint if a transaction is already open).
+        Tables outside TABLE_COLUMNS are dumped with all their columns.
+        :param limit: Maximum number of rows (LIMIT/OFFSET pagination together with offset).
+        :param after_id: Keyset pagination: only rows with id > after_id, ordered by id.
+        :param out: Output stream (sys.stdout by default).
+        :param header: Write the column names before the rows.
+        :return: Number of rows written and the id of the last one (to fetch the next page),
+                 None for a table without an id column.
+        """
+        out = out or sys.stdout
+        columns = TABLE_COLUMNS.get(table)
+        sql = f"SELECT {', '.join(columns) if columns else '*'} FROM {table}"
+        params = []
+        if after_id is not None:
+            sql += ' WHERE id > %s'
+            params.append(after_id)
+        if after_id is not None or offset:
+            sql += ' ORDER BY id'
+        if limit is not None:
+            sql += ' LIMIT %s'
+            params.append(limit)
+        if offset:
+            sql += ' OFFSET %s'
+            params.append(offset)
+        count, last_id = 0, None
+        with self.read_connection() as conn:
+            with conn.transaction(), conn.cursor(name=f'dump_{table}') as cur:
+                cur.itersize = batch_size
+                cur.execute(sql, params)
+                names = [desc.name for desc in cur.description]
+                id_index = names.index('id') if 'id' in names else None
+                if header:
+                    out.write(" | ".join(names) + "\n" + "-" * 50 + "\n")
+                while rows := cur.fetchmany(batch_size):
+                    out.write(''.join(' | '.join(str(value) for value in row) + '\n' for row in rows))
+                    out.flush()
+                    count += len(rows)
+                    if id_index is not None:
+                        last_id = rows[-1][id_index]
+        return count, last_id
+
+    def print_all_tables(self, batch_size=1000, limit=None):
         """
         Displays the content of all tables in the PostgreSQL database.
+        Rows are fetched and printed in batches of batch_size (see dump_table).
+        :param limit: Maximum number of rows displayed from each table (None for all).
         """
         try:
             print("\n=== Content of PostgreSQL Tables ===")
-            with self.conn.cursor() as cur:
-                cur.execute("""
-                    SELECT tablename 
-                    FROM pg_tables 
-                    WHERE schemaname = 'public' AND tablename NOT LIKE 'pg_%' AND tablename NOT LIKE 'sql_%'
-                    ORDER BY tablename;
-                """)
-                tables = cur.fetchall()
+            # Partitions are shown through their parent table
+            tables = self._fetch_report("""
+                SELECT c.relname
+                FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+                ORDER BY c.relname;
+            """)
+            
+            for table_name in tables:
+                table = table_name[0]
+                print(f"\nTable: {table}")
+                print("-" * 50)
                 
-                for table_name in tables:
-                    table = table_name[0]
-                    print(f"\nTable: {table}")
-                    print("-" * 50)
-                    
-                    cur.execute(f"SELECT * FROM {table}")
-                    rows = cur.fetchall()
-                    columns = [desc[0] for desc in cur.description]
-                    print(" | ".join(columns))
-                    print("-" * 50)
-                    
-                    for row in rows:
-                        print(" | ".join(str(value) for value in row))
-                    
-                    print(f"\nNumber of rows in table {table}: {len(rows)}")
-                    print("-" * 50)
+                count, _ = self.dump_table(table, batch_size, limit)
+                
+                print(f"\nNumber of rows in table {table}: {count}")
+                print("-" * 50)
         except psycopg.Error as e:
             print(f"PostgreSQL error when displaying tables: {e}")
         except Exception as e:
@@ -332,6 +3077,20 @@ class SklepWedkarskiPostgreSQL:
         """
         Closes the connection to the PostgreSQL database.
         """
+        if self.instrumentation is not None:
+            self.instrumentation.close()
+        if self.replicas is not None:
+            self.replicas.close()
+            for replica in self._replica_pools + [conn for conn in self._replica_conns if conn is not None]:
+                replica.close()
+            self._replica_pools, self._replica_conns = [], []
+        if self.pool is not None:
+            try:
+                self.pool.close()
+                self.pool = None
+                print("Connection pool closed.")
+            except Exception as e:
+                print(f"Error closing PostgreSQL connection pool: {e}")
         if self.conn and not self.conn.closed:
             try:
                 self.conn.close()
@@ -339,6 +3098,639 @@ class SklepWedkarskiPostgreSQL:
             except Exception as e:
                 print(f"Error closing PostgreSQL connection: {e}")
 
+
+class OrderGroupCommitter:
+    """
+    Group commit for order placement: many threads submit single orders, and one
+    writer thread places everything queued so far with place_orders, in one
+    transaction per batch. Under load this turns many small commits into a few
+    larger ones, and the hot product rows are locked by a single writer instead
+    of many competing transactions.
+
+    Usage:
+        committer = OrderGroupCommitter(sklep)
+        zamowienie_id = committer.place_order(1, [(3, 2)])  # from any thread
+        committer.close()
+    """
+    def __init__(self, sklep, max_batch=100, max_delay=0.0):
+        """
+        :param sklep: SklepWedkarskiPostgreSQL whose connection() the writer thread uses.
+        :param max_batch: Maximum number of orders per transaction.
+        :param max_delay: Seconds the writer waits for more orders before committing a batch;
+                          0 commits whatever is queued while the previous batch was being written.
+        """
+        self.sklep = sklep
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.orders = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='order-group-commit', daemon=True)
+        self._thread.start()
+
+    def submit(self, klient_id, pozycje, metoda_platnosci='karta'):
+        """
+        Queues an order and returns a Future resolved with its id (or InsufficientStockError).
+        """
+        future = Future()
+        self._queue.put(((klient_id, pozycje, metoda_platnosci), future))
+        return future
+
+    def place_order(self, klient_id, pozycje, metoda_platnosci='karta'):
+        """
+        Queues an order and waits until its batch is committed. Returns the order id.
+        """
+        return self.submit(klient_id, pozycje, metoda_platnosci).result()
+
+    def _run(self):
+        """
+        Writer thread: collects up to max_batch queued orders and places them in one transaction.
+        """
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                results = self.sklep.place_orders([order for order, _ in batch], return_exceptions=True)
+            except Exception as e:
+                results = [e] * len(batch)
+            self.batches += 1
+            self.orders += len(batch)
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def close(self):
+        """
+        Places the orders still queued and stops the writer thread.
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+
+class AsyncSklepWedkarskiPostgreSQL:
+    """
+    Asynchronous counterpart of SklepWedkarskiPostgreSQL for asyncio applications,
+    built on psycopg's AsyncConnection and psycopg_pool.AsyncConnectionPool.
+    Every method takes a connection from the pool for one unit of work, so
+    concurrent tasks run their queries in parallel up to max_size connections.
+
+    Usage:
+        async with AsyncSklepWedkarskiPostgreSQL(creds) as sklep:
+            await sklep.place_order(1, [(3, 2)])
+    """
+    def __init__(self, creds, min_size=2, max_size=10, timeout=30.0):
+        """
+        :param creds: Dictionary with PostgreSQL credentials, as for SklepWedkarskiPostgreSQL.
+        :param min_size: Number of connections kept open.
+        :param max_size: Maximum number of connections.
+        :param timeout: Seconds to wait for a free connection before raising PoolTimeout.
+        """
+        if AsyncConnectionPool is None:
+            raise RuntimeError("The asynchronous mode requires the 'psycopg_pool' package.")
+        self.creds = creds
+        self.pool = AsyncConnectionPool(
+            make_conninfo(
+                dbname=creds['db_name'],
+                user=creds['user_name'],
+                password=creds['password'],
+                host=creds['host_name'],
+                port=creds['port_number']
+            ),
+            min_size=min_size,
+            max_size=max_size,
+            timeout=timeout,
+            check=AsyncConnectionPool.check_connection,
+            open=False,
+        )
+
+    async def open(self):
+        """
+        Opens the pool and waits until min_size connections are ready.
+        """
+        await self.pool.open(wait=True)
+        print(f"Async connection pool ready ({self.pool.min_size}-{self.pool.max_size} connections).")
+
+    async def close(self):
+        """
+        Closes the pool and all its connections.
+        """
+        await self.pool.close()
+        print("Async connection pool closed.")
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def create_tables(self):
+        """
+        Creates the tables from TABLE_DDL if they do not already exist.
+        """
+        async with self.pool.connection() as conn:
+            for ddl in TABLE_DDL.values():
+                await conn.execute(ddl)
+
+    async def create_indexes(self):
+        """
+        Creates the secondary indexes defined in INDEXES and refreshes planner statistics.
+        """
+        async with self.pool.connection() as conn:
+            for name, definition in INDEXES.items():
+                await conn.execute(f'CREATE INDEX IF NOT EXISTS {name} {definition}')
+            for table in TABLE_COLUMNS:
+                await conn.execute(f'ANALYZE {table}')
+
+    async def create_summary_views(self):
+        """
+        Creates the report summary views from SUMMARY_VIEWS with their indexes.
+        """
+        async with self.pool.connection() as conn:
+            for name, (query, indexes) in SUMMARY_VIEWS.items():
+                await conn.execute(f'CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS {query}')
+                for index in indexes:
+                    await conn.execute(index)
+
+    async def refresh_summaries(self, concurrently=True):
+        """
+        Refreshes the summary views (see SklepWedkarskiPostgreSQL.refresh_summaries).
+        """
+        async with self.pool.connection() as conn:
+            for name in SUMMARY_VIEWS:
+                await conn.execute(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrently else ''}{name}")
+
+    async def import_binary(self, chunks, truncate=True):
+        """
+        Loads (table_name, DataFrame) chunks, e.g. from generate_scaled_data, using binary COPY
+        in one transaction. Taking each chunk from chunks (which may generate it) and converting
+        it to rows run in a worker thread, and the loop yields every ASYNC_COPY_YIELD_ROWS rows
+        while encoding them, so other tasks keep running during the load.
+        :param truncate: Empty the tables and reset sequences before loading.
+        :return: Dictionary {table: number of rows}.
+        """
+        rows = {}
+        chunks = iter(chunks)
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                if truncate:
+                    await cur.execute(f"TRUNCATE TABLE {', '.join(TABLE_COLUMNS)} RESTART IDENTITY CASCADE;")
+                while (chunk := await asyncio.to_thread(self._next_binary_chunk, chunks)) is not None:
+                    table, table_rows = chunk
+                    async with cur.copy(f"COPY {table} ({', '.join(TABLE_COLUMNS[table])}) FROM STDIN (FORMAT BINARY)") as copy:
+                        copy.set_types(list(TABLE_TYPES[table]))
+                        for i, row in enumerate(table_rows, 1):
+                            await copy.write_row(row)
+                            if i % ASYNC_COPY_YIELD_ROWS == 0:
+                                await asyncio.sleep(0) # rows are encoded on the loop; let other tasks run
+                    rows[table] = rows.get(table, 0) + len(table_rows)
+                for table in TABLE_COLUMNS:
+                    await cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                                      f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)")
+        return rows
+
+    @staticmethod
+    def _next_binary_chunk(chunks):
+        """
+        Takes the next (table_name, data) chunk from the chunks iterator and returns
+        (table_name, rows) with values converted for binary COPY, or None after the last chunk.
+        """
+        chunk = next(chunks, None)
+        if chunk is None:
+            return None
+        table, data = chunk
+        df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(list(data), columns=TABLE_COLUMNS[table])
+        columns = [SklepWedkarskiPostgreSQL._binary_column(df[name], pg_type)
+                   for name, pg_type in zip(TABLE_COLUMNS[table], TABLE_TYPES[table])]
+        return table, list(zip(*columns))
+
+    async def place_order(self, klient_id, pozycje, metoda_platnosci='karta'):
+        """
+        Places a customer order in one transaction, reserving stock of the ordered
+        products (see SklepWedkarskiPostgreSQL.place_order).
+        :param pozycje: List of (produkt_id, ilosc) pairs.
+        :return: Id of the new order.
+        :raises InsufficientStockError: A product does not exist or has too little stock.
+        """
+        quantities = _order_quantities(pozycje)
+        ids, amounts = [p for p, _ in quantities], [q for _, q in quantities]
+        async with self.pool.connection() as conn:
+            async with conn.transaction(), conn.cursor() as cur:
+                await cur.execute(STOCK_LOCK_QUERY, (ids,))
+                total = _check_stock(quantities, await cur.fetchall())
+                await cur.execute(STOCK_UPDATE, (ids, amounts))
+                await cur.execute(ORDER_INSERT, (klient_id,))
+                zamowienie_id = (await cur.fetchone())[0]
+                await cur.execute(PAYMENT_INSERT, (zamowienie_id, total, metoda_platnosci))
+        return zamowienie_id
+
+    async def _fetch_report(self, sql, params=()):
+        """
+        Runs a read-only query on a pooled connection.
+        """
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sql, params)
+                return await cur.fetchall()
+
+    async def top_customers(self, limit=10):
+        """
+        Returns the customers with the highest total spend (see SklepWedkarskiPostgreSQL.top_customers).
+        """
+        return await self._fetch_report(REPORT_QUERIES['top_customers'], (limit,))
+
+    async def customer_total_spend(self, klient_id):
+        """
+        Returns the total spend of a customer (0 if there are no payments).
+        """
+        rows = await self._fetch_report(REPORT_QUERIES['customer_total_spend'], (klient_id,))
+        return rows[0][0] if rows else Decimal(0)
+
+    async def revenue_by_month(self, metoda_platnosci=None):
+        """
+        Returns revenue per month, optionally for a single payment method.
+        """
+        return await self._fetch_report(REPORT_QUERIES['revenue_by_month'], {'method': metoda_platnosci})
+
+    async def revenue_by_payment_method(self):
+        """
+        Returns revenue per payment method.
+        """
+        return await self._fetch_report(REPORT_QUERIES['revenue_by_payment_method'])
+
+
+async def _run_concurrent_workload(place_order, customer_total_spend, tasks, operations, num_customers, num_products, seed):
+    """
+    Runs operations split between the given number of concurrent tasks; every task
+    alternates placing an order and reading a customer's total spend.
+    Returns the number of operations per second.
+    """
+    async def worker(task_no, count):
+        rng = random.Random(seed + task_no)
+        for i in range(count):
+            if i % 2 == 0:
+                await place_order(rng.randint(1, num_customers), [(rng.randint(1, num_products), rng.randint(1, 3))])
+            else:
+                await customer_total_spend(rng.randint(1, num_customers))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(t, operations // tasks + (t < operations % tasks)) for t in range(tasks)))
+    return operations / (time.perf_counter() - start)
+
+
+def benchmark_async_concurrency(creds, concurrency=(1, 16, 128), operations=4000, num_orders=100_000, max_size=20, seed=42):
+    """
+    Measures the throughput of AsyncSklepWedkarskiPostgreSQL (operations per second)
+    for the given numbers of concurrent tasks sharing one pool of max_size connections.
+    Half of the operations place an order, the other half read a customer report.
+    Returns a dictionary {number of tasks: operations per second}.
+    """
+    sklep = SklepWedkarskiPostgreSQL(creds)
+    sklep.create_tables()
+    sklep.import_binary(sklep.generate_scaled_data(num_orders=num_orders, seed=seed))
+    sklep.create_indexes()
+    sklep.create_summary_views()
+    sklep.refresh_summaries(concurrently=False)
+    with sklep.conn.cursor() as cur:
+        cur.execute('SELECT (SELECT MAX(id) FROM klienci), (SELECT MAX(id) FROM produkty)')
+        num_customers, num_products = cur.fetchone()
+    sklep.conn.rollback()
+    sklep.close_connection()
+
+    async def run():
+        results = {}
+        async with AsyncSklepWedkarskiPostgreSQL(creds, min_size=max_size, max_size=max_size) as async_sklep:
+            for tasks in concurrency:
+                results[tasks] = await _run_concurrent_workload(
+                    async_sklep.place_order, async_sklep.customer_total_spend,
+                    tasks, operations, num_customers, num_products, seed)
+                print(f"{tasks} tasks: {results[tasks]:.0f} operations/s")
+        return results
+
+    return asyncio.run(run())
+
+
+def benchmark_order_contention(creds, threads=16, orders=4000, hot_products=2, max_batch=100,
+                               num_orders=10_000, seed=42):
+    """
+    Contention benchmark for order placement: threads place single-item orders
+    for only hot_products products, first each order in its own transaction
+    (place_order on a connection pool) and then through OrderGroupCommitter.
+    Checks that the stock decrease matches the ordered quantities.
+    Returns a dictionary {mode: orders per second}.
+    """
+    stock = 10_000_000
+    sklep = SklepWedkarskiPostgreSQL(creds)
+    sklep.create_tables()
+    sklep.import_binary(sklep.generate_scaled_data(num_orders=num_orders, seed=seed))
+    with sklep.conn.cursor() as cur:
+        cur.execute('UPDATE produkty SET stan_magazynowy = %s', (stock,))
+        cur.execute('SELECT MAX(id) FROM klienci')
+        num_customers = cur.fetchone()[0]
+    sklep.conn.commit()
+    sklep.enable_pool(min_size=threads, max_size=threads)
+    committer = OrderGroupCommitter(sklep, max_batch=max_batch)
+
+    def run(place_order):
+        def worker(thread_no):
+            rng = random.Random(seed + thread_no)
+            ordered = 0
+            for _ in range(orders // threads):
+                ilosc = rng.randint(1, 3)
+                place_order(rng.randint(1, num_customers), [(rng.randint(1, hot_products), ilosc)])
+                ordered += ilosc
+            return ordered
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            ordered = sum(executor.map(worker, range(threads)))
+        return (orders // threads) * threads / (time.perf_counter() - start), ordered
+
+    results = {}
+    total_ordered = 0
+    for mode, place_order in (('place_order', sklep.place_order), ('group_commit', committer.place_order)):
+        results[mode], ordered = run(place_order)
+        total_ordered += ordered
+        reserved = sklep._fetch_report('SELECT SUM(%s - stan_magazynowy) FROM produkty', (stock,))[0][0]
+        print(f"{mode}: {results[mode]:.0f} orders/s ({threads} threads, {hot_products} hot products), "
+              f"stock {'consistent' if reserved == total_ordered else 'INCONSISTENT'}")
+    print(f"Group commit: {committer.orders} orders in {committer.batches} transactions.")
+    committer.close()
+    sklep.close_connection()
+    return results
+
+
+def benchmark_partition_pruning(creds, num_orders=1_000_000, repetitions=10, seed=42):
+    """
+    Compares the date-range reports of PARTITION_BENCHMARK_QUERIES on the single-table
+    layout and on the monthly partitioned layout loaded with the same data.
+    Drops and recreates 'zamowienia' and 'platnosci' (and the summary views depending on them).
+    Returns a dictionary {layout: {query: {'median_ms': ..., 'partitions_scanned': ...}}}.
+    """
+    sklep = SklepWedkarskiPostgreSQL(creds)
+    results = {}
+    for layout in ('single', 'partitioned'):
+        with sklep.conn.cursor() as cur:
+            cur.execute('DROP TABLE IF EXISTS platnosci, zamowienia CASCADE')
+        sklep.conn.commit()
+        sklep.create_tables(partitioned=layout == 'partitioned')
+        sklep.import_binary(sklep.generate_scaled_data(num_orders=num_orders, seed=seed))
+        sklep.create_indexes()
+        results[layout] = {}
+        for name, (sql, params) in PARTITION_BENCHMARK_QUERIES.items():
+            plan = sklep.explain(sql, params, analyze=False)
+            scanned = sum(1 for line in plan if ' on zamowienia' in line or ' on platnosci' in line)
+            timings = []
+            with sklep.conn.cursor() as cur:
+                cur.execute(sql, params) # warm-up
+                cur.fetchall()
+                for _ in range(repetitions):
+                    start = time.perf_counter()
+                    cur.execute(sql, params)
+                    cur.fetchall()
+                    timings.append((time.perf_counter() - start) * 1000)
+            sklep.conn.rollback()
+            results[layout][name] = {'median_ms': float(np.median(timings)), 'partitions_scanned': scanned}
+            print(f"{layout:<12} {name:<28} {results[layout][name]['median_ms']:8.2f} ms, "
+                  f"{scanned} table(s)/partition(s) scanned")
+    sklep.close_connection()
+    return results
+
+
+def benchmark_product_search(creds, num_products=1_000_000, repetitions=20, seed=42):
+    """
+    Compares product searches with LIKE against the search indexes (search_products,
+    search_products_by_prefix) on a catalog of num_products products. Reloads the tables
+    with products only. For each pair reports the median time and the number of rows
+    found - LIKE misses the spellings without Polish letters.
+    Returns a dictionary {name: {'like_ms', 'like_rows', 'search_ms', 'search_rows'}}.
+    """
+    sklep = SklepWedkarskiPostgreSQL(creds)
+    sklep.create_tables()
+    sklep.create_indexes()
+    # Built after the load, as the index creation time is reported
+    with sklep.conn.cursor() as cur:
+        cur.execute('ALTER TABLE produkty DROP COLUMN IF EXISTS wyszukiwanie')
+        for name in (*SEARCH_INDEXES, TRIGRAM_INDEX[0]):
+            cur.execute(f'DROP INDEX IF EXISTS {name}')
+    sklep.conn.commit()
+    # Categories and products only - the generator does not need to build customers and orders
+    sklep.import_binary(takewhile(lambda chunk: chunk[0] in ('kategorie', 'produkty'),
+                                  sklep.generate_scaled_data(num_orders=num_products, seed=seed, orders_per_product=1)))
+    start = time.perf_counter()
+    sklep.create_search_index()
+    print(f"Search indexes created in {time.perf_counter() - start:.2f} s.")
+    columns = 'id, nazwa, opis, cena, stan_magazynowy, kategoria_id'
+    cases = {
+        'word_in_name_or_description': (
+            f"SELECT {columns} FROM produkty WHERE nazwa ILIKE %s OR opis ILIKE %s LIMIT 20", ('%kołowrotek%',) * 2,
+            lambda: sklep.search_products('kołowrotek')),
+        'without_polish_letters': (
+            f"SELECT {columns} FROM produkty WHERE nazwa ILIKE %s OR opis ILIKE %s LIMIT 20", ('%zylka%',) * 2,
+            lambda: sklep.search_products('zylka')),
+        'two_selective_words': (
+            f"SELECT {columns} FROM produkty WHERE nazwa ILIKE %s AND nazwa ILIKE %s LIMIT 20", ('%Żyłka%', '%#4242%'),
+            lambda: sklep.search_products('żyłka 4242')),
+        'name_prefix': (
+            f"SELECT {columns} FROM produkty WHERE nazwa LIKE %s LIMIT 20", ('Koł%',),
+            lambda: sklep.search_products_by_prefix('koł')),
+    }
+
+    def measure(function):
+        function() # warm-up
+        timings = []
+        for _ in range(repetitions):
+            start = time.perf_counter()
+            rows = function()
+            timings.append((time.perf_counter() - start) * 1000)
+        return float(np.median(timings)), len(rows)
+
+    results = {}
+    for name, (sql, params, search) in cases.items():
+        like_ms, like_rows = measure(lambda: sklep._fetch_report(sql, params))
+        search_ms, search_rows = measure(search)
+        results[name] = {'like_ms': like_ms, 'like_rows': like_rows, 'search_ms': search_ms, 'search_rows': search_rows}
+        print(f"{name:<28} LIKE {like_ms:8.2f} ms ({like_rows} rows)   index {search_ms:8.2f} ms ({search_rows} rows)")
+    sklep.close_connection()
+    return results
+
+def benchmark_binary_copy(creds, num_orders=1_000_000):
+    """
+    Compares loading a generated dataset through CSV files
+    (export_chunks_to_csv + import_from_csv) with import_binary, which
+    streams the same chunks straight into binary COPY.
+    Returns a dictionary {method: time in seconds}.
+    """
+    sklep = SklepWedkarskiPostgreSQL(creds)
+    sklep.create_tables()
+    results = {}
+
+    start = time.perf_counter()
+    sklep.export_chunks_to_csv(sklep.generate_scaled_data(num_orders=num_orders))
+    sklep.import_from_csv()
+    results['csv'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sklep.import_binary(sklep.generate_scaled_data(num_orders=num_orders))
+    results['binary'] = time.perf_counter() - start
+
+    sklep.close_connection()
+    for method, seconds in results.items():
+        print(f"{method}: {seconds:.2f} s for {num_orders} orders")
+    return results
+
+
+def benchmark_read_replicas(creds, replicas, readers=4, writers=4, duration=10.0, num_orders=100_000,
+                            max_lag=2.0, seed=42):
+    """
+    Mixed workload on the primary alone and with read replicas: writers place orders
+    on the primary while readers run the customer spend report (BENCHMARK_QUERIES
+    'suma_zakupow') through _fetch_report, for duration seconds each. Then checks the lag
+    fallback: replay on the first replica is paused (pg_wal_replay_pause, which needs
+    superuser rights on the replica), reads must avoid it once it is more than max_lag
+    seconds behind, and it must be used again after replay resumes.
+    :param replicas: Connection strings or dictionaries like creds of streaming replicas of creds.
+    Returns a dictionary {mode: {'orders_per_s': ..., 'reads_per_s': ..., 'read_p50_ms': ...}}.
+    """
+    stock = 10_000_000
+    setup = SklepWedkarskiPostgreSQL(creds)
+    setup.create_tables()
+    setup.create_indexes()
+    setup.import_binary(setup.generate_scaled_data(num_orders=num_orders, seed=seed))
+    setup.create_summary_views()
+    with setup.conn.cursor() as cur:
+        cur.execute('UPDATE produkty SET stan_magazynowy = %s', (stock,))
+        cur.execute('SELECT MAX(id) FROM klienci')
+        num_customers = cur.fetchone()[0]
+        cur.execute('SELECT MAX(id) FROM produkty')
+        num_products = cur.fetchone()[0]
+        for table in TABLE_COLUMNS:
+            cur.execute(f'ANALYZE {table}')
+    setup.conn.commit()
+    setup.close_connection()
+    report_sql, report_params = BENCHMARK_QUERIES['suma_zakupow']
+
+    def run(sklep):
+        stop = time.monotonic() + duration
+
+        def writer(thread_no):
+            rng = random.Random(seed + thread_no)
+            orders = 0
+            while time.monotonic() < stop:
+                sklep.place_order(rng.randint(1, num_customers), [(rng.randint(1, num_products), 1)])
+                orders += 1
+            return orders
+
+        def reader(_):
+            timings = []
+            while time.monotonic() < stop:
+                start = time.perf_counter()
+                sklep._fetch_report(report_sql, report_params)
+                timings.append((time.perf_counter() - start) * 1000)
+            return timings
+
+        with ThreadPoolExecutor(max_workers=readers + writers) as executor:
+            written = [executor.submit(writer, i) for i in range(writers)]
+            read = [executor.submit(reader, i) for i in range(readers)]
+            orders = sum(future.result() for future in written)
+            timings = [ms for future in read for ms in future.result()]
+        return {'orders_per_s': orders / duration, 'reads_per_s': len(timings) / duration,
+                'read_p50_ms': float(np.median(timings))}
+
+    results = {}
+    for mode in ('primary', 'replicas'):
+        sklep = SklepWedkarskiPostgreSQL(creds, replicas if mode == 'replicas' else None, max_replica_lag=max_lag)
+        sklep.enable_pool(min_size=readers + writers, max_size=readers + writers)
+        results[mode] = run(sklep)
+        print(f"{mode}: {results[mode]['orders_per_s']:.0f} orders/s, {results[mode]['reads_per_s']:.1f} reports/s, "
+              f"report p50 {results[mode]['read_p50_ms']:.1f} ms")
+        if mode == 'replicas':
+            print(f"Reads per replica: {[r['reads'] for r in sklep.replicas.status()['replicas']]}, "
+                  f"on the primary: {sklep.replicas.status()['primary_fallbacks']}")
+        sklep.close_connection()
+
+    sklep = SklepWedkarskiPostgreSQL(creds, replicas, max_replica_lag=max_lag)
+    paused = sklep._connect(sklep.replicas.conninfos[0])
+    paused.autocommit = True
+    try:
+        paused.execute('SELECT pg_wal_replay_pause()')
+        deadline = time.monotonic() + max_lag + 10
+        while time.monotonic() < deadline:
+            sklep.place_order(1, [(1, 1)])
+            sklep.revenue_by_payment_method()
+            if not sklep.replicas.status()['replicas'][0]['available']:
+                break
+            time.sleep(0.1)
+        lagging = sklep.replicas.status()['replicas'][0]
+        before = lagging['reads']
+        for _ in range(10):
+            sklep.revenue_by_payment_method()
+        avoided = not lagging['available'] and sklep.replicas.status()['replicas'][0]['reads'] == before
+        paused.execute('SELECT pg_wal_replay_resume()')
+        deadline = time.monotonic() + max_lag + 10
+        while time.monotonic() < deadline and not sklep.replicas.status()['replicas'][0]['available']:
+            sklep.replicas.wait_for_check(sklep.replicas.check_interval + REPLICA_CONNECT_TIMEOUT)
+            sklep.revenue_by_payment_method()
+        recovered = sklep.replicas.status()['replicas'][0]['available']
+        results['lag_fallback'] = avoided and recovered
+        print(f"Lagging replica ({lagging['lag_s']:.1f} s behind) {'skipped' if avoided else 'NOT SKIPPED'}, "
+              f"{'back in rotation' if recovered else 'NOT BACK'} after replay resumed.")
+    except psycopg.Error as e:
+        print(f"Lag fallback check skipped: {e}")
+    finally:
+        paused.close()
+        sklep.close_connection()
+    return results
+
+
+def benchmark_snapshot_restore(creds, num_orders=1_000_000, directory='benchmark_snapshot', workers=4, seed=42):
+    """
+    Compares resetting the database by regenerating and reloading the data (create_tables,
+    create_indexes and import_binary) with snapshot() and restore() of the same data.
+    Checks that the restored tables have the same row counts and payment total.
+    Returns a dictionary {step: time in seconds}.
+    """
+    results = {}
+    sklep = SklepWedkarskiPostgreSQL(creds)
+    start = time.perf_counter()
+    sklep.create_tables()
+    sklep.create_indexes()
+    sklep.import_binary(sklep.generate_scaled_data(num_orders=num_orders, seed=seed))
+    results['reload'] = time.perf_counter() - start
+
+    def state():
+        return sklep._fetch_report('SELECT ' + ', '.join(f'(SELECT COUNT(*) FROM {table})' for table in TABLE_COLUMNS)
+                                   + ', (SELECT SUM(kwota) FROM platnosci)')[0]
+
+    expected = state()
+    for step, run in (('snapshot', lambda: sklep.snapshot(directory, workers)),
+                      ('restore', lambda: sklep.restore(directory, workers))):
+        start = time.perf_counter()
+        run()
+        results[step] = time.perf_counter() - start
+    consistent = state() == expected
+    sklep.close_connection()
+    for step, seconds in results.items():
+        print(f"{step}: {seconds:.2f} s")
+    print(f"Restored data {'matches' if consistent else 'DOES NOT MATCH'} ({num_orders} orders).")
+    return results
+
+
 if __name__ == "__main__":
     # Load authentication data from database_creds.json file
     # REMEMBER: This file must exist in the same location as the script
@@ -366,6 +3758,7 @@ if __name__ == "__main__":
     # Create tables
     print("Creating tables...")
     sklep.create_tables()
+    sklep.create_indexes()
     
     # Generate test data
     print("Generating test data...")
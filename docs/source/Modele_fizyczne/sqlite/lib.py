@@ -1,12 +1,1281 @@
- import sqlite3
+import sqlite3
 import pandas as pd
+import asyncio
+import bisect
+import csv
+import gzip
+import io
 import json
+import logging
+import os
+import queue
 import random
-from datetime import datetime, timedelta
+import re
+import sys
+import tempfile
+import threading
+import time
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # pyarrow jest potrzebny tylko do eksportu i importu Parquet
+    pa = pq = None
+try:
+    import zstandard as zstd
+except ImportError: # zstandard jest potrzebny tylko do eksportu CSV z kompresją zstd
+    zstd = None
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager, nullcontext
+from functools import lru_cache, partial
+from itertools import islice, takewhile
+import numpy as np
+from datetime import date, datetime, timedelta
 
-class SklepWedkarskiSQLite:
+# Słowniki używane przez skalowalny generator danych
+STATUSY_ZAMOWIEN = ['nowe', 'w_realizacji', 'zrealizowane']
+METODY_PLATNOSCI = ['przelew', 'karta', 'gotowka']
+IMIONA = ['Jan', 'Anna', 'Piotr', 'Maria', 'Krzysztof', 'Ewa', 'Tomasz', 'Katarzyna',
+          'Andrzej', 'Agnieszka', 'Paweł', 'Magdalena', 'Michał', 'Joanna', 'Marcin', 'Barbara']
+NAZWISKA = ['Kowalski', 'Wiśniewska', 'Nowak', 'Zając', 'Lewandowski', 'Dąbrowska', 'Wójcik',
+            'Kamińska', 'Kowalczyk', 'Zielińska', 'Szymański', 'Woźniak', 'Kozłowski', 'Mazur']
+ULICE = ['Gdańska', 'Krakowska', 'Warszawska', 'Poznańska', 'Wrocławska', 'Łódzka', 'Katowicka',
+         'Lubelska', 'Szczecińska', 'Toruńska', 'Kielecka', 'Opolska']
+# Stała data odniesienia, dzięki której wygenerowane dane są powtarzalne między uruchomieniami
+DATA_ODNIESIENIA = date(2025, 1, 1)
+# Kolumny tabel w kolejności używanej przy wstawianiu wierszy (kolejność tabel zgodna z kluczami obcymi)
+KOLUMNY_TABEL = {
+    'kategorie': ('id', 'nazwa', 'opis'),
+    'produkty': ('id', 'nazwa', 'opis', 'cena', 'stan_magazynowy', 'kategoria_id'),
+    'klienci': ('id', 'imie', 'nazwisko', 'email', 'telefon', 'adres'),
+    'zamowienia': ('id', 'klient_id', 'data_zamowienia', 'status'),
+    'platnosci': ('id', 'zamowienie_id', 'kwota', 'metoda_platnosci', 'data_platnosci'),
+}
+# Typy kolumn powyższych tabel w plikach Parquet (nazwy funkcji typów pyarrow)
+TYPY_PARQUET = {
+    'kategorie': ('int32', 'string', 'string'),
+    'produkty': ('int32', 'string', 'string', 'float64', 'int32', 'int32'),
+    'klienci': ('int32', 'string', 'string', 'string', 'string', 'string'),
+    'zamowienia': ('int32', 'int32', 'date32', 'string'),
+    'platnosci': ('int32', 'int32', 'float64', 'string', 'date32'),
+}
+
+# Profile połączenia: ustawienia PRAGMA dobrane do charakteru obciążenia
+PROFILE_POLACZENIA = {
+    # Jednorazowe ładowanie dużych zbiorów: bez fsync, duży cache, klucze obce sprawdzane po imporcie
+    'bulk_load': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -262144, # 256 MB (wartość ujemna oznacza KiB)
+        'mmap_size': 1 << 30,
+        'temp_store': 'MEMORY',
+        'foreign_keys': 'OFF',
+    },
+    # Wiele krótkich transakcji: WAL pozwala czytać w trakcie zapisu, NORMAL jest bezpieczne w trybie WAL
+    'oltp': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536, # 64 MB
+        'mmap_size': 256 << 20,
+        'temp_store': 'MEMORY',
+        'foreign_keys': 'ON',
+    },
+    # Zapytania raportowe: duży cache i mmap, połączenie tylko do odczytu
+    'read_only_analytics': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -524288, # 512 MB
+        'mmap_size': 2 << 30,
+        'temp_store': 'MEMORY',
+        'foreign_keys': 'ON',
+        'query_only': 'ON',
+    },
+}
+
+# snapshot/restore: liczba stron kopiowanych w jednym kroku backup API; między krokami
+# baza jest dostępna dla innych połączeń
+STRONY_KROKU_KOPII = 4096
+
+# Indeksy pomocnicze (zalecenia z rozdziału 4): nazwa -> definicja po "CREATE INDEX nazwa"
+INDEKSY = {
+    # Klucze obce używane w złączeniach
+    'idx_produkty_kategoria_id': 'ON produkty (kategoria_id)',
+    'idx_zamowienia_klient_id': 'ON zamowienia (klient_id)',
+    # Indeks pokrywający dla sumy zakupów klienta: złączenie i SUM(kwota) bez czytania tabeli
+    'idx_platnosci_zamowienie_kwota': 'ON platnosci (zamowienie_id, kwota)',
+    # Filtry z rozdziału 4
+    'idx_zamowienia_status': 'ON zamowienia (status)',
+    'idx_zamowienia_data': 'ON zamowienia (data_zamowienia)',
+    'idx_produkty_cena': 'ON produkty (cena)',
+    # LIKE 'A%' nie rozróżnia wielkości liter, więc optymalizacja prefiksowa wymaga COLLATE NOCASE
+    'idx_produkty_nazwa': 'ON produkty (nazwa COLLATE NOCASE)',
+    # Indeks częściowy tylko dla otwartych zamówień (zwykle niewielkiej części tabeli)
+    'idx_zamowienia_otwarte': "ON zamowienia (data_zamowienia, klient_id) WHERE status IN ('nowe', 'w_realizacji')",
+}
+
+# Zestaw zapytań z analizy w rozdziale 4 używany w testach wydajności: nazwa -> (SQL, parametry)
+ZAPYTANIA_TESTOWE = {
+    'suma_zakupow': ("""
+        SELECT k.imie || ' ' || k.nazwisko AS nazwa_klienta, SUM(p.kwota) AS suma_zakupow
+        FROM klienci k
+        JOIN zamowienia z ON z.klient_id = k.id
+        JOIN platnosci p ON p.zamowienie_id = z.id
+        GROUP BY k.id
+        ORDER BY suma_zakupow DESC
+        LIMIT 100
+    """, ()),
+    'suma_zakupow_klienta': ("""
+        SELECT SUM(p.kwota)
+        FROM zamowienia z
+        JOIN platnosci p ON p.zamowienie_id = z.id
+        WHERE z.klient_id = ?
+    """, (1,)),
+    'produkty_cena': ('SELECT * FROM produkty WHERE cena > ?', (100,)),
+    'produkty_nazwa_prefiks': ('SELECT * FROM produkty WHERE nazwa LIKE ?', ('A%',)),
+    'zamowienia_status': ('SELECT COUNT(*) FROM zamowienia WHERE status = ?', ('zrealizowane',)),
+    'zamowienia_otwarte_od': ("""
+        SELECT * FROM zamowienia
+        WHERE status IN ('nowe', 'w_realizacji') AND data_zamowienia >= ?
+        ORDER BY data_zamowienia
+        LIMIT 1000
+    """, ('2024-12-01',)),
+}
+
+# Tabele podsumowań dla raportów, utrzymywane przyrostowo przez wyzwalacze
+TABELE_PODSUMOWAN = {
+    'podsumowanie_klientow': '''
+        CREATE TABLE IF NOT EXISTS podsumowanie_klientow (
+            klient_id INTEGER PRIMARY KEY,
+            liczba_platnosci INTEGER NOT NULL,
+            suma_zakupow REAL NOT NULL
+        )
+    ''',
+    'podsumowanie_przychodow': '''
+        CREATE TABLE IF NOT EXISTS podsumowanie_przychodow (
+            miesiac TEXT NOT NULL,
+            metoda_platnosci TEXT NOT NULL,
+            liczba_platnosci INTEGER NOT NULL,
+            suma_kwot REAL NOT NULL,
+            PRIMARY KEY (miesiac, metoda_platnosci)
+        ) WITHOUT ROWID
+    ''',
+}
+# Pełne przeliczenie podsumowań (stan początkowy i odświeżenie po imporcie bez wyzwalaczy)
+PRZELICZENIE_PODSUMOWAN = [
+    'DELETE FROM podsumowanie_klientow',
+    '''
+        INSERT INTO podsumowanie_klientow (klient_id, liczba_platnosci, suma_zakupow)
+        SELECT z.klient_id, COUNT(*), SUM(p.kwota)
+        FROM platnosci p JOIN zamowienia z ON z.id = p.zamowienie_id
+        WHERE z.klient_id IS NOT NULL
+        GROUP BY z.klient_id
+    ''',
+    'DELETE FROM podsumowanie_przychodow',
+    '''
+        INSERT INTO podsumowanie_przychodow (miesiac, metoda_platnosci, liczba_platnosci, suma_kwot)
+        SELECT substr(data_platnosci, 1, 7), metoda_platnosci, COUNT(*), SUM(kwota)
+        FROM platnosci
+        GROUP BY 1, 2
+    ''',
+]
+
+
+def _podsumowania_dodaj(p):
+    """
+    Instrukcje wyzwalacza doliczające płatność (NEW lub OLD jako p) do podsumowań.
+    WHERE w INSERT ... SELECT jest wymagane, aby SQLite poprawnie rozpoznał klauzulę ON CONFLICT.
+    """
+    return f'''
+        INSERT INTO podsumowanie_klientow (klient_id, liczba_platnosci, suma_zakupow)
+        SELECT z.klient_id, 1, {p}.kwota FROM zamowienia z WHERE z.id = {p}.zamowienie_id AND z.klient_id IS NOT NULL
+        ON CONFLICT (klient_id) DO UPDATE SET
+            liczba_platnosci = liczba_platnosci + 1,
+            suma_zakupow = suma_zakupow + excluded.suma_zakupow;
+        INSERT INTO podsumowanie_przychodow (miesiac, metoda_platnosci, liczba_platnosci, suma_kwot)
+        VALUES (substr({p}.data_platnosci, 1, 7), {p}.metoda_platnosci, 1, {p}.kwota)
+        ON CONFLICT (miesiac, metoda_platnosci) DO UPDATE SET
+            liczba_platnosci = liczba_platnosci + 1,
+            suma_kwot = suma_kwot + excluded.suma_kwot;
+    '''
+
+
+def _podsumowania_odejmij(p):
+    """
+    Instrukcje wyzwalacza odejmujące płatność (NEW lub OLD jako p) od podsumowań.
+    """
+    return f'''
+        UPDATE podsumowanie_klientow
+        SET liczba_platnosci = liczba_platnosci - 1, suma_zakupow = suma_zakupow - {p}.kwota
+        WHERE klient_id = (SELECT klient_id FROM zamowienia WHERE id = {p}.zamowienie_id);
+        UPDATE podsumowanie_przychodow
+        SET liczba_platnosci = liczba_platnosci - 1, suma_kwot = suma_kwot - {p}.kwota
+        WHERE miesiac = substr({p}.data_platnosci, 1, 7) AND metoda_platnosci = {p}.metoda_platnosci;
+        DELETE FROM podsumowanie_klientow
+        WHERE klient_id = (SELECT klient_id FROM zamowienia WHERE id = {p}.zamowienie_id) AND liczba_platnosci <= 0;
+        DELETE FROM podsumowanie_przychodow
+        WHERE miesiac = substr({p}.data_platnosci, 1, 7) AND metoda_platnosci = {p}.metoda_platnosci
+              AND liczba_platnosci <= 0;
+    '''
+
+
+WYZWALACZE_PODSUMOWAN = {
+    'trg_podsumowania_platnosci_ai': f'AFTER INSERT ON platnosci BEGIN {_podsumowania_dodaj("NEW")} END',
+    'trg_podsumowania_platnosci_ad': f'AFTER DELETE ON platnosci BEGIN {_podsumowania_odejmij("OLD")} END',
+    'trg_podsumowania_platnosci_au': (f'AFTER UPDATE OF zamowienie_id, kwota, metoda_platnosci, data_platnosci ON platnosci '
+                                      f'BEGIN {_podsumowania_odejmij("OLD")} {_podsumowania_dodaj("NEW")} END'),
+    # Zmiana klienta zamówienia przenosi jego płatności między klientami
+    'trg_podsumowania_zamowienia_au': '''AFTER UPDATE OF klient_id ON zamowienia BEGIN
+        UPDATE podsumowanie_klientow
+        SET liczba_platnosci = liczba_platnosci - (SELECT COUNT(*) FROM platnosci WHERE zamowienie_id = NEW.id),
+            suma_zakupow = suma_zakupow - (SELECT COALESCE(SUM(kwota), 0) FROM platnosci WHERE zamowienie_id = NEW.id)
+        WHERE klient_id = OLD.klient_id;
+        INSERT INTO podsumowanie_klientow (klient_id, liczba_platnosci, suma_zakupow)
+        SELECT NEW.klient_id, COUNT(*), SUM(kwota) FROM platnosci WHERE zamowienie_id = NEW.id AND NEW.klient_id IS NOT NULL
+        GROUP BY zamowienie_id
+        ON CONFLICT (klient_id) DO UPDATE SET
+            liczba_platnosci = liczba_platnosci + excluded.liczba_platnosci,
+            suma_zakupow = suma_zakupow + excluded.suma_zakupow;
+        DELETE FROM podsumowanie_klientow WHERE klient_id = OLD.klient_id AND liczba_platnosci <= 0;
+    END''',
+}
+# Zapytania raportów czytające tabele podsumowań
+ZAPYTANIA_RAPORTOW = {
+    'top_customers': '''
+        SELECT s.klient_id, k.imie, k.nazwisko, s.liczba_platnosci, s.suma_zakupow
+        FROM podsumowanie_klientow s JOIN klienci k ON k.id = s.klient_id
+        ORDER BY s.suma_zakupow DESC
+        LIMIT ?
+    ''',
+    'customer_total_spend': 'SELECT suma_zakupow FROM podsumowanie_klientow WHERE klient_id = ?',
+    'revenue_by_month': '''
+        SELECT miesiac, SUM(liczba_platnosci), SUM(suma_kwot)
+        FROM podsumowanie_przychodow
+        WHERE ? IS NULL OR metoda_platnosci = ?
+        GROUP BY miesiac
+        ORDER BY miesiac
+    ''',
+    'revenue_by_payment_method': '''
+        SELECT metoda_platnosci, SUM(liczba_platnosci), SUM(suma_kwot)
+        FROM podsumowanie_przychodow
+        GROUP BY metoda_platnosci
+        ORDER BY metoda_platnosci
+    ''',
+}
+# Te same raporty liczone wprost z tabel - dla shardów bez tabel podsumowań
+ZAPYTANIA_RAPORTOW_Z_TABEL = {
+    'top_customers': '''
+        SELECT z.klient_id, k.imie, k.nazwisko, COUNT(*), SUM(p.kwota) AS suma_zakupow
+        FROM platnosci p
+        JOIN zamowienia z ON z.id = p.zamowienie_id
+        JOIN klienci k ON k.id = z.klient_id
+        GROUP BY z.klient_id
+        ORDER BY suma_zakupow DESC
+        LIMIT ?
+    ''',
+    'revenue_by_month': '''
+        SELECT substr(data_platnosci, 1, 7), COUNT(*), SUM(kwota)
+        FROM platnosci
+        WHERE ? IS NULL OR metoda_platnosci = ?
+        GROUP BY 1
+        ORDER BY 1
+    ''',
+    'revenue_by_payment_method': '''
+        SELECT metoda_platnosci, COUNT(*), SUM(kwota)
+        FROM platnosci
+        GROUP BY 1
+        ORDER BY 1
+    ''',
+}
+# Tryb shardowany: numer shardu zapisany w każdym pliku i najwyższe id wczytane importem
+INFORMACJE_SHARDU = '''
+    CREATE TABLE IF NOT EXISTS informacje_shardu (
+        numer_shardu INTEGER NOT NULL,
+        liczba_shardow INTEGER NOT NULL,
+        baza_id INTEGER NOT NULL
+    )
+'''
+# Tryb shardowany: dziennik przeniesień stanu magazynowego między shardami. Shard oddający
+# zapisuje przeniesienie w transakcji, w której zmniejsza swój stan, a shard przyjmujący
+# zapisuje jego numer w transakcji, w której go zwiększa, więc przerwane przeniesienie
+# da się dokończyć dokładnie raz (zob. SklepWedkarskiSQLiteShardowany._dokoncz_przeniesienia).
+PRZENIESIENIA_STANU = [
+    '''
+    CREATE TABLE IF NOT EXISTS przeniesienia_stanu (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        produkt_id INTEGER NOT NULL,
+        ilosc INTEGER NOT NULL,
+        do_shardu INTEGER NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS przyjete_przeniesienia (
+        z_shardu INTEGER NOT NULL,
+        przeniesienie_id INTEGER NOT NULL,
+        PRIMARY KEY (z_shardu, przeniesienie_id)
+    )
+    ''',
+]
+
+# Wyszukiwanie produktów: indeks pełnotekstowy FTS5 nazw i opisów z treścią w tabeli produkty.
+# Tokenizator unicode61 z remove_diacritics 2 ignoruje wielkość liter i znaki diakrytyczne,
+# ale "ł" nie ma rozkładu w Unicode, więc tekst jest przed indeksowaniem zamieniany przez BEZ_L
+# (a zapytania przez _tokeny_wyszukiwania).
+BEZ_L = "replace(replace({}, 'ł', 'l'), 'Ł', 'L')"
+INDEKS_WYSZUKIWANIA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS produkty_fts USING fts5(
+    nazwa, opis,
+    content='produkty', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+)
+'''
+WYZWALACZE_WYSZUKIWANIA = {
+    'trg_produkty_fts_ai': f'''
+    AFTER INSERT ON produkty BEGIN
+        INSERT INTO produkty_fts (rowid, nazwa, opis)
+        VALUES (NEW.id, {BEZ_L.format('NEW.nazwa')}, {BEZ_L.format('NEW.opis')});
+    END''',
+    # Indeks z zewnętrzną treścią usuwa wiersz na podstawie wartości, które zostały zaindeksowane
+    'trg_produkty_fts_ad': f'''
+    AFTER DELETE ON produkty BEGIN
+        INSERT INTO produkty_fts (produkty_fts, rowid, nazwa, opis)
+        VALUES ('delete', OLD.id, {BEZ_L.format('OLD.nazwa')}, {BEZ_L.format('OLD.opis')});
+    END''',
+    # Zmiany ceny i stanu magazynowego nie dotykają indeksu
+    'trg_produkty_fts_au': f'''
+    AFTER UPDATE OF id, nazwa, opis ON produkty BEGIN
+        INSERT INTO produkty_fts (produkty_fts, rowid, nazwa, opis)
+        VALUES ('delete', OLD.id, {BEZ_L.format('OLD.nazwa')}, {BEZ_L.format('OLD.opis')});
+        INSERT INTO produkty_fts (rowid, nazwa, opis)
+        VALUES (NEW.id, {BEZ_L.format('NEW.nazwa')}, {BEZ_L.format('NEW.opis')});
+    END''',
+}
+# Pełna odbudowa indeksu (po utworzeniu i po imporcie bez wyzwalaczy)
+PRZEBUDOWA_WYSZUKIWANIA = [
+    "INSERT INTO produkty_fts (produkty_fts) VALUES ('delete-all')",
+    f"INSERT INTO produkty_fts (rowid, nazwa, opis) SELECT id, {BEZ_L.format('nazwa')}, {BEZ_L.format('opis')} FROM produkty",
+]
+# Waga trafień w nazwie względem opisu w rankingu bm25
+WAGA_NAZWY = 10.0
+
+# Zbiór kolumnowy: kolumny kodowane słownikowo i ich słowniki początkowe (kod to indeks na liście)
+KOLUMNY_SLOWNIKOWE = {
+    ('zamowienia', 'status'): STATUSY_ZAMOWIEN,
+    ('platnosci', 'metoda_platnosci'): METODY_PLATNOSCI,
+}
+# Liczba wierszy, które zbiór kolumnowy dekoduje naraz dla funkcji ładujących
+ROZMIAR_PACZKI_ZBIORU = 100_000
+
+# Górne granice (ms) przedziałów histogramu opóźnień; ostatni przedział nie ma górnej granicy
+PRZEDZIALY_OPOZNIEN_MS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10_000, 30_000)
+# Instrukcje, dla których dziennik wolnych zapytań pobiera plan (pozostałe zapisuje bez planu)
+INSTRUKCJE_Z_PLANEM = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'WITH', 'VALUES')
+# Dziennik zmian produktów, z którego pamięć podręczna katalogu odczytuje unieważnienia.
+# SQLite ma jednego piszącego naraz, więc numery seq są nadawane w kolejności zatwierdzania
+# transakcji. Wpis bez produktu (po imporcie z wyłączonymi wyzwalaczami) czyści całą pamięć.
+DZIENNIK_ZMIAN_PRODUKTOW = '''
+    CREATE TABLE IF NOT EXISTS zmiany_produktow (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        produkt_id INTEGER,
+        kategoria_id INTEGER,
+        stara_kategoria_id INTEGER,
+        czas TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+WYZWALACZE_ZMIAN_PRODUKTOW = {
+    'trg_zmiany_produktow_ai': '''AFTER INSERT ON produkty BEGIN
+        INSERT INTO zmiany_produktow (produkt_id, kategoria_id) VALUES (NEW.id, NEW.kategoria_id);
+    END''',
+    # Obejmuje zmiany ceny i stanu magazynowego, ale też pozostałych kolumn zapisanych w pamięci podręcznej
+    'trg_zmiany_produktow_au': '''AFTER UPDATE ON produkty BEGIN
+        INSERT INTO zmiany_produktow (produkt_id, kategoria_id, stara_kategoria_id)
+        VALUES (NEW.id, NEW.kategoria_id, OLD.kategoria_id);
+    END''',
+    'trg_zmiany_produktow_ad': '''AFTER DELETE ON produkty BEGIN
+        INSERT INTO zmiany_produktow (produkt_id, kategoria_id) VALUES (OLD.id, OLD.kategoria_id);
+    END''',
+}
+
+
+class BrakTowaru(ValueError):
+    """
+    Zgłaszany przez place_order, gdy zamówionego produktu nie ma w bazie lub jego stan magazynowy jest za mały.
+    """
+    def __init__(self, produkt_id, ilosc):
+        super().__init__(f"Brak wystarczającej ilości produktu {produkt_id} (zamówiono {ilosc}).")
+        self.produkt_id = produkt_id
+        self.ilosc = ilosc
+
+
+class PamiecPodrecznaKatalogu:
+    """
+    Ograniczona pamięć podręczna LRU z czasem życia wpisów (TTL) i licznikami trafień.
+    Bezpieczna dla wątków. Wartość wczytana w trakcie unieważnienia nie jest zapisywana,
+    więc unieważnienie nigdy nie zostanie nadpisane starszymi danymi.
+    """
+    def __init__(self, max_entries=10_000, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._wpisy = OrderedDict()
+        self._lock = threading.Lock()
+        self._generacja = 0
+        self.trafienia = 0
+        self.chybienia = 0
+        self.usuniete = 0
+        self.uniewaznione = 0
+
+    def get(self, klucz, wczytaj):
+        """
+        Zwraca wartość z pamięci podręcznej, a przy jej braku lub wygaśnięciu wywołuje wczytaj() i ją zapamiętuje.
+        """
+        with self._lock:
+            wpis = self._wpisy.get(klucz)
+            if wpis is not None and wpis[0] > time.monotonic():
+                self._wpisy.move_to_end(klucz)
+                self.trafienia += 1
+                return wpis[1]
+            self.chybienia += 1
+            generacja = self._generacja
+        wartosc = wczytaj()
+        with self._lock:
+            if generacja == self._generacja:
+                self._wpisy[klucz] = (time.monotonic() + self.ttl, wartosc)
+                self._wpisy.move_to_end(klucz)
+                while len(self._wpisy) > self.max_entries:
+                    self._wpisy.popitem(last=False)
+                    self.usuniete += 1
+        return wartosc
+
+    def invalidate(self, *klucze):
+        """
+        Usuwa wskazane wpisy.
+        """
+        with self._lock:
+            self._generacja += 1
+            for klucz in klucze:
+                if self._wpisy.pop(klucz, None) is not None:
+                    self.uniewaznione += 1
+
+    def clear(self):
+        """
+        Usuwa wszystkie wpisy.
+        """
+        with self._lock:
+            self._generacja += 1
+            self.uniewaznione += len(self._wpisy)
+            self._wpisy.clear()
+
+    def stats(self):
+        """
+        Zwraca liczniki pamięci podręcznej.
+        """
+        with self._lock:
+            return {'wpisy': len(self._wpisy), 'trafienia': self.trafienia, 'chybienia': self.chybienia,
+                    'usuniete': self.usuniete, 'uniewaznione': self.uniewaznione}
+
+
+# Literały tekstowe i liczbowe zastępowane w kluczach metryk instrukcji przez '?'
+LITERALY_SQL = re.compile(r"'(?:[^']|'')*'|(?<![\w$])\d+(?:\.\d+)?")
+
+
+@lru_cache(maxsize=1024)
+def _normalizuj_sql(sql):
+    """
+    Zamienia ciągi białych znaków w tekście instrukcji na pojedyncze spacje.
+    """
+    return ' '.join(sql.split())
+
+
+@lru_cache(maxsize=1024)
+def _klucz_instrukcji(sql):
+    """
+    Zwraca klucz metryk instrukcji: tekst bez nadmiarowych spacji, z literałami zastąpionymi
+    przez '?', więc instrukcje różniące się tylko wartościami mają wspólny histogram.
+    """
+    return LITERALY_SQL.sub('?', _normalizuj_sql(sql))
+
+
+def _tokeny_wyszukiwania(fraza):
+    """
+    Dzieli frazę wyszukiwania na słowa (z "ł" zamienionym jak w BEZ_L). Pomija wszystko poza
+    literami i cyframi, więc znaki specjalne składni MATCH we frazie nie są interpretowane.
+    """
+    return re.findall(r'\w+', fraza.replace('ł', 'l').replace('Ł', 'L'))
+
+
+class HistogramOpoznien:
+    """
+    Histogram opóźnień o stałych przedziałach PRZEDZIALY_OPOZNIEN_MS, więc jego rozmiar
+    nie rośnie z liczbą próbek. Percentyl to górna granica przedziału, do którego trafia
+    (co najwyżej największa próbka). Sam w sobie nie jest bezpieczny dla wątków.
+    """
+    def __init__(self):
+        self.przedzialy = [0] * (len(PRZEDZIALY_OPOZNIEN_MS) + 1)
+        self.liczba = 0
+        self.suma_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+
+    def record(self, ms):
+        self.przedzialy[bisect.bisect_left(PRZEDZIALY_OPOZNIEN_MS, ms)] += 1
+        self.liczba += 1
+        self.suma_ms += ms
+        if self.min_ms is None or ms < self.min_ms:
+            self.min_ms = ms
+        if self.max_ms is None or ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, p):
+        if not self.liczba:
+            return None
+        pozycja = p / 100 * self.liczba
+        policzone = 0
+        for granica, n in zip(PRZEDZIALY_OPOZNIEN_MS, self.przedzialy):
+            policzone += n
+            if n and policzone >= pozycja:
+                return min(granica, self.max_ms)
+        return self.max_ms
+
+    def snapshot(self):
+        return {
+            'count': self.liczba,
+            'mean_ms': self.suma_ms / self.liczba if self.liczba else None,
+            'min_ms': self.min_ms,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': self.max_ms,
+        }
+
+
+class ZbiorczeMetryki:
+    """
+    Odbiorca zdarzeń instrumentacji agregujący je w pamięci procesu: histogramy opóźnień
+    każdej instrukcji, operacji i źródła oczekiwania na połączenie, sumy wierszy i bajtów
+    operacji oraz ostatnie max_slow_queries wolnych zapytań. Bezpieczny dla wątków.
+    Klucze zdarzeń i wyniku snapshot() są takie same jak w wersji PostgreSQL.
+    :param max_statements: Najwięcej różnych instrukcji z własnym histogramem; kolejne
+                           trafiają do wspólnego histogramu INNE_INSTRUKCJE.
+    """
+    INNE_INSTRUKCJE = '<other>'
+
+    def __init__(self, max_slow_queries=100, max_statements=1000):
+        self._lock = threading.Lock()
+        self.max_statements = max_statements
+        self.instrukcje = {}
+        self.operacje = {}
+        self.oczekiwania = {}
+        self.wolne_zapytania = deque(maxlen=max_slow_queries)
+
+    def emit(self, zdarzenie):
+        with self._lock:
+            if zdarzenie['type'] == 'statement':
+                klucz = zdarzenie['sql']
+                if klucz not in self.instrukcje and len(self.instrukcje) >= self.max_statements:
+                    klucz = self.INNE_INSTRUKCJE
+                histogram = self.instrukcje.get(klucz)
+                if histogram is None:
+                    histogram = self.instrukcje[klucz] = HistogramOpoznien()
+                histogram.record(zdarzenie['ms'])
+            elif zdarzenie['type'] == 'operation':
+                wpis = self.operacje.get(zdarzenie['name'])
+                if wpis is None:
+                    wpis = self.operacje[zdarzenie['name']] = {
+                        'opoznienia': HistogramOpoznien(), 'rows': 0, 'bytes': 0, 'seconds': 0.0, 'errors': 0}
+                wpis['opoznienia'].record(zdarzenie['ms'])
+                wpis['rows'] += zdarzenie['rows']
+                wpis['bytes'] += zdarzenie['bytes']
+                wpis['seconds'] += zdarzenie['ms'] / 1000
+                wpis['errors'] += zdarzenie['error'] is not None
+            elif zdarzenie['type'] == 'connection_wait':
+                histogram = self.oczekiwania.get(zdarzenie['source'])
+                if histogram is None:
+                    histogram = self.oczekiwania[zdarzenie['source']] = HistogramOpoznien()
+                histogram.record(zdarzenie['ms'])
+            elif zdarzenie['type'] == 'slow_query':
+                self.wolne_zapytania.append(zdarzenie)
+
+    def snapshot(self):
+        """
+        Zwraca zagregowane metryki jako słownik; przepustowość liczona jest względem łącznego czasu operacji.
+        """
+        with self._lock:
+            operacje = {}
+            for nazwa, wpis in self.operacje.items():
+                sekundy = wpis['seconds']
+                operacje[nazwa] = {
+                    **wpis['opoznienia'].snapshot(),
+                    'rows': wpis['rows'],
+                    'bytes': wpis['bytes'],
+                    'rows_per_s': wpis['rows'] / sekundy if wpis['rows'] and sekundy else None,
+                    'bytes_per_s': wpis['bytes'] / sekundy if wpis['bytes'] and sekundy else None,
+                    'errors': wpis['errors'],
+                }
+            return {
+                'statements': {sql: h.snapshot() for sql, h in self.instrukcje.items()},
+                'operations': operacje,
+                'connection_waits': {zrodlo: h.snapshot() for zrodlo, h in self.oczekiwania.items()},
+                'slow_queries': list(self.wolne_zapytania),
+            }
+
+
+class ZapisDoLogu:
+    """
+    Odbiorca zdarzeń instrumentacji zapisujący je do loggera jako JSON: wolne zapytania
+    jako ostrzeżenia, operacje jako informacje, a pozostałe zdarzenia jako komunikaty debug.
+    """
+    POZIOMY = {'slow_query': logging.WARNING, 'operation': logging.INFO}
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger('sklep_wedkarski.sqlite')
+
+    def emit(self, zdarzenie):
+        poziom = self.POZIOMY.get(zdarzenie['type'], logging.DEBUG)
+        if self.logger.isEnabledFor(poziom):
+            self.logger.log(poziom, '%s', json.dumps(zdarzenie, ensure_ascii=False, default=str))
+
+
+class ZapisDoPlikuJson:
+    """
+    Odbiorca zdarzeń instrumentacji dopisujący je do pliku jako wiersze JSON.
+    :param types: Typy zapisywanych zdarzeń (np. {'operation', 'slow_query'}), None dla wszystkich.
+    """
+    def __init__(self, sciezka, types=None):
+        self.types = types
+        self._lock = threading.Lock()
+        self._plik = open(sciezka, 'a', encoding='utf-8')
+
+    def emit(self, zdarzenie):
+        if self.types is None or zdarzenie['type'] in self.types:
+            wiersz = json.dumps(zdarzenie, ensure_ascii=False, default=str) + '\n'
+            with self._lock:
+                self._plik.write(wiersz)
+
+    def close(self):
+        with self._lock:
+            self._plik.close()
+
+
+class Instrumentacja:
+    """
+    Instrumentacja instancji sklepu (zob. SklepWedkarskiSQLite.enable_instrumentation).
+    Zamienia czasy instrukcji, operacje i oczekiwanie na połączenie lub blokadę zapisu na
+    zdarzenia (słowniki z kluczem 'type') przekazywane każdemu odbiorcy, czyli dowolnemu
+    obiektowi z metodą emit(zdarzenie). Instrukcje trwające co najmniej slow_query_ms są też
+    zgłaszane jako zdarzenia 'slow_query', z planem EXPLAIN QUERY PLAN, jeśli ustawiono explain.
+    """
+    def __init__(self, sinks=None, slow_query_ms=100.0, explain=True):
+        self.sinks = list(sinks) if sinks is not None else [ZbiorczeMetryki()]
+        self.slow_query_ms = slow_query_ms
+        self.explain = explain
+
+    def emit(self, zdarzenie):
+        zdarzenie['time'] = time.time()
+        for odbiorca in self.sinks:
+            odbiorca.emit(zdarzenie)
+
+    def record_statement(self, kursor, sql, parametry, sekundy, explain=True):
+        """
+        Zapisuje jedną wykonaną instrukcję; kursor to kursor, który ją wykonał.
+        """
+        ms = sekundy * 1000
+        self.emit({'type': 'statement', 'sql': _klucz_instrukcji(sql), 'ms': ms, 'rows': kursor.rowcount})
+        if self.slow_query_ms is not None and ms >= self.slow_query_ms:
+            plan = self._explain(kursor.connection, sql, parametry) if self.explain and explain else None
+            self.emit({'type': 'slow_query', 'sql': _normalizuj_sql(sql),
+                       'params': None if parametry is None else repr(parametry)[:500],
+                       'ms': ms, 'rows': kursor.rowcount, 'plan': plan})
+
+    def _explain(self, conn, sql, parametry):
+        """
+        Zwraca plan instrukcji (EXPLAIN QUERY PLAN) jako listę wierszy lub None, gdy nie da się go pobrać.
+        Wykonywane bez instrumentacji i bez rozpoczynania transakcji.
+        """
+        slowa = sql.split(None, 1)
+        if not slowa or slowa[0].upper() not in INSTRUKCJE_Z_PLANEM:
+            return None
+        try:
+            return [wiersz[3] for wiersz in sqlite3.Connection.execute(conn, f'EXPLAIN QUERY PLAN {sql}', parametry)]
+        except sqlite3.Error:
+            return None
+
+    def record_wait(self, zrodlo, sekundy):
+        """
+        Zapisuje czas oczekiwania na połączenie ('connect') lub blokadę zapisu ('write_lock').
+        """
+        self.emit({'type': 'connection_wait', 'source': zrodlo, 'ms': sekundy * 1000})
+
+    @contextmanager
+    def operation(self, nazwa):
+        """
+        Mierzy czas jednej operacji (np. importu). Zwraca słownik, w którym operacja ustawia
+        'rows' i 'bytes', z których liczona jest przepustowość w zdarzeniu 'operation'.
+        """
+        statystyki = {'rows': 0, 'bytes': 0}
+        blad = None
+        start = time.perf_counter()
+        try:
+            yield statystyki
+        except BaseException as e:
+            blad = type(e).__name__
+            raise
+        finally:
+            sekundy = time.perf_counter() - start
+            self.emit({
+                'type': 'operation',
+                'name': nazwa,
+                'ms': sekundy * 1000,
+                'rows': statystyki['rows'],
+                'bytes': statystyki['bytes'],
+                'rows_per_s': statystyki['rows'] / sekundy if statystyki['rows'] and sekundy else None,
+                'bytes_per_s': statystyki['bytes'] / sekundy if statystyki['bytes'] and sekundy else None,
+                'error': blad,
+            })
+
+    def snapshot(self):
+        """
+        Zwraca metryki pierwszego odbiorcy ZbiorczeMetryki lub None, jeśli go nie ma.
+        """
+        for odbiorca in self.sinks:
+            if isinstance(odbiorca, ZbiorczeMetryki):
+                return odbiorca.snapshot()
+        return None
+
+    def close(self):
+        for odbiorca in self.sinks:
+            if hasattr(odbiorca, 'close'):
+                odbiorca.close()
+
+
+class KursorZInstrumentacja(sqlite3.Cursor):
+    """
+    Kursor zgłaszający każde execute i executemany do instrumentacji swojego połączenia.
+    Czas SELECT obejmuje wykonanie do pierwszego wiersza - przy sortowaniu, grupowaniu
+    i agregacji SQLite wykonuje wtedy już prawie całą pracę.
+    """
+    def execute(self, sql, parameters=(), /):
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        self.connection.instrumentacja.record_statement(self, sql, parameters, time.perf_counter() - start)
+        return self
+
+    def executemany(self, sql, seq_of_parameters, /):
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self.connection.instrumentacja.record_statement(self, sql, None, time.perf_counter() - start, explain=False)
+        return self
+
+
+class PolaczenieSklepu(sqlite3.Connection):
+    """
+    Połączenie SQLite, które po ustawieniu instrumentacja (zob. enable_instrumentation)
+    wykonuje instrukcje przez KursorZInstrumentacja. Sklep otwiera je tylko przy włączonej
+    instrumentacji - metody nadpisane w Pythonie spowalniają każde wywołanie, także bez niej.
+    """
+    instrumentacja = None
+
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = sqlite3.Cursor if self.instrumentacja is None else KursorZInstrumentacja
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=(), /):
+        if self.instrumentacja is None:
+            return super().execute(sql, parameters)
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        if self.instrumentacja is None:
+            return super().executemany(sql, seq_of_parameters)
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class PodzielonyPlikCsv:
+    """
+    Zapisuje strumień wierszy CSV jednej tabeli do plików o rozmiarze co najwyżej
+    max_file_size bajtów (przed kompresją), opcjonalnie skompresowanych gzip lub zstd.
+    Każdy plik zaczyna się nagłówkiem, więc da się go wczytać samodzielnie. Pliki są
+    dzielone tylko na końcach wierszy (wartości tabel sklepu nie zawierają znaków nowej linii).
+    """
+    ROZSZERZENIA = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+    def __init__(self, katalog, tabela, kolumny, compression=None, max_file_size=None):
+        if compression not in self.ROZSZERZENIA:
+            raise ValueError(f"Nieznana kompresja: {compression}")
+        if compression == 'zstd' and zstd is None:
+            raise RuntimeError("Kompresja zstd wymaga pakietu 'zstandard'.")
+        self.katalog = katalog
+        self.tabela = tabela
+        self.naglowek = (','.join(kolumny) + '\n').encode()
+        self.compression = compression
+        self.max_file_size = max_file_size
+        self.pliki = []
+        self._plik = None
+
+    def _otworz(self):
+        numer = '' if self.max_file_size is None else f'.{len(self.pliki):04d}'
+        nazwa = f'{self.tabela}{numer}.csv{self.ROZSZERZENIA[self.compression]}'
+        sciezka = os.path.join(self.katalog, nazwa)
+        if self.compression == 'gzip':
+            self._plik = gzip.open(sciezka, 'wb', compresslevel=6)
+        elif self.compression == 'zstd':
+            self._plik = zstd.open(sciezka, 'wb')
+        else:
+            self._plik = open(sciezka, 'wb')
+        self._plik.write(self.naglowek)
+        self.pliki.append({'file': nazwa, 'rows': 0, 'bytes': len(self.naglowek)})
+
+    def _zamknij_plik(self):
+        if self._plik is not None:
+            self._plik.close()
+            self._plik = None
+            self.pliki[-1]['compressed_bytes'] = os.path.getsize(os.path.join(self.katalog, self.pliki[-1]['file']))
+
+    def write(self, dane):
+        """
+        Zapisuje blok pełnych wierszy CSV (bajty zakończone znakiem nowej linii).
+        """
+        widok = memoryview(dane)
+        while widok:
+            if self._plik is None:
+                self._otworz()
+            biezacy = self.pliki[-1]
+            ile = len(widok)
+            if self.max_file_size is not None and biezacy['bytes'] + ile > self.max_file_size:
+                ile = bytes(widok[:max(self.max_file_size - biezacy['bytes'], 0)]).rfind(b'\n') + 1
+                if ile == 0 and biezacy['rows'] == 0:
+                    # Wiersz dłuższy niż limit i tak trafia do osobnego pliku
+                    ile = bytes(widok).find(b'\n') + 1
+            if ile:
+                blok = widok[:ile]
+                self._plik.write(blok)
+                biezacy['rows'] += bytes(blok).count(b'\n')
+                biezacy['bytes'] += ile
+                widok = widok[ile:]
+            if widok:
+                self._zamknij_plik()
+
+    def close(self):
+        """
+        Zamyka ostatni plik (pusta tabela dostaje jeden plik z samym nagłówkiem) i zwraca listę plików.
+        """
+        if not self.pliki:
+            self._otworz()
+        self._zamknij_plik()
+        return self.pliki
+
+
+def _eksportuj_tabele_csv(conn, tabela, katalog, compression, max_file_size, batch_size):
+    """
+    Zapisuje tabelę do plików CSV, czytając ją kursorem w paczkach po batch_size wierszy.
+    Zwraca listę zapisanych plików.
+    """
+    kolumny = KOLUMNY_TABEL[tabela]
+    zapis = PodzielonyPlikCsv(katalog, tabela, kolumny, compression, max_file_size)
+    bufor = io.StringIO()
+    pisarz = csv.writer(bufor, lineterminator='\n')
+    try:
+        kursor = conn.execute(f'SELECT {", ".join(kolumny)} FROM {tabela} ORDER BY id')
+        while paczka := kursor.fetchmany(batch_size):
+            pisarz.writerows(paczka)
+            zapis.write(bufor.getvalue().encode())
+            bufor.seek(0)
+            bufor.truncate()
+    finally:
+        pliki = zapis.close()
+    return pliki
+
+
+def _eksportuj_tabele_csv_w_procesie(db_path, tabela, katalog, compression, max_file_size, batch_size):
+    """
+    Eksportuje jedną tabelę we własnym procesie przez osobne połączenie tylko do odczytu.
+    """
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    try:
+        return _eksportuj_tabele_csv(conn, tabela, katalog, compression, max_file_size, batch_size)
+    finally:
+        conn.close()
+
+
+def shard_klienta(klient_id, liczba_shardow):
+    """
+    Numer shardu klienta: hash Fibonacciego id (mnożenie przez 2^64/φ modulo 2^64, górne
+    32 bity), więc kolejne id rozkładają się równomiernie i bez regularnego wzoru.
+    Przyjmuje pojedyncze id (zwraca int) albo tablicę NumPy id (zwraca tablicę).
+    """
+    if isinstance(klient_id, np.ndarray):
+        h = (klient_id.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)
+        return (h % np.uint64(liczba_shardow)).astype(np.int64)
+    return ((klient_id * 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF) >> 32) % liczba_shardow
+
+
+def _raport_shardu(db_path, raport, parametry):
+    """
+    Wykonuje raport na jednym shardzie we własnym procesie przez połączenie tylko do odczytu:
+    z tabel podsumowań, jeśli shard je ma, w przeciwnym razie wprost z tabel.
+    Zwraca wiersze jako krotki (częściowe agregaty do scalenia).
+    """
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    try:
+        podsumowania = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'podsumowanie_klientow'").fetchone()
+        return conn.execute((ZAPYTANIA_RAPORTOW if podsumowania else ZAPYTANIA_RAPORTOW_Z_TABEL)[raport],
+                            parametry).fetchall()
+    finally:
+        conn.close()
+
+
+def _scal_sumy(czesci):
+    """
+    Scala częściowe agregaty (klucz, liczba, suma) z shardów, sumując je według klucza.
+    """
+    sumy = {}
+    for czesc in czesci:
+        for klucz, liczba, suma in czesc:
+            poprzednia_liczba, poprzednia_suma = sumy.get(klucz, (0, 0.0))
+            sumy[klucz] = (poprzednia_liczba + liczba, poprzednia_suma + suma)
+    return [(klucz, *sumy[klucz]) for klucz in sorted(sumy)]
+
+
+def iter_json_tables(filename, batch_size=10_000, buffer_size=1 << 20):
+    """
+    Przyrostowo parsuje plik JSON w formacie {"tabela": [{...}, ...], ...}
+    i zwraca paczki (nazwa_tabeli, lista_rekordów) o co najwyżej batch_size rekordach.
+    Plik jest czytany blokami po buffer_size znaków, więc zużycie pamięci
+    nie zależy od jego rozmiaru.
+    """
+    decoder = json.JSONDecoder()
+    with open(filename, 'r', encoding='utf-8') as f:
+        buf = ''
+        pos = 0
+        eof = False
+
+        def wczytaj():
+            # Dokłada kolejny blok do bufora, odrzucając już przetworzony początek
+            nonlocal buf, pos, eof
+            blok = f.read(buffer_size)
+            if not blok:
+                eof = True
+            buf = buf[pos:] + blok
+            pos = 0
+
+        def pomin_biale():
+            # Przesuwa pozycję za białe znaki i zwraca następny znak ('' na końcu pliku)
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in ' \t\r\n':
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return buf[pos] if pos < len(buf) else ''
+                wczytaj()
+
+        def oczekuj(znaki):
+            nonlocal pos
+            znak = pomin_biale()
+            if znak not in znaki:
+                raise ValueError(f"Niepoprawny JSON: oczekiwano jednego z {znaki!r}, otrzymano {znak!r}")
+            pos += 1
+            return znak
+
+        def dekoduj():
+            # Dekoduje jedną wartość JSON, dokładając dane aż do jej zamknięcia
+            nonlocal pos
+            pomin_biale()
+            while True:
+                try:
+                    wartosc, koniec = decoder.raw_decode(buf, pos)
+                    pos = koniec
+                    return wartosc
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    wczytaj()
+
+        oczekuj('{')
+        if pomin_biale() == '}':
+            return
+        while True:
+            tabela = dekoduj()
+            oczekuj(':')
+            oczekuj('[')
+            paczka = []
+            if pomin_biale() == ']':
+                pos += 1
+            else:
+                while True:
+                    paczka.append(dekoduj())
+                    if len(paczka) >= batch_size:
+                        yield tabela, paczka
+                        paczka = []
+                    if oczekuj(',]') == ']':
+                        break
+            if paczka:
+                yield tabela, paczka
+            if oczekuj(',}') == '}':
+                return
+
+
+class KolumnaLiczbowa:
+    """
+    Kolumna liczb całkowitych lub zmiennoprzecinkowych w rosnącym buforze array.array
+    (4-bajtowe int, 8-bajtowe float). NULL jest zapisywany jako wartość specjalna:
+    najmniejsza liczba int32 albo NaN.
+    """
+    def __init__(self, typecode):
+        self.buffer = array(typecode)
+        self.dtype = np.dtype(np.int32 if typecode == 'i' else np.float64)
+        self.null = np.iinfo(np.int32).min if typecode == 'i' else np.nan
+
+    def __len__(self):
+        return len(self.buffer)
+
+    @property
+    def nbytes(self):
+        return len(self.buffer) * self.buffer.itemsize
+
+    def encode(self, wartosci):
+        """
+        Zamienia paczkę wartości (tablica, Series lub lista, z None/NaN jako NULL) na typ bufora.
+        """
+        return pd.to_numeric(pd.Series(wartosci, copy=False)).to_numpy(dtype=self.dtype, na_value=self.null)
+
+    def extend(self, zakodowane):
+        self.buffer.frombytes(zakodowane.tobytes())
+
+    def decode(self, start, stop):
+        """
+        Zwraca wiersze start:stop jako tablicę NumPy, a jeśli są wśród nich NULL - jako obiekty z None.
+        """
+        wartosci = np.frombuffer(self.buffer, dtype=self.dtype)[start:stop].copy()
+        puste = np.isnan(wartosci) if self.dtype.kind == 'f' else wartosci == self.null
+        if puste.any():
+            wartosci = wartosci.astype(object)
+            wartosci[puste] = None
+        return wartosci
+
+
+class KolumnaDat(KolumnaLiczbowa):
+    """
+    Kolumna dat zapisanych jako 4-bajtowe numery dni od 1970-01-01. Przyjmuje napisy ISO,
+    obiekty date i wartości datetime64; zwraca napisy ISO, jak generate_scaled_data.
+    """
+    def __init__(self):
+        super().__init__('i')
+
+    def encode(self, wartosci):
+        dni = np.asarray(wartosci, dtype='datetime64[D]')
+        puste = np.isnat(dni)
+        dni = dni.astype(np.int64)
+        dni[puste] = self.null
+        return dni.astype(np.int32)
+
+    def decode(self, start, stop):
+        dni = np.frombuffer(self.buffer, dtype=np.int32)[start:stop]
+        puste = dni == self.null
+        wartosci = np.datetime_as_string(dni.astype('datetime64[D]'), unit='D').astype(object)
+        wartosci[puste] = None
+        return wartosci
+
+
+class KolumnaSlownikowa:
+    """
+    Kolumna tekstowa kodowana słownikowo: jednobajtowe kody wskazujące listę różnych
+    wartości (-1 to NULL). Wartości spoza słownika są do niego dopisywane przy pierwszym użyciu.
+    """
+    def __init__(self, wartosci=()):
+        self.values = list(wartosci)
+        self.index = {wartosc: kod for kod, wartosc in enumerate(self.values)}
+        self.codes = array('b')
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return len(self.codes)
+
+    def _kod(self, wartosc):
+        kod = self.index.get(wartosc)
+        if kod is None:
+            if len(self.values) == 127:
+                raise ValueError("Kolumna kodowana słownikowo ma więcej niż 127 różnych wartości.")
+            kod = self.index[wartosc] = len(self.values)
+            self.values.append(wartosc)
+        return kod
+
+    def encode(self, wartosci):
+        """
+        Zamienia paczkę wartości na kody; pandas.Categorical (np. z generatora) jest
+        tłumaczony przez swoje kategorie, bez przeglądania każdej wartości.
+        """
+        kategorie = wartosci if isinstance(wartosci, pd.Categorical) else pd.Categorical(wartosci)
+        # Dodatkowe -1 na końcu wybierają kody -1 (NULL) z Categorical
+        mapowanie = np.array([self._kod(wartosc) for wartosc in kategorie.categories] + [-1], dtype=np.int8)
+        return mapowanie[kategorie.codes]
+
+    def extend(self, zakodowane):
+        self.codes.frombytes(zakodowane.tobytes())
+
+    def decode(self, start, stop):
+        return np.array(self.values + [None], dtype=object)[np.frombuffer(self.codes, dtype=np.int8)[start:stop]]
+
+
+class KolumnaTekstowa:
+    """
+    Kolumna tekstowa w jednym buforze UTF-8 z przesunięciem końca każdej wartości
+    (8 bajtów przesunięcia zamiast obiektu str na wiersz). Maska NULL jest
+    tworzona dopiero przy pierwszej pustej wartości.
+    """
     def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('q', [0])
+        self.nulls = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        return len(self.data) + len(self.offsets) * self.offsets.itemsize + len(self.nulls or b'')
+
+    def encode(self, wartosci):
+        seria = pd.Series(wartosci, dtype=object, copy=False)
+        puste = seria.isna().to_numpy()
+        zakodowane = [str(wartosc).encode('utf-8') for wartosc in seria.where(~puste, '')]
+        konce = np.cumsum([len(wartosc) for wartosc in zakodowane], dtype=np.int64)
+        return b''.join(zakodowane), konce, puste
+
+    def extend(self, zakodowane):
+        dane, konce, puste = zakodowane
+        if puste.any() and self.nulls is None:
+            self.nulls = bytearray(len(self))
+        if self.nulls is not None:
+            self.nulls += puste.astype(np.uint8).tobytes()
+        self.offsets.frombytes((konce + len(self.data)).tobytes())
+        self.data += dane
+
+    def decode(self, start, stop):
+        przesuniecia = self.offsets
+        with memoryview(self.data) as dane:
+            wartosci = np.array([str(dane[przesuniecia[i]:przesuniecia[i + 1]], 'utf-8') for i in range(start, stop)]
+                                + [None], dtype=object)[:-1]
+        if self.nulls is not None:
+            wartosci[np.frombuffer(self.nulls, dtype=np.uint8)[start:stop].astype(bool)] = None
+        return wartosci
+
+
+def _kolumna_zbioru(tabela, kolumna, typ):
+    """
+    Tworzy bufor kolumny o danym typie z TYPY_PARQUET.
+    """
+    if (tabela, kolumna) in KOLUMNY_SLOWNIKOWE:
+        return KolumnaSlownikowa(KOLUMNY_SLOWNIKOWE[tabela, kolumna])
+    if typ == 'int32':
+        return KolumnaLiczbowa('i')
+    if typ == 'float64':
+        return KolumnaLiczbowa('d')
+    if typ == 'date32':
+        return KolumnaDat()
+    return KolumnaTekstowa()
+
+
+class ZbiorKolumnowy:
+    """
+    Zbiór danych tabel sklepu w pamięci, przechowywany kolumnami w zwartych buforach
+    zamiast wierszy obiektów Pythona: liczby jako 4- i 8-bajtowe wartości, daty jako
+    numery dni, status i metoda_platnosci kodowane słownikowo w jednym bajcie, pozostały
+    tekst jako UTF-8 z przesunięciami (zob. klasy kolumn powyżej).
+    Iteracja po zbiorze zwraca paczki (nazwa_tabeli, DataFrame) po batch_size wierszy
+    w kolejności kluczy obcych, dekodowane po jednej - takie same jak z generate_scaled_data,
+    więc zbiór można przekazać do import_chunks, sync_chunks czy export_chunks_to_json.
+    """
+    def __init__(self, batch_size=ROZMIAR_PACZKI_ZBIORU):
+        self.batch_size = batch_size
+        self.tables = {tabela: {kolumna: _kolumna_zbioru(tabela, kolumna, typ)
+                                for kolumna, typ in zip(KOLUMNY_TABEL[tabela], TYPY_PARQUET[tabela])}
+                       for tabela in KOLUMNY_TABEL}
+
+    @classmethod
+    def from_chunks(cls, chunks, batch_size=ROZMIAR_PACZKI_ZBIORU):
+        """
+        Buduje zbiór z paczek (nazwa_tabeli, dane), np. z generate_scaled_data.
+        """
+        zbior = cls(batch_size)
+        for tabela, dane in chunks:
+            zbior.append(tabela, dane)
+        return zbior
+
+    @classmethod
+    def from_json(cls, filename, batch_size=ROZMIAR_PACZKI_ZBIORU):
+        """
+        Wczytuje plik JSON (jak import_from_json_stream) do zbioru: rekordy są parsowane
+        strumieniowo i trafiają do buforów kolumn paczka po paczce, więc w pamięci nie ma
+        listy słowników całej tabeli. Tabele spoza KOLUMNY_TABEL są pomijane.
+        """
+        return cls.from_chunks(((tabela, rekordy) for tabela, rekordy in iter_json_tables(filename, batch_size)
+                                if tabela in KOLUMNY_TABEL), batch_size)
+
+    def append(self, tabela, dane):
+        """
+        Dopisuje wiersze do tabeli: DataFrame, słownik kolumn albo listę słowników.
+        Wszystkie kolumny są konwertowane przed dopisaniem którejkolwiek, więc paczka,
+        której nie da się skonwertować, nie zmienia tabeli.
+        """
+        if not isinstance(dane, (pd.DataFrame, dict)):
+            dane = pd.DataFrame(list(dane), columns=KOLUMNY_TABEL[tabela])
+        kolumny = self.tables[tabela]
+        zakodowane = [kolumna.encode(dane[nazwa]) for nazwa, kolumna in kolumny.items()]
+        for kolumna, wartosci in zip(kolumny.values(), zakodowane):
+            kolumna.extend(wartosci)
+
+    def num_rows(self, tabela):
+        return len(self.tables[tabela]['id'])
+
+    def __len__(self):
+        return sum(self.num_rows(tabela) for tabela in self.tables)
+
+    def batches(self, tabela, batch_size=None):
+        """
+        Zwraca wiersze tabeli jako kolejne DataFrame o co najwyżej batch_size wierszach.
+        """
+        batch_size = batch_size or self.batch_size
+        kolumny = self.tables[tabela]
+        for start in range(0, self.num_rows(tabela), batch_size):
+            stop = min(start + batch_size, self.num_rows(tabela))
+            yield pd.DataFrame({nazwa: kolumna.decode(start, stop) for nazwa, kolumna in kolumny.items()})
+
+    def __iter__(self):
+        for tabela in self.tables:
+            for df in self.batches(tabela):
+                yield tabela, df
+
+    def memory_usage(self):
+        """
+        Zwraca rozmiar buforów kolumn w bajtach dla każdej tabeli.
+        """
+        return {tabela: sum(kolumna.nbytes for kolumna in kolumny.values()) for tabela, kolumny in self.tables.items()}
+
+
+class SklepWedkarskiSQLite:
+    def __init__(self, db_path='sklepWedkarski.db', profile=None):
+        """
+        :param db_path: Ścieżka do pliku bazy danych.
+        :param profile: Nazwa profilu z PROFILE_POLACZENIA ('bulk_load', 'oltp',
+                        'read_only_analytics') lub None dla domyślnych ustawień SQLite.
+        """
+        self.db_path = db_path
+        self.profile = profile
         self.conn = None
+        self._pool_profile = None
+        self._pool_local = threading.local()
+        self._pool_connections = []
+        self._pool_lock = threading.Lock()
+        self.catalog_cache = None
+        self._cache_poll_lock = threading.Lock()
+        self.instrumentation = None
+        # (numer_shardu, liczba_shardow), gdy baza jest shardem SklepWedkarskiSQLiteShardowany
+        self.shard = None
         self.setup_connection()
 
     def setup_connection(self):
@@ -15,12 +1284,165 @@ class SklepWedkarskiSQLite:
         Tworzy plik bazy danych 'sklepWedkarski.db' jeśli nie istnieje.
         """
         try:
-            self.conn = sqlite3.connect('sklepWedkarski.db')
+            self.conn = self._polacz(self.db_path)
             self.conn.row_factory = sqlite3.Row # Pozwala na dostęp do kolumn po nazwie
+            if self.profile:
+                self.set_profile(self.profile)
         except sqlite3.Error as e:
             print(f"Błąd połączenia z SQLite: {e}")
             self.conn = None
 
+    def _polacz(self, *args, **kwargs):
+        """
+        Otwiera połączenie sqlite3.connect: PolaczenieSklepu połączone z instrumentacją,
+        gdy jest włączona, a w przeciwnym razie zwykłe sqlite3.Connection.
+        """
+        if self.instrumentation is None:
+            return sqlite3.connect(*args, **kwargs)
+        conn = sqlite3.connect(*args, factory=PolaczenieSklepu, **kwargs)
+        conn.instrumentacja = self.instrumentation
+        return conn
+
+    def _apply_profile(self, conn, profile):
+        """
+        Wykonuje na połączeniu polecenia PRAGMA wybranego profilu.
+        """
+        if profile not in PROFILE_POLACZENIA:
+            raise ValueError(f"Nieznany profil połączenia: {profile}")
+        for pragma, wartosc in PROFILE_POLACZENIA[profile].items():
+            conn.execute(f'PRAGMA {pragma} = {wartosc}')
+
+    def set_profile(self, profile):
+        """
+        Ustawia profil połączenia, wykonując odpowiadające mu polecenia PRAGMA.
+        """
+        self._apply_profile(self.conn, profile)
+        self.profile = profile
+
+    def enable_pool(self, profile='oltp', busy_timeout=5.0):
+        """
+        Włącza tryb wielowątkowy: każdy wątek dostaje własne połączenie (tworzone
+        przy pierwszym użyciu connection() i używane ponownie), więc wątki nie
+        współdzielą jednego uchwytu. Wymaga profilu z trybem WAL, w którym
+        odczyty nie blokują się z zapisem.
+        :param busy_timeout: Czas w sekundach, przez jaki zapis czeka na blokadę innego wątku.
+        """
+        if PROFILE_POLACZENIA.get(profile, {}).get('journal_mode') != 'WAL':
+            raise ValueError(f"Tryb wielowątkowy wymaga profilu z journal_mode=WAL, a nie: {profile}")
+        self._pool_profile = profile
+        self._pool_busy_timeout = busy_timeout
+
+    @contextmanager
+    def connection(self):
+        """
+        Zwraca połączenie dla jednej jednostki pracy: w trybie wielowątkowym (enable_pool)
+        własne połączenie wątku, w przeciwnym razie self.conn. W obu trybach transakcja
+        otwarta w bloku jest na jego końcu zatwierdzana, a po błędzie wycofywana (jak
+        połączenie oddawane do puli w PostgreSQL), więc także transakcja rozpoczęta
+        wcześniej na self.conn.
+        """
+        if self._pool_profile is None:
+            with self.conn:
+                yield self.conn
+            return
+        conn = getattr(self._pool_local, 'conn', None)
+        if conn is not None and self.instrumentation is not None and not isinstance(conn, PolaczenieSklepu):
+            # Połączenie wątku otwarte przed enable_instrumentation jest zastępowane mierzonym
+            with self._pool_lock:
+                self._pool_connections.remove(conn)
+            conn.close()
+            conn = None
+        if conn is None:
+            # check_same_thread=False tylko po to, aby close_connection mogło zamknąć połączenia innych wątków
+            start = time.perf_counter()
+            conn = self._polacz(self.db_path, timeout=self._pool_busy_timeout, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            if self.instrumentation is not None:
+                self.instrumentation.record_wait('connect', time.perf_counter() - start)
+            self._apply_profile(conn, self._pool_profile)
+            self._pool_local.conn = conn
+            with self._pool_lock:
+                self._pool_connections.append(conn)
+        if isinstance(conn, PolaczenieSklepu):
+            conn.instrumentacja = self.instrumentation
+        with conn:
+            yield conn
+
+    def enable_instrumentation(self, sinks=None, slow_query_ms=100.0, explain=True):
+        """
+        Włącza instrumentację: każda instrukcja wykonana przez połączenia tej instancji
+        (także połączenia wątków w trybie wielowątkowym) jest mierzona, importy, eksporty,
+        importy przyrostowe i składanie zamówień są zgłaszane jako operacje z przepustowością
+        w wierszach i bajtach na sekundę, a zapisywany jest czas otwierania połączeń wątków
+        i oczekiwania na blokadę zapisu. Instrukcje wolniejsze niż slow_query_ms trafiają
+        do dziennika wolnych zapytań z planem EXPLAIN QUERY PLAN.
+        :param sinks: Odbiorcy zdarzeń (ZbiorczeMetryki, ZapisDoLogu, ZapisDoPlikuJson lub
+                      dowolny obiekt z metodą emit(zdarzenie)); domyślnie ZbiorczeMetryki.
+        :param slow_query_ms: Próg wolnego zapytania w milisekundach, None wyłącza dziennik.
+        :param explain: Dołącza plan do wolnych zapytań.
+        :return: Obiekt Instrumentacja; jego snapshot() zwraca zagregowane metryki.
+        """
+        self.instrumentation = Instrumentacja(sinks, slow_query_ms, explain)
+        if isinstance(self.conn, PolaczenieSklepu):
+            self.conn.instrumentacja = self.instrumentation
+        elif self.conn:
+            # Klasy połączenia nie da się zmienić, więc self.conn jest otwierane ponownie
+            # (otwarta transakcja jest zatwierdzana, baza w pamięci kopiowana)
+            stare = self.conn
+            stare.commit()
+            self.setup_connection()
+            if self.db_path == ':memory:':
+                stare.backup(self.conn)
+            stare.close()
+        return self.instrumentation
+
+    def _operation(self, nazwa):
+        """
+        Menedżer kontekstu mierzący operację, gdy instrumentacja jest włączona;
+        w obu przypadkach zwraca słownik na jej 'rows' i 'bytes'.
+        """
+        if self.instrumentation is None:
+            return nullcontext({'rows': 0, 'bytes': 0})
+        return self.instrumentation.operation(nazwa)
+
+    @contextmanager
+    def _bulk_load_indexes(self, conn):
+        """
+        W profilu 'bulk_load' usuwa indeksy pomocnicze na czas importu i odbudowuje je
+        po jego zakończeniu (jedno sortowanie zamiast aktualizacji przy każdym wierszu),
+        a następnie sprawdza klucze obce wyłączone w tym profilu.
+        W pozostałych profilach nic nie robi.
+        """
+        if self.profile != 'bulk_load':
+            yield
+            return
+        # Indeksy z sql IS NULL to indeksy automatyczne (PRIMARY KEY, UNIQUE) - nie można ich usunąć.
+        # Wyzwalacze również są wyłączane, a utrzymywane przez nie dane przeliczane po imporcie.
+        obiekty = conn.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') AND sql IS NOT NULL").fetchall()
+        for obiekt in obiekty:
+            conn.execute(f'DROP {obiekt[0].upper()} IF EXISTS {obiekt[1]}')
+        try:
+            yield
+        finally:
+            with conn:
+                for obiekt in obiekty:
+                    conn.execute(obiekt[2])
+                if any(obiekt[1] in WYZWALACZE_PODSUMOWAN for obiekt in obiekty):
+                    for sql in PRZELICZENIE_PODSUMOWAN:
+                        conn.execute(sql)
+                if any(obiekt[1] in WYZWALACZE_WYSZUKIWANIA for obiekt in obiekty):
+                    for sql in PRZEBUDOWA_WYSZUKIWANIA:
+                        conn.execute(sql)
+                if any(obiekt[1] in WYZWALACZE_ZMIAN_PRODUKTOW for obiekt in obiekty):
+                    # Import nie trafił do dziennika zmian - pamięci podręczne katalogu są czyszczone w całości
+                    conn.execute('INSERT INTO zmiany_produktow (produkt_id) VALUES (NULL)')
+            if self.catalog_cache is not None:
+                self.catalog_cache.clear()
+            naruszenia = conn.execute('PRAGMA foreign_key_check').fetchall()
+            if naruszenia:
+                print(f"Uwaga: {len(naruszenia)} wierszy narusza klucze obce po imporcie.")
+
     def create_tables(self):
         """
         Tworzy tabele w bazie danych SQLite, jeśli jeszcze nie istnieją.
@@ -28,9 +1450,9 @@ class SklepWedkarskiSQLite:
         Tabela 'pozycje_zamowienia' została usunięta zgodnie z prośbą.
         """
         try:
-            with self.conn:
+            with self.connection() as conn:
                 # Tabele istniejące
-                self.conn.execute('''
+                conn.execute('''
                     CREATE TABLE IF NOT EXISTS kategorie (
                         id INTEGER PRIMARY KEY,
                         nazwa TEXT NOT NULL,
@@ -38,7 +1460,7 @@ class SklepWedkarskiSQLite:
                     )
                 ''')
 
-                self.conn.execute('''
+                conn.execute('''
                     CREATE TABLE IF NOT EXISTS produkty (
                         id INTEGER PRIMARY KEY,
                         nazwa TEXT NOT NULL,
@@ -51,7 +1473,7 @@ class SklepWedkarskiSQLite:
                 ''')
 
                 # Nowe tabele
-                self.conn.execute('''
+                conn.execute('''
                     CREATE TABLE IF NOT EXISTS klienci (
                         id INTEGER PRIMARY KEY,
                         imie TEXT NOT NULL,
@@ -62,7 +1484,7 @@ class SklepWedkarskiSQLite:
                     )
                 ''')
 
-                self.conn.execute('''
+                conn.execute('''
                     CREATE TABLE IF NOT EXISTS zamowienia (
                         id INTEGER PRIMARY KEY,
                         klient_id INTEGER,
@@ -72,7 +1494,7 @@ class SklepWedkarskiSQLite:
                     )
                 ''')
 
-                self.conn.execute('''
+                conn.execute('''
                     CREATE TABLE IF NOT EXISTS platnosci (
                         id INTEGER PRIMARY KEY,
                         zamowienie_id INTEGER,
@@ -84,7 +1506,7 @@ class SklepWedkarskiSQLite:
                 ''')
 
                 # Tabela 'pozycje_zamowienia' została usunięta
-                # self.conn.execute('''
+                # conn.execute('''
                 #     CREATE TABLE IF NOT EXISTS pozycje_zamowienia (
                 #         id INTEGER PRIMARY KEY,
                 #         zamowienie_id INTEGER,
@@ -97,129 +1519,1086 @@ class SklepWedkarskiSQLite:
                 # ''')
         except sqlite3.Error as e:
             print(f"Błąd tworzenia tabel SQLite: {e}")
-            if self.conn:
-                self.conn.rollback() # Wycofanie zmian w przypadku błędu
 
-    def generate_test_data(self):
+    def create_indexes(self):
         """
-        Generuje przykładowe dane dla kategorii, produktów i klientów.
-        Zwiększono liczbę klientów, produktów i zamówień.
+        Tworzy indeksy pomocnicze zdefiniowane w INDEKSY i odświeża statystyki planisty (ANALYZE).
         """
-        # Kategorie
-        kategorie_data = [
-            ("Wędki", "Wędki wędkarskie"),
-            ("Przynęty", "Przynęty i zanęty"),
-            ("Akcesoria", "Akcesoria wędkarskie"),
-            ("Odzież", "Odzież wędkarska i obuwie"),
-            ("Elektronika", "Echosondy i GPS")
-        ]
-        
-        # Produkty (więcej produktów z opisami)
-        produkty = [
-            {"nazwa": "Wędka muchowa Master", "opis": "Profesjonalna wędka do muchowania", "cena": 299.99, "stan_magazynowy": 15, "kategoria_id": 1},
-            {"nazwa": "Kołowrotek spinningowy", "opis": "Kołowrotek do spinningu", "cena": 149.90, "stan_magazynowy": 20, "kategoria_id": 1},
-            {"nazwa": "Mocny sznurek wędkarski", "opis": "Nieprzemakalny sznurek wędkarski", "cena": 29.99, "stan_magazynowy": 30, "kategoria_id": 3},
-            {"nazwa": "Żyłka fluorowa", "opis": "Żyłka fluorowa o wysokiej jakości", "cena": 39.99, "stan_magazynowy": 25, "kategoria_id": 3},
-            {"nazwa": "Mucha dry", "opis": "Ręcznie wykonana mucha dry", "cena": 14.99, "stan_magazynowy": 40, "kategoria_id": 2},
-            {"nazwa": "Woblery zestaw", "opis": "Zestaw woblerów na drapieżniki", "cena": 79.99, "stan_magazynowy": 50, "kategoria_id": 2},
-            {"nazwa": "Podbierak teleskopowy", "opis": "Lekki podbierak z długą rączką", "cena": 89.00, "stan_magazynowy": 10, "kategoria_id": 3},
-            {"nazwa": "Kurtka przeciwdeszczowa", "opis": "Wodoodporna kurtka dla wędkarzy", "cena": 199.00, "stan_magazynowy": 12, "kategoria_id": 4},
-            {"nazwa": "Echosonda Deeper", "opis": "Inteligentna echosonda do smartfona", "cena": 499.00, "stan_magazynowy": 5, "kategoria_id": 5},
-            {"nazwa": "Plecak wędkarski", "opis": "Pojemny plecak na akcesoria", "cena": 120.00, "stan_magazynowy": 18, "kategoria_id": 3}
-        ]
+        try:
+            with self.connection() as conn:
+                for nazwa, definicja in INDEKSY.items():
+                    conn.execute(f'CREATE INDEX IF NOT EXISTS {nazwa} {definicja}')
+                conn.execute('ANALYZE')
+        except sqlite3.Error as e:
+            print(f"Błąd tworzenia indeksów SQLite: {e}")
 
-        # Klienci (więcej klientów)
-        klienci = [
-            {"imie": "Jan", "nazwisko": "Kowalski", "email": "jan.kowalski@email.pl", "telefon": "123456789", "adres": "ul. Gdańska 1"},
-            {"imie": "Anna", "nazwisko": "Wiśniewska", "email": "anna.wisniewska@email.pl", "telefon": "987654321", "adres": "ul. Krakowska 2"},
-            {"imie": "Piotr", "nazwisko": "Nowak", "email": "piotr.nowak@email.pl", "telefon": "555666777", "adres": "ul. Warszawska 3"},
-            {"imie": "Maria", "nazwisko": "Zając", "email": "maria.zajac@email.pl", "telefon": "111222333", "adres": "ul. Poznańska 4"},
-            {"imie": "Krzysztof", "nazwisko": "Lewandowski", "email": "krzysztof.l@email.pl", "telefon": "444555666", "adres": "ul. Wrocławska 5"}
-        ]
+    def drop_indexes(self):
+        """
+        Usuwa indeksy pomocnicze zdefiniowane w INDEKSY.
+        """
+        try:
+            with self.connection() as conn:
+                for nazwa in INDEKSY:
+                    conn.execute(f'DROP INDEX IF EXISTS {nazwa}')
+        except sqlite3.Error as e:
+            print(f"Błąd usuwania indeksów SQLite: {e}")
 
-        return kategorie_data, produkty, klienci
+    def reindex(self):
+        """
+        Przebudowuje istniejące indeksy pomocnicze zdefiniowane w INDEKSY.
+        """
+        try:
+            with self.connection() as conn:
+                istniejace = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+                for nazwa in INDEKSY:
+                    if nazwa in istniejace:
+                        conn.execute(f'REINDEX {nazwa}')
+        except sqlite3.Error as e:
+            print(f"Błąd przebudowy indeksów SQLite: {e}")
 
-    def export_to_json(self, kategorie, produkty, klienci):
+    def enable_catalog_cache(self, max_entries=10_000, ttl=30.0, poll_interval=1.0):
         """
-        Eksportuje wygenerowane dane do pliku JSON.
+        Włącza pamięć podręczną odczytów katalogu (get_product, get_products_by_category,
+        get_categories). Zmiany produktów (w tym ceny i stanu magazynowego) są rejestrowane
+        przez wyzwalacze w tabeli zmiany_produktow; odczyty sprawdzają ją co najwyżej raz
+        na poll_interval sekund i unieważniają zmienione wpisy, a po imporcie w profilu
+        'bulk_load' (bez wyzwalaczy) całą pamięć. Dane są więc nieaktualne
+        najwyżej przez poll_interval, a niezależnie od tego żaden wpis nie żyje dłużej niż ttl.
         """
-        kategorie_json = [{'id': i+1, 'nazwa': k[0], 'opis': k[1]} for i, k in enumerate(kategorie)]
-        produkty_json = [{'id': i+1, **p} for i, p in enumerate(produkty)]
-        klienci_json = [{'id': i+1, **k} for i, k in enumerate(klienci)]
+        with self.connection() as conn:
+            conn.execute(DZIENNIK_ZMIAN_PRODUKTOW)
+            for nazwa, definicja in WYZWALACZE_ZMIAN_PRODUKTOW.items():
+                conn.execute(f'CREATE TRIGGER IF NOT EXISTS {nazwa} {definicja}')
+            self._cache_last_seq = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM zmiany_produktow').fetchone()[0]
+        self._cache_poll_interval = poll_interval
+        self._cache_last_poll = time.monotonic()
+        self.catalog_cache = PamiecPodrecznaKatalogu(max_entries, ttl)
 
-        data = {
-            'kategorie': kategorie_json,
-            'produkty': produkty_json,
+    def _poll_product_changes(self):
+        """
+        Unieważnia wpisy pamięci podręcznej dla produktów zmienionych od ostatniego sprawdzenia.
+        """
+        if time.monotonic() - self._cache_last_poll < self._cache_poll_interval:
+            return
+        if not self._cache_poll_lock.acquire(blocking=False):
+            return # Inny wątek właśnie sprawdza dziennik
+        try:
+            with self.connection() as conn:
+                zmiany = conn.execute('SELECT seq, produkt_id, kategoria_id, stara_kategoria_id FROM zmiany_produktow '
+                                      'WHERE seq > ? ORDER BY seq', (self._cache_last_seq,)).fetchall()
+            klucze = set()
+            wszystkie = False
+            for seq, produkt_id, kategoria_id, stara_kategoria_id in zmiany:
+                if produkt_id is None:
+                    wszystkie = True
+                klucze.update({('produkt', produkt_id), ('kategoria', kategoria_id), ('kategoria', stara_kategoria_id)})
+                self._cache_last_seq = seq
+            if wszystkie:
+                self.catalog_cache.clear()
+            elif klucze:
+                self.catalog_cache.invalidate(*klucze)
+            self._cache_last_poll = time.monotonic()
+        finally:
+            self._cache_poll_lock.release()
+
+    def _catalog_read(self, klucz, sql, params, jeden=False):
+        """
+        Odczyt katalogu przez pamięć podręczną (jeśli jest włączona).
+        """
+        def wczytaj():
+            with self.connection() as conn:
+                wiersze = [dict(w) for w in conn.execute(sql, params).fetchall()]
+            return (wiersze[0] if wiersze else None) if jeden else wiersze
+
+        if self.catalog_cache is None:
+            return wczytaj()
+        self._poll_product_changes()
+        return self.catalog_cache.get(klucz, wczytaj)
+
+    def get_product(self, produkt_id):
+        """
+        Zwraca produkt jako słownik (None, jeśli nie istnieje).
+        """
+        return self._catalog_read(('produkt', produkt_id), 'SELECT * FROM produkty WHERE id = ?', (produkt_id,), jeden=True)
+
+    def get_products_by_category(self, kategoria_id):
+        """
+        Zwraca listę produktów kategorii.
+        """
+        return self._catalog_read(('kategoria', kategoria_id),
+                                  'SELECT * FROM produkty WHERE kategoria_id = ? ORDER BY id', (kategoria_id,))
+
+    def get_categories(self):
+        """
+        Zwraca listę kategorii.
+        """
+        return self._catalog_read(('kategorie',), 'SELECT * FROM kategorie ORDER BY id', ())
+
+    def update_product(self, produkt_id, cena=None, stan_magazynowy=None):
+        """
+        Zmienia cenę i/lub stan magazynowy produktu i od razu unieważnia jego wpisy w pamięci podręcznej.
+        """
+        with self.connection() as conn:
+            with conn:
+                wiersz = conn.execute('''
+                    UPDATE produkty
+                    SET cena = COALESCE(?, cena), stan_magazynowy = COALESCE(?, stan_magazynowy)
+                    WHERE id = ?
+                    RETURNING kategoria_id
+                ''', (cena, stan_magazynowy, produkt_id)).fetchone()
+        if self.catalog_cache is not None and wiersz is not None:
+            self.catalog_cache.invalidate(('produkt', produkt_id), ('kategoria', wiersz[0]))
+        return wiersz is not None
+
+    def prune_product_changes(self, max_age_seconds=3600):
+        """
+        Usuwa z dziennika zmian produktów wpisy starsze niż max_age_seconds
+        (muszą być dłuższe niż poll_interval wszystkich używających go procesów).
+        """
+        with self.connection() as conn:
+            conn.execute("DELETE FROM zmiany_produktow WHERE czas < datetime('now', ?)",
+                         (f'-{int(max_age_seconds)} seconds',))
+
+    def _nowe_id(self, conn, tabela):
+        """
+        Id nowego wiersza tabeli: None (nadaje je SQLite), a w shardzie najmniejsza liczba
+        większa od MAX(id) shardu i od baza_id z informacje_shardu, przystająca do numeru
+        shardu modulo liczba shardów - shardy nadają więc id bez uzgadniania między sobą,
+        a id pozostają unikalne we wszystkich shardach.
+        """
+        if self.shard is None:
+            return None
+        numer, liczba = self.shard
+        ostatnie = conn.execute(f'SELECT MAX(COALESCE(MAX(id), 0), COALESCE((SELECT baza_id FROM informacje_shardu), 0)) '
+                                f'FROM {tabela}').fetchone()[0]
+        return ostatnie + 1 + (numer - ostatnie - 1) % liczba
+
+    def _zloz_zamowienie(self, conn, klient_id, pozycje, metoda_platnosci='karta'):
+        """
+        Składa jedno zamówienie w bieżącej transakcji: zmniejsza stan magazynowy zamówionych
+        produktów (tylko jeśli wystarcza), zapisuje zamówienie i płatność.
+        """
+        ilosci = {}
+        for produkt_id, ilosc in pozycje:
+            ilosci[produkt_id] = ilosci.get(produkt_id, 0) + ilosc
+        kwota = 0.0
+        for produkt_id, ilosc in sorted(ilosci.items()):
+            # fetchall kończy wykonanie instrukcji, inaczej RELEASE SAVEPOINT zgłosiłby błąd
+            wiersze = conn.execute('UPDATE produkty SET stan_magazynowy = stan_magazynowy - ? '
+                                   'WHERE id = ? AND stan_magazynowy >= ? RETURNING cena',
+                                   (ilosc, produkt_id, ilosc)).fetchall()
+            if not wiersze:
+                raise BrakTowaru(produkt_id, ilosc)
+            kwota += wiersze[0][0] * ilosc
+        dzisiaj = date.today().isoformat()
+        zamowienie_id = conn.execute(
+            "INSERT INTO zamowienia (id, klient_id, data_zamowienia, status) VALUES (?, ?, ?, 'nowe')",
+            (self._nowe_id(conn, 'zamowienia'), klient_id, dzisiaj)).lastrowid
+        conn.execute('INSERT INTO platnosci (id, zamowienie_id, kwota, metoda_platnosci, data_platnosci) '
+                     'VALUES (?, ?, ?, ?, ?)',
+                     (self._nowe_id(conn, 'platnosci'), zamowienie_id, round(kwota, 2), metoda_platnosci, dzisiaj))
+        return zamowienie_id
+
+    def place_order(self, klient_id, pozycje, metoda_platnosci='karta', max_retries=5):
+        """
+        Składa zamówienie klienta w jednej transakcji: rezerwuje stan magazynowy zamówionych
+        produktów, zapisuje zamówienie ze statusem 'nowe' i płatność według aktualnych cen.
+        :param pozycje: Lista par (produkt_id, ilosc).
+        :return: Id nowego zamówienia.
+        :raises BrakTowaru: Produkt nie istnieje lub jego stan magazynowy jest za mały.
+        """
+        return self.place_orders([(klient_id, pozycje, metoda_platnosci)], max_retries=max_retries)[0]
+
+    def place_orders(self, zamowienia, return_exceptions=False, max_retries=5):
+        """
+        Składa wiele zamówień w jednej transakcji (zapis grupowy): jeden COMMIT i jedna
+        synchronizacja dziennika na całą paczkę zamiast na każde zamówienie. Każde
+        zamówienie wykonuje się we własnym punkcie zapisu (SAVEPOINT).
+        Transakcja zaczyna się od BEGIN IMMEDIATE, więc blokadę zapisu bierze od razu
+        i nie może się zakleszczyć z innym piszącym przy przejściu z odczytu do zapisu.
+        Gdy baza jest zajęta dłużej niż busy_timeout połączenia, próba jest ponawiana
+        po losowym opóźnieniu, najwyżej max_retries razy. Transakcja otwarta wcześniej na
+        tym samym połączeniu (np. przez zapis wykonany bezpośrednio na self.conn) jest przed
+        BEGIN IMMEDIATE zatwierdzana, jak każda jednostka pracy w connection().
+        :param zamowienia: Lista krotek (klient_id, pozycje[, metoda_platnosci]) jak dla place_order.
+        :param return_exceptions: Zwraca BrakTowaru w miejscu id nieudanego zamówienia
+                                  zamiast wycofywać całą paczkę.
+        :return: Lista id nowych zamówień w kolejności zamowienia.
+        """
+        with self._operation('place_orders') as op, self.connection() as conn:
+            op['rows'] = len(zamowienia)
+            if conn.in_transaction:
+                conn.commit() # BEGIN IMMEDIATE nie może rozpocząć transakcji wewnątrz innej
+            start = time.perf_counter()
+            for proba in range(max_retries + 1):
+                try:
+                    conn.execute('BEGIN IMMEDIATE')
+                    break
+                except sqlite3.OperationalError as e:
+                    if 'locked' not in str(e) or proba == max_retries:
+                        raise
+                    time.sleep(random.uniform(0, 0.01 * 2 ** proba))
+            if self.instrumentation is not None:
+                self.instrumentation.record_wait('write_lock', time.perf_counter() - start)
+            try:
+                wyniki = []
+                for zamowienie in zamowienia:
+                    conn.execute('SAVEPOINT zamowienie')
+                    try:
+                        wyniki.append(self._zloz_zamowienie(conn, *zamowienie))
+                    except BrakTowaru as e:
+                        conn.execute('ROLLBACK TO zamowienie')
+                        if not return_exceptions:
+                            raise
+                        wyniki.append(e)
+                    finally:
+                        conn.execute('RELEASE zamowienie')
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return wyniki
+
+    def create_summary_tables(self):
+        """
+        Tworzy tabele podsumowań (suma zakupów klientów, przychody według miesiąca
+        i metody płatności), wypełnia je na podstawie istniejących danych
+        i zakłada wyzwalacze, które aktualizują je przy każdej zmianie płatności.
+        Raporty (top_customers, customer_total_spend, revenue_by_month) czytają
+        z nich zamiast złączeń po całej historii zamówień.
+        """
+        try:
+            with self.connection() as conn:
+                for sql in TABELE_PODSUMOWAN.values():
+                    conn.execute(sql)
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_podsumowanie_klientow_suma '
+                             'ON podsumowanie_klientow (suma_zakupow DESC)')
+                for nazwa, definicja in WYZWALACZE_PODSUMOWAN.items():
+                    conn.execute(f'CREATE TRIGGER IF NOT EXISTS {nazwa} {definicja}')
+                for sql in PRZELICZENIE_PODSUMOWAN:
+                    conn.execute(sql)
+        except sqlite3.Error as e:
+            print(f"Błąd tworzenia tabel podsumowań SQLite: {e}")
+
+    def refresh_summaries(self):
+        """
+        Przelicza tabele podsumowań od nowa (np. po zmianach wykonanych z wyłączonymi wyzwalaczami).
+        """
+        try:
+            with self.connection() as conn:
+                for sql in PRZELICZENIE_PODSUMOWAN:
+                    conn.execute(sql)
+        except sqlite3.Error as e:
+            print(f"Błąd odświeżania podsumowań SQLite: {e}")
+
+    def top_customers(self, limit=10):
+        """
+        Zwraca klientów o największej sumie zakupów: (klient_id, imie, nazwisko, liczba_platnosci, suma_zakupow).
+        """
+        with self.connection() as conn:
+            return conn.execute(ZAPYTANIA_RAPORTOW['top_customers'], (limit,)).fetchall()
+
+    def customer_total_spend(self, klient_id):
+        """
+        Zwraca sumę zakupów klienta (0.0, jeśli nie ma płatności).
+        """
+        with self.connection() as conn:
+            wiersz = conn.execute(ZAPYTANIA_RAPORTOW['customer_total_spend'], (klient_id,)).fetchone()
+        return wiersz[0] if wiersz else 0.0
+
+    def revenue_by_month(self, metoda_platnosci=None):
+        """
+        Zwraca przychody według miesięcy (miesiac, liczba_platnosci, suma_kwot),
+        opcjonalnie tylko dla jednej metody płatności.
+        """
+        with self.connection() as conn:
+            return conn.execute(ZAPYTANIA_RAPORTOW['revenue_by_month'], (metoda_platnosci, metoda_platnosci)).fetchall()
+
+    def revenue_by_payment_method(self):
+        """
+        Zwraca przychody według metody płatności (metoda_platnosci, liczba_platnosci, suma_kwot).
+        """
+        with self.connection() as conn:
+            return conn.execute(ZAPYTANIA_RAPORTOW['revenue_by_payment_method']).fetchall()
+
+    def create_search_index(self):
+        """
+        Tworzy indeks pełnotekstowy FTS5 nazw i opisów produktów (produkty_fts), wypełnia go
+        istniejącymi produktami i zakłada wyzwalacze, które utrzymują go przy każdej zmianie
+        nazwy lub opisu. Z indeksu korzystają search_products i search_products_by_prefix.
+        """
+        try:
+            with self.connection() as conn:
+                conn.execute(INDEKS_WYSZUKIWANIA)
+                for nazwa, definicja in WYZWALACZE_WYSZUKIWANIA.items():
+                    conn.execute(f'CREATE TRIGGER IF NOT EXISTS {nazwa} {definicja}')
+                for sql in PRZEBUDOWA_WYSZUKIWANIA:
+                    conn.execute(sql)
+        except sqlite3.Error as e:
+            print(f"Błąd tworzenia indeksu wyszukiwania SQLite: {e}")
+
+    def search_products(self, fraza, limit=20):
+        """
+        Wyszukuje produkty, których nazwa lub opis zawiera wszystkie słowa frazy (każde słowo
+        także jako początek dłuższego, np. "kołowr" znajduje "Kołowrotek"), bez względu na
+        wielkość liter i znaki diakrytyczne ("zylka" znajduje "Żyłka").
+        Wyniki są uporządkowane według trafności bm25, z trafieniami w nazwie WAGA_NAZWY razy
+        ważniejszymi niż w opisie. Wymaga create_search_index.
+        :return: Lista wierszy (id, nazwa, opis, cena, stan_magazynowy, kategoria_id, ranking),
+                 ranking malejąco.
+        """
+        tokeny = _tokeny_wyszukiwania(fraza)
+        if not tokeny:
+            return []
+        with self.connection() as conn:
+            return conn.execute(f'''
+                SELECT p.id, p.nazwa, p.opis, p.cena, p.stan_magazynowy, p.kategoria_id,
+                       -bm25(produkty_fts, {WAGA_NAZWY}, 1.0) AS ranking
+                FROM produkty_fts JOIN produkty p ON p.id = produkty_fts.rowid
+                WHERE produkty_fts MATCH ?
+                ORDER BY bm25(produkty_fts, {WAGA_NAZWY}, 1.0)
+                LIMIT ?
+            ''', (' '.join(f'"{t}"*' for t in tokeny), limit)).fetchall()
+
+    def search_products_by_prefix(self, prefiks, limit=20):
+        """
+        Zwraca produkty, których nazwa zaczyna się od prefiksu, bez względu na wielkość liter
+        i znaki diakrytyczne - indeksowany odpowiednik nazwa LIKE 'prefiks%'.
+        Wyniki są w kolejności id, bo wtedy FTS5 kończy przeglądanie po limit trafieniach,
+        zamiast sortować wszystkie (przy krótkich prefiksach mogą ich być setki tysięcy).
+        Wymaga create_search_index.
+        :return: Lista wierszy (id, nazwa, opis, cena, stan_magazynowy, kategoria_id), według id.
+        """
+        tokeny = _tokeny_wyszukiwania(prefiks)
+        if not tokeny:
+            return []
+        # ^ wiąże frazę z początkiem kolumny, a * czyni jej ostatnie słowo prefiksem
+        with self.connection() as conn:
+            return conn.execute('''
+                SELECT p.id, p.nazwa, p.opis, p.cena, p.stan_magazynowy, p.kategoria_id
+                FROM produkty_fts JOIN produkty p ON p.id = produkty_fts.rowid
+                WHERE produkty_fts MATCH ?
+                ORDER BY produkty_fts.rowid
+                LIMIT ?
+            ''', (f'nazwa : ^ "{" ".join(tokeny)}" *', limit)).fetchall()
+
+    def generate_test_data(self):
+        """
+        Generuje przykładowe dane dla kategorii, produktów i klientów.
+        Zwiększono liczbę klientów, produktów i zamówień.
+        """
+        # Kategorie
+        kategorie_data = [
+            ("Wędki", "Wędki wędkarskie"),
+            ("Przynęty", "Przynęty i zanęty"),
+            ("Akcesoria", "Akcesoria wędkarskie"),
+            ("Odzież", "Odzież wędkarska i obuwie"),
+            ("Elektronika", "Echosondy i GPS")
+        ]
+        
+        # Produkty (więcej produktów z opisami)
+        produkty = [
+            {"nazwa": "Wędka muchowa Master", "opis": "Profesjonalna wędka do muchowania", "cena": 299.99, "stan_magazynowy": 15, "kategoria_id": 1},
+            {"nazwa": "Kołowrotek spinningowy", "opis": "Kołowrotek do spinningu", "cena": 149.90, "stan_magazynowy": 20, "kategoria_id": 1},
+            {"nazwa": "Mocny sznurek wędkarski", "opis": "Nieprzemakalny sznurek wędkarski", "cena": 29.99, "stan_magazynowy": 30, "kategoria_id": 3},
+            {"nazwa": "Żyłka fluorowa", "opis": "Żyłka fluorowa o wysokiej jakości", "cena": 39.99, "stan_magazynowy": 25, "kategoria_id": 3},
+            {"nazwa": "Mucha dry", "opis": "Ręcznie wykonana mucha dry", "cena": 14.99, "stan_magazynowy": 40, "kategoria_id": 2},
+            {"nazwa": "Woblery zestaw", "opis": "Zestaw woblerów na drapieżniki", "cena": 79.99, "stan_magazynowy": 50, "kategoria_id": 2},
+            {"nazwa": "Podbierak teleskopowy", "opis": "Lekki podbierak z długą rączką", "cena": 89.00, "stan_magazynowy": 10, "kategoria_id": 3},
+            {"nazwa": "Kurtka przeciwdeszczowa", "opis": "Wodoodporna kurtka dla wędkarzy", "cena": 199.00, "stan_magazynowy": 12, "kategoria_id": 4},
+            {"nazwa": "Echosonda Deeper", "opis": "Inteligentna echosonda do smartfona", "cena": 499.00, "stan_magazynowy": 5, "kategoria_id": 5},
+            {"nazwa": "Plecak wędkarski", "opis": "Pojemny plecak na akcesoria", "cena": 120.00, "stan_magazynowy": 18, "kategoria_id": 3}
+        ]
+
+        # Klienci (więcej klientów)
+        klienci = [
+            {"imie": "Jan", "nazwisko": "Kowalski", "email": "jan.kowalski@email.pl", "telefon": "123456789", "adres": "ul. Gdańska 1"},
+            {"imie": "Anna", "nazwisko": "Wiśniewska", "email": "anna.wisniewska@email.pl", "telefon": "987654321", "adres": "ul. Krakowska 2"},
+            {"imie": "Piotr", "nazwisko": "Nowak", "email": "piotr.nowak@email.pl", "telefon": "555666777", "adres": "ul. Warszawska 3"},
+            {"imie": "Maria", "nazwisko": "Zając", "email": "maria.zajac@email.pl", "telefon": "111222333", "adres": "ul. Poznańska 4"},
+            {"imie": "Krzysztof", "nazwisko": "Lewandowski", "email": "krzysztof.l@email.pl", "telefon": "444555666", "adres": "ul. Wrocławska 5"}
+        ]
+
+        return kategorie_data, produkty, klienci
+
+    def generate_test_orders(self, liczba_klientow):
+        """
+        Generuje zamówienia (3-5 na klienta) i po jednej płatności na zamówienie,
+        z identyfikatorami nadanymi z góry, w tym samym formacie co
+        generate_test_data w wersji PostgreSQL.
+        """
+        zamowienia = []
+        platnosci = []
+        dzisiaj = datetime.now().date().isoformat()
+        for klient_id in range(1, liczba_klientow + 1):
+            for _ in range(random.randint(3, 5)):
+                zamowienie_id = len(zamowienia) + 1
+                zamowienia.append({'id': zamowienie_id, 'klient_id': klient_id,
+                                   'data_zamowienia': dzisiaj, 'status': 'nowe'})
+                platnosci.append({'id': zamowienie_id, 'zamowienie_id': zamowienie_id,
+                                  'kwota': round(random.uniform(50.0, 500.0), 2),
+                                  'metoda_platnosci': random.choice(['przelew', 'karta', 'gotowka']),
+                                  'data_platnosci': dzisiaj})
+        return zamowienia, platnosci
+
+    def generate_scaled_data(self, num_orders=10_000, seed=42, chunk_size=100_000,
+                             orders_per_customer=5, orders_per_product=1_000):
+        """
+        Generuje powtarzalny, syntetyczny zbiór danych o dowolnej wielkości.
+        Kolumny są generowane wektorowo w NumPy, a dane zwracane jako paczki
+        (nazwa_tabeli, DataFrame) o co najwyżej chunk_size wierszach, tabela po tabeli
+        w kolejności kluczy obcych, więc cały zbiór nigdy nie musi mieścić się w pamięci.
+        Każda paczka ma własny generator z ziarnem (seed, tabela, numer paczki),
+        więc te same argumenty zawsze dają te same dane.
+        """
+        # Ręcznie przygotowany katalog z generate_test_data jest bazą każdego zbioru
+        kategorie_data, produkty_bazowe, _ = self.generate_test_data()
+        liczba_klientow = max(1, num_orders // orders_per_customer)
+        liczba_produktow = max(len(produkty_bazowe), num_orders // orders_per_product)
+
+        yield 'kategorie', pd.DataFrame([{'id': i + 1, 'nazwa': k[0], 'opis': k[1]}
+                                         for i, k in enumerate(kategorie_data)])
+
+        # Produkty: katalog bazowy, a po nim syntetyczne warianty
+        yield 'produkty', pd.DataFrame([{'id': i + 1, **p} for i, p in enumerate(produkty_bazowe)])
+        nazwy_bazowe = np.array([p['nazwa'] for p in produkty_bazowe], dtype=object)
+        for nr_paczki, start in enumerate(range(len(produkty_bazowe) + 1, liczba_produktow + 1, chunk_size)):
+            rozmiar = min(chunk_size, liczba_produktow + 1 - start)
+            rng = np.random.default_rng([seed, 1, nr_paczki])
+            ids = np.arange(start, start + rozmiar)
+            yield 'produkty', pd.DataFrame({
+                'id': ids,
+                'nazwa': nazwy_bazowe[rng.integers(0, len(nazwy_bazowe), rozmiar)] + ' #' + ids.astype(str).astype(object),
+                'opis': 'Wariant produktu ' + ids.astype(str).astype(object),
+                'cena': np.round(rng.uniform(9.99, 999.99, rozmiar), 2),
+                'stan_magazynowy': rng.integers(0, 200, rozmiar),
+                'kategoria_id': rng.integers(1, len(kategorie_data) + 1, rozmiar),
+            })
+
+        # Klienci
+        imiona = np.array(IMIONA, dtype=object)
+        nazwiska = np.array(NAZWISKA, dtype=object)
+        ulice = np.array(ULICE, dtype=object)
+        for nr_paczki, start in enumerate(range(1, liczba_klientow + 1, chunk_size)):
+            rozmiar = min(chunk_size, liczba_klientow + 1 - start)
+            rng = np.random.default_rng([seed, 2, nr_paczki])
+            ids = np.arange(start, start + rozmiar)
+            yield 'klienci', pd.DataFrame({
+                'id': ids,
+                'imie': imiona[rng.integers(0, len(imiona), rozmiar)],
+                'nazwisko': nazwiska[rng.integers(0, len(nazwiska), rozmiar)],
+                'email': 'klient' + ids.astype(str).astype(object) + '@email.pl',
+                'telefon': rng.integers(100_000_000, 1_000_000_000, rozmiar).astype(str),
+                'adres': 'ul. ' + ulice[rng.integers(0, len(ulice), rozmiar)]
+                         + ' ' + rng.integers(1, 200, rozmiar).astype(str).astype(object),
+            })
+
+        # Zamówienia, a potem ich płatności (jedna płatność na zamówienie, to samo id).
+        # Paczki płatności odtwarzają pasującą paczkę zamówień z ziarna zamiast trzymać ją w pamięci.
+        for tabela in ('zamowienia', 'platnosci'):
+            for nr_paczki, start in enumerate(range(1, num_orders + 1, chunk_size)):
+                rozmiar = min(chunk_size, num_orders + 1 - start)
+                zamowienia, platnosci = self._generate_order_chunk(seed, nr_paczki, start, rozmiar, liczba_klientow)
+                yield tabela, zamowienia if tabela == 'zamowienia' else platnosci
+
+    def _generate_order_columns(self, seed, nr_paczki, start, rozmiar, liczba_klientow):
+        """
+        Generuje jedną paczkę zamówień i odpowiadających im płatności jako dwa słowniki
+        kolumn NumPy: daty jako datetime64, status i metoda płatności jako Categorical.
+        """
+        rng = np.random.default_rng([seed, 3, nr_paczki])
+        ids = np.arange(start, start + rozmiar)
+        daty_zamowien = np.datetime64(DATA_ODNIESIENIA, 'D') - rng.integers(1, 366, rozmiar)
+        daty_platnosci = daty_zamowien + rng.integers(0, 8, rozmiar) # Płatność do 7 dni po zamówieniu
+        zamowienia = {
+            'id': ids,
+            'klient_id': rng.integers(1, liczba_klientow + 1, rozmiar),
+            'data_zamowienia': daty_zamowien,
+            'status': pd.Categorical.from_codes(rng.integers(0, len(STATUSY_ZAMOWIEN), rozmiar), STATUSY_ZAMOWIEN),
+        }
+        platnosci = {
+            'id': ids,
+            'zamowienie_id': ids,
+            'kwota': np.round(rng.uniform(50.0, 1000.0, rozmiar), 2),
+            'metoda_platnosci': pd.Categorical.from_codes(rng.integers(0, len(METODY_PLATNOSCI), rozmiar),
+                                                          METODY_PLATNOSCI),
+            'data_platnosci': daty_platnosci,
+        }
+        return zamowienia, platnosci
+
+    def _generate_order_chunk(self, seed, nr_paczki, start, rozmiar, liczba_klientow):
+        """
+        Generuje jedną paczkę zamówień i odpowiadających im płatności jako dwa DataFrame.
+        """
+        zamowienia, platnosci = self._generate_order_columns(seed, nr_paczki, start, rozmiar, liczba_klientow)
+        return (pd.DataFrame({**zamowienia,
+                              'data_zamowienia': np.datetime_as_string(zamowienia['data_zamowienia'], unit='D'),
+                              'status': np.asarray(zamowienia['status'])}),
+                pd.DataFrame({**platnosci,
+                              'metoda_platnosci': np.asarray(platnosci['metoda_platnosci']),
+                              'data_platnosci': np.datetime_as_string(platnosci['data_platnosci'], unit='D')}))
+
+    def generate_dataset(self, num_orders=10_000, seed=42, chunk_size=100_000,
+                         orders_per_customer=5, orders_per_product=1_000):
+        """
+        Generuje te same dane co generate_scaled_data z tymi samymi argumentami, ale zbiera
+        je w ZbiorKolumnowy: zamówienia i płatności trafiają z generatora NumPy prosto do
+        buforów kolumn, bez DataFrame z napisami. Mieści w pamięci dziesiątki milionów
+        zamówień (ok. 50 bajtów na zamówienie z płatnością i częścią klientów), np. do
+        wielokrotnego ładowania przez import_chunks(zbior) albo export_chunks_to_json(zbior).
+        """
+        zbior = ZbiorKolumnowy()
+        paczki = self.generate_scaled_data(num_orders, seed, chunk_size, orders_per_customer, orders_per_product)
+        for tabela, df in takewhile(lambda paczka: paczka[0] != 'zamowienia', paczki):
+            zbior.append(tabela, df)
+        liczba_klientow = max(1, num_orders // orders_per_customer)
+        for nr_paczki, start in enumerate(range(1, num_orders + 1, chunk_size)):
+            rozmiar = min(chunk_size, num_orders + 1 - start)
+            zamowienia, platnosci = self._generate_order_columns(seed, nr_paczki, start, rozmiar, liczba_klientow)
+            zbior.append('zamowienia', zamowienia)
+            zbior.append('platnosci', platnosci)
+        return zbior
+
+    def export_to_json(self, kategorie, produkty, klienci, zamowienia=None, platnosci=None):
+        """
+        Eksportuje wygenerowane dane do pliku JSON.
+        Zamówienia i płatności (np. z generate_test_orders) są zapisywane, jeśli zostały podane.
+        """
+        kategorie_json = [{'id': i+1, 'nazwa': k[0], 'opis': k[1]} for i, k in enumerate(kategorie)]
+        produkty_json = [{'id': i+1, **p} for i, p in enumerate(produkty)]
+        klienci_json = [{'id': i+1, **k} for i, k in enumerate(klienci)]
+
+        data = {
+            'kategorie': kategorie_json,
+            'produkty': produkty_json,
             'klienci': klienci_json
         }
+        if zamowienia is not None:
+            data['zamowienia'] = list(zamowienia)
+        if platnosci is not None:
+            data['platnosci'] = list(platnosci)
 
         with open('dane_testowe.json', 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=4)
 
+    def export_chunks_to_json(self, chunks, filename='dane_testowe.json'):
+        """
+        Zapisuje paczki (nazwa_tabeli, DataFrame), np. z generate_scaled_data, do pliku JSON
+        w tym samym formacie co export_to_json, bez trzymania całych tabel w pamięci.
+        Paczki jednej tabeli muszą następować bezpośrednio po sobie.
+        """
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write('{')
+            biezaca_tabela = None
+            for tabela, df in chunks:
+                if tabela != biezaca_tabela:
+                    if biezaca_tabela is not None:
+                        f.write('\n    ],')
+                    f.write(f'\n    {json.dumps(tabela)}: [')
+                    biezaca_tabela = tabela
+                    pierwszy = True
+                if df.empty:
+                    continue
+                rekordy = df.to_json(orient='records', force_ascii=False)[1:-1]
+                f.write(('\n        ' if pierwszy else ',\n        ') + rekordy)
+                pierwszy = False
+            if biezaca_tabela is not None:
+                f.write('\n    ]')
+            f.write('\n}\n')
+
+    def export_tables_to_csv(self, katalog='export', workers=4, compression=None, max_file_size=None,
+                             batch_size=10_000):
+        """
+        Eksportuje bieżącą zawartość tabel do plików CSV, czytając je kursorem w paczkach,
+        więc zużycie pamięci nie zależy od rozmiaru tabel. Przy workers > 1 tabele są
+        eksportowane równolegle w osobnych procesach (formatowanie CSV w Pythonie jest
+        ograniczone przez GIL) z migawki bazy wykonanej najpierw przez API kopii zapasowej
+        do pliku tymczasowego, więc tabele są ze sobą spójne mimo osobnych połączeń
+        (kosztem jednej kopii bazy). Przy workers=1 wszystkie tabele są czytane w jednej
+        transakcji połączenia z connection() (albo w transakcji już na nim otwartej).
+        Obie ścieżki działają także dla bazy ':memory:'. Na końcu zapisywany jest
+        manifest.json z listą plików i liczbą wierszy każdej tabeli.
+        :param compression: None, 'gzip' lub 'zstd' (wymaga pakietu 'zstandard').
+        :param max_file_size: Limit rozmiaru jednego pliku w bajtach przed kompresją; z limitem
+                              pliki są numerowane (<tabela>.0000.csv...), bez niego każda tabela
+                              trafia do <tabela>.csv.
+        :return: Słownik manifestu.
+        """
+        if compression not in PodzielonyPlikCsv.ROZSZERZENIA:
+            raise ValueError(f"Nieznana kompresja: {compression}")
+        os.makedirs(katalog, exist_ok=True)
+        start = time.perf_counter()
+        with self._operation('export_tables_to_csv') as op:
+            if workers > 1:
+                deskryptor, migawka = tempfile.mkstemp(suffix='.db')
+                os.close(deskryptor)
+                try:
+                    cel = sqlite3.connect(migawka)
+                    try:
+                        with self.connection() as conn:
+                            conn.backup(cel)
+                        # Czytelnicy otwierają migawkę tylko do odczytu, bez plików -wal i -shm
+                        cel.execute('PRAGMA journal_mode=DELETE')
+                    finally:
+                        cel.close()
+                    with ProcessPoolExecutor(max_workers=workers) as pool:
+                        zadania = {tabela: pool.submit(_eksportuj_tabele_csv_w_procesie, migawka, tabela, katalog,
+                                                       compression, max_file_size, batch_size)
+                                   for tabela in KOLUMNY_TABEL}
+                        pliki = {tabela: zadanie.result() for tabela, zadanie in zadania.items()}
+                finally:
+                    os.remove(migawka)
+            else:
+                with self.connection() as conn:
+                    if not conn.in_transaction:
+                        conn.execute('BEGIN') # Wszystkie tabele z tej samej chwili
+                    pliki = {tabela: _eksportuj_tabele_csv(conn, tabela, katalog, compression, max_file_size,
+                                                           batch_size)
+                             for tabela in KOLUMNY_TABEL}
+            op['rows'] = sum(p['rows'] for pliki_tabeli in pliki.values() for p in pliki_tabeli)
+            op['bytes'] = sum(p['bytes'] for pliki_tabeli in pliki.values() for p in pliki_tabeli)
+        manifest = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'backend': 'sqlite',
+            'compression': compression,
+            'max_file_size': max_file_size,
+            'tables': {tabela: {'columns': list(KOLUMNY_TABEL[tabela]),
+                                'rows': sum(p['rows'] for p in pliki[tabela]),
+                                'files': pliki[tabela]}
+                       for tabela in KOLUMNY_TABEL},
+        }
+        with open(os.path.join(katalog, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=4)
+        print(f"Wyeksportowano tabele do {katalog} w {time.perf_counter() - start:.2f} s.")
+        return manifest
+
+    def export_to_parquet(self, katalog='.', batch_size=100_000, compression='zstd'):
+        """
+        Eksportuje wszystkie tabele do plików Parquet (<katalog>/<tabela>.parquet).
+        Wiersze są czytane kursorem w paczkach po batch_size, a każda paczka jest
+        zapisywana jako jedna skompresowana grupa wierszy (row group), więc zużycie
+        pamięci nie zależy od rozmiaru tabeli. Daty zapisywane są jako date32.
+        :param compression: Kodek Parquet ('zstd', 'snappy', 'gzip' lub None).
+        :return: Słownik {tabela: liczba wierszy}.
+        """
+        if pa is None:
+            raise RuntimeError("Eksport Parquet wymaga pakietu 'pyarrow'.")
+        os.makedirs(katalog, exist_ok=True)
+        wiersze = {}
+        with self._operation('export_to_parquet') as op, self.connection() as conn:
+            for tabela, kolumny in KOLUMNY_TABEL.items():
+                schemat = pa.schema([(k, getattr(pa, t)()) for k, t in zip(kolumny, TYPY_PARQUET[tabela])])
+                wiersze[tabela] = 0
+                sciezka = os.path.join(katalog, f'{tabela}.parquet')
+                kursor = conn.execute(f'SELECT {", ".join(kolumny)} FROM {tabela} ORDER BY id')
+                with pq.ParquetWriter(sciezka, schemat, compression=compression) as writer:
+                    while paczka := kursor.fetchmany(batch_size):
+                        # Daty są w SQLite tekstem ISO - Arrow zamienia je na date32 przy rzutowaniu
+                        writer.write_table(pa.Table.from_arrays(
+                            [pa.array(wartosci).cast(pole.type) if pole.type == pa.date32() else pa.array(wartosci, pole.type)
+                             for wartosci, pole in zip(zip(*paczka), schemat)], schema=schemat))
+                        wiersze[tabela] += len(paczka)
+                op['bytes'] += os.path.getsize(sciezka)
+            op['rows'] = sum(wiersze.values())
+        print(f"Wyeksportowano dane do Parquet: {wiersze}")
+        return wiersze
+
+    def import_from_parquet(self, katalog='.', batch_size=100_000):
+        """
+        Importuje pliki Parquet zapisane przez export_to_parquet (obu baz) przez executemany.
+        Pliki są czytane paczkami (record batch) po co najwyżej batch_size wierszy;
+        daty są zamieniane na tekst ISO, a kwoty DECIMAL (z PostgreSQL) na REAL.
+        Usuwa istniejące dane przed wstawieniem nowych.
+        :return: Słownik {tabela: liczba wierszy}.
+        """
+        if pa is None:
+            raise RuntimeError("Import Parquet wymaga pakietu 'pyarrow'.")
+        try:
+            wstawione = {}
+            with self._operation('import_from_parquet') as op, self.connection() as conn, self._bulk_load_indexes(conn), conn:
+                for tabela in reversed(KOLUMNY_TABEL):
+                    conn.execute(f'DELETE FROM {tabela}')
+                for tabela, kolumny in KOLUMNY_TABEL.items():
+                    sciezka = os.path.join(katalog, f'{tabela}.parquet')
+                    if not os.path.exists(sciezka):
+                        continue
+                    op['bytes'] += os.path.getsize(sciezka)
+                    sql = f'INSERT INTO {tabela} ({", ".join(kolumny)}) VALUES ({", ".join("?" * len(kolumny))})'
+                    wstawione[tabela] = 0
+                    for paczka in pq.ParquetFile(sciezka).iter_batches(batch_size=batch_size, columns=list(kolumny)):
+                        kolumny_paczki = []
+                        for nazwa in kolumny:
+                            kolumna = paczka.column(nazwa)
+                            if pa.types.is_date(kolumna.type):
+                                kolumna = kolumna.cast(pa.string())
+                            elif pa.types.is_decimal(kolumna.type):
+                                kolumna = kolumna.cast(pa.float64())
+                            kolumny_paczki.append(kolumna.to_pylist())
+                        conn.executemany(sql, zip(*kolumny_paczki))
+                        wstawione[tabela] += paczka.num_rows
+                        op['rows'] += paczka.num_rows
+            print(f"Zaimportowano dane z Parquet: {wstawione}")
+            return wstawione
+        except sqlite3.Error as e:
+            print(f"Błąd SQLite podczas importu Parquet: {e}")
+
+    def snapshot(self, sciezka='sklepWedkarski_snapshot.db', pages=STRONY_KROKU_KOPII):
+        """
+        Zapisuje spójną kopię całej bazy (z indeksami i wyzwalaczami) do pliku przez backup API
+        SQLite, kopiując strony krokami po pages. Między krokami baza jest dostępna: zmiany
+        zapisane przez self.conn trafiają do kopii na bieżąco, a zapis innego połączenia
+        rozpoczyna kopiowanie od nowa. Kopia powstaje w pliku tymczasowym, który dopiero
+        na końcu zastępuje istniejący plik sciezka.
+        :return: Liczba skopiowanych stron.
+        """
+        tymczasowy = sciezka + '.tmp'
+        strony = []
+        with self._operation('snapshot') as op:
+            start = time.perf_counter()
+            cel = sqlite3.connect(tymczasowy)
+            try:
+                self.conn.backup(cel, pages=pages, progress=lambda status, pozostalo, razem: strony.append(razem))
+            finally:
+                cel.close()
+            os.replace(tymczasowy, sciezka)
+            op['bytes'] = os.path.getsize(sciezka)
+        print(f"Zapisano kopię bazy do {sciezka} ({strony[-1] if strony else 0} stron) "
+              f"w {time.perf_counter() - start:.2f} s.")
+        return strony[-1] if strony else 0
+
+    def restore(self, sciezka='sklepWedkarski_snapshot.db', in_memory=False, pages=STRONY_KROKU_KOPII):
+        """
+        Zastępuje zawartość bazy kopią zapisaną przez snapshot, kopiując strony przez backup
+        API krokami po pages - bez ponownego generowania danych i wstawiania wierszy przez SQL.
+        Otwarta transakcja self.conn jest przed odtworzeniem wycofywana.
+        :param in_memory: Odtwarza kopię do nowej bazy w pamięci (db_path staje się ':memory:'),
+                          np. do testów z dużą liczbą odczytów; plik bazy pozostaje bez zmian.
+                          Niedostępne w trybie wielowątkowym (enable_pool), w którym każdy
+                          wątek miałby własną, pustą bazę w pamięci.
+        """
+        if in_memory and self._pool_profile is not None:
+            raise ValueError("Odtworzenie do bazy w pamięci nie działa w trybie wielowątkowym.")
+        zrodlo = sqlite3.connect(f'file:{sciezka}?mode=ro', uri=True)
+        try:
+            with self._operation('restore') as op:
+                start = time.perf_counter()
+                op['bytes'] = os.path.getsize(sciezka)
+                if in_memory:
+                    self.conn.close()
+                    self.db_path = ':memory:'
+                    self.setup_connection()
+                else:
+                    self.conn.rollback()
+                zrodlo.backup(self.conn, pages=pages)
+        finally:
+            zrodlo.close()
+        if self.catalog_cache is not None:
+            # Kopia mogła powstać bez dziennika zmian albo z innym numerem ostatniej zmiany
+            with self.conn:
+                self.conn.execute(DZIENNIK_ZMIAN_PRODUKTOW)
+                for nazwa, definicja in WYZWALACZE_ZMIAN_PRODUKTOW.items():
+                    self.conn.execute(f'CREATE TRIGGER IF NOT EXISTS {nazwa} {definicja}')
+            self._cache_last_seq = self.conn.execute('SELECT COALESCE(MAX(seq), 0) FROM zmiany_produktow').fetchone()[0]
+            self.catalog_cache.clear()
+        print(f"Odtworzono bazę z kopii {sciezka}{' w pamięci' if in_memory else ''} "
+              f"w {time.perf_counter() - start:.2f} s.")
+
     def import_from_json(self, filename):
         """
         Importuje dane z pliku JSON do bazy danych SQLite.
         Usuwa istniejące dane przed wstawieniem nowych.
-        Operacje na 'pozycje_zamowienia' zostały usunięte.
+        Plik jest wczytywany strumieniowo przez import_from_json_stream; jeśli nie ma
+        w nim zamówień, są one generowane (z płatnościami) dla wszystkich klientów.
+        """
+        wstawione = self.import_from_json_stream(filename)
+        if wstawione is not None and 'zamowienia' not in wstawione:
+            zamowienia, platnosci = self.generate_test_orders(wstawione.get('klienci', 0))
+            liczba_zamowien, liczba_platnosci = self.import_orders_bulk(zamowienia, platnosci)
+            wstawione.update(zamowienia=liczba_zamowien, platnosci=liczba_platnosci)
+        return wstawione
+
+    def import_orders_bulk(self, zamowienia, platnosci=(), batch_size=50_000):
+        """
+        Wstawia gotowe zamówienia i płatności (listy lub iteratory słowników, jak
+        z generate_test_orders) paczkami przez executemany, w jednej transakcji.
+        Zwraca liczbę wstawionych zamówień i płatności.
+        """
+        try:
+            with self.connection() as conn:
+                return self._insert_orders_bulk(conn, zamowienia, platnosci, batch_size)
+        except sqlite3.Error as e:
+            print(f"Błąd SQLite podczas wstawiania zamówień: {e}")
+            return 0, 0
+
+    def _insert_orders_bulk(self, conn, zamowienia, platnosci, batch_size=50_000):
+        """
+        Wstawia zamówienia i płatności paczkami po batch_size wierszy.
+        Rekordy bez 'id' dostają identyfikatory nadane z góry (od MAX(id) + 1),
+        dzięki czemu nie trzeba odczytywać lastrowid po każdym wierszu.
+        Nie zatwierdza transakcji.
+        """
+        liczniki = []
+        for tabela, rekordy in (('zamowienia', zamowienia), ('platnosci', platnosci)):
+            kolumny = KOLUMNY_TABEL[tabela]
+            nastepne_id = conn.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {tabela}').fetchone()[0]
+            sql = (f'INSERT INTO {tabela} ({", ".join(kolumny)}) '
+                   f'VALUES ({", ".join("?" * len(kolumny))})')
+            wstawione = 0
+            rekordy = iter(rekordy)
+            while True:
+                paczka = []
+                for r in islice(rekordy, batch_size):
+                    if r.get('id') is None:
+                        r = {**r, 'id': nastepne_id}
+                    nastepne_id = max(nastepne_id, r['id'] + 1)
+                    paczka.append(tuple(r.get(k) for k in kolumny))
+                if not paczka:
+                    break
+                conn.executemany(sql, paczka)
+                wstawione += len(paczka)
+            liczniki.append(wstawione)
+        return tuple(liczniki)
+
+    def import_from_json_stream(self, filename, batch_size=10_000, progress_callback=None, delta=False):
+        """
+        Importuje dane z pliku JSON do bazy danych SQLite w trybie strumieniowym.
+        Plik jest parsowany przyrostowo, tabela po tabeli, a rekordy trafiają do
+        executemany w paczkach po batch_size, więc zużycie pamięci jest stałe
+        niezależnie od rozmiaru pliku. Importowane są wszystkie tabele obecne w pliku
+        (także 'zamowienia' i 'platnosci' z export_chunks_to_json).
+        Usuwa istniejące dane przed wstawieniem nowych.
+        :param progress_callback: Funkcja wywoływana po każdej paczce jako
+                                  progress_callback(tabela, liczba_wierszy, wiersze_na_sekunde).
+        :param delta: Zamiast przeładowania wszystkiego wprowadza tylko różnice (zob. sync_from_json).
         """
+        if delta:
+            return self.sync_from_json(filename, batch_size)
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Wstawianie danych
-            with self.conn:
-                # Usuwanie wszystkich istniejących danych (ważne dla czystego importu)
-                # self.conn.execute('DELETE FROM pozycje_zamowienia') # Usunięto
-                self.conn.execute('DELETE FROM platnosci')
-                self.conn.execute('DELETE FROM zamowienia')
-                self.conn.execute('DELETE FROM produkty')
-                self.conn.execute('DELETE FROM klienci')
-                self.conn.execute('DELETE FROM kategorie')
-
-                # Kategorie
-                kategorie_sqlite = [(k['id'], k['nazwa'], k['opis']) for k in data['kategorie']]
-                self.conn.executemany('INSERT OR REPLACE INTO kategorie (id, nazwa, opis) VALUES (?, ?, ?)', kategorie_sqlite)
-
-                # Produkty
-                produkty_sqlite = [(p['id'], p['nazwa'], p['opis'], p['cena'], p['stan_magazynowy'], p['kategoria_id']) 
-                                   for p in data['produkty']] # Usunięto ograniczenie do 5 produktów
-                self.conn.executemany('INSERT OR REPLACE INTO produkty (id, nazwa, opis, cena, stan_magazynowy, kategoria_id) VALUES (?, ?, ?, ?, ?, ?)', produkty_sqlite)
-
-                # Klienci
-                klienci_sqlite = [(k['id'], k['imie'], k['nazwisko'], k['email'], k['telefon'], k['adres']) 
-                                  for k in data['klienci']]
-                self.conn.executemany('INSERT OR REPLACE INTO klienci (id, imie, nazwisko, email, telefon, adres) VALUES (?, ?, ?, ?, ?, ?)', klienci_sqlite)
-
-                # Dodanie nowych zamówień i płatności (dla wszystkich klientów, więcej zamówień)
-                for klient_id in range(1, len(data['klienci']) + 1): # Dla wszystkich klientów
-                    num_orders = random.randint(3, 5) # Więcej zamówień na klienta
-                    for _ in range(num_orders):
-                        zamowienie_id = self.conn.execute('''
-                            INSERT INTO zamowienia (klient_id, data_zamowienia, status)
-                            VALUES (?, ?, ?)
-                        ''', (klient_id, datetime.now().date().isoformat(), 'nowe')).lastrowid # Zmiana na .isoformat()
-                        
-                        # Płatność
-                        self.conn.execute('''
-                            INSERT INTO platnosci (zamowienie_id, kwota, metoda_platnosci, data_platnosci)
-                            VALUES (?, ?, ?, ?)
-                        ''', (zamowienie_id, random.uniform(50.0, 500.0), random.choice(['przelew', 'karta', 'gotowka']), datetime.now().date().isoformat())) # Zmiana na .isoformat()
-                self.conn.commit() # Zatwierdzenie wszystkich zmian
+            with self._operation('import_from_json_stream') as op, self.connection() as conn, self._bulk_load_indexes(conn), conn:
+                op['bytes'] = os.path.getsize(filename)
+                for tabela in reversed(KOLUMNY_TABEL):
+                    conn.execute(f'DELETE FROM {tabela}')
+
+                start = time.perf_counter()
+                wstawione = {}
+                for tabela, rekordy in iter_json_tables(filename, batch_size):
+                    kolumny = KOLUMNY_TABEL.get(tabela)
+                    if kolumny is None:
+                        print(f"Pominięto nieznaną tabelę '{tabela}' w pliku JSON.")
+                        continue
+                    sql = (f'INSERT OR REPLACE INTO {tabela} ({", ".join(kolumny)}) '
+                           f'VALUES ({", ".join("?" * len(kolumny))})')
+                    conn.executemany(sql, [tuple(r.get(k) for k in kolumny) for r in rekordy])
+                    wstawione[tabela] = wstawione.get(tabela, 0) + len(rekordy)
+                    op['rows'] += len(rekordy)
+                    if progress_callback:
+                        uplynelo = time.perf_counter() - start
+                        progress_callback(tabela, wstawione[tabela],
+                                          sum(wstawione.values()) / uplynelo if uplynelo > 0 else 0.0)
+            return wstawione
         except sqlite3.Error as e:
             print(f"Błąd SQLite podczas importu JSON: {e}")
-            if self.conn:
-                self.conn.rollback() # Wycofanie zmian w przypadku błędu
         except Exception as e:
             print(f"Ogólny błąd podczas importu JSON: {e}")
 
-    def print_all_tables(self):
+    def import_chunks(self, chunks, batch_size=50_000):
+        """
+        Importuje paczki (nazwa_tabeli, DataFrame), np. z generate_scaled_data,
+        bezpośrednio przez executemany, bez pliku pośredniego.
+        Usuwa istniejące dane przed wstawieniem nowych.
+        """
+        try:
+            wstawione = {}
+            with self._operation('import_chunks') as op, self.connection() as conn, self._bulk_load_indexes(conn), conn:
+                for tabela in reversed(KOLUMNY_TABEL):
+                    conn.execute(f'DELETE FROM {tabela}')
+                for tabela, df in chunks:
+                    kolumny = KOLUMNY_TABEL[tabela]
+                    sql = (f'INSERT INTO {tabela} ({", ".join(kolumny)}) '
+                           f'VALUES ({", ".join("?" * len(kolumny))})')
+                    wiersze = df[list(kolumny)].itertuples(index=False, name=None)
+                    while paczka := list(islice(wiersze, batch_size)):
+                        conn.executemany(sql, paczka)
+                    wstawione[tabela] = wstawione.get(tabela, 0) + len(df)
+                    op['rows'] += len(df)
+            return wstawione
+        except sqlite3.Error as e:
+            print(f"Błąd SQLite podczas importu danych: {e}")
+
+    def _stage_rows(self, conn, tabela, wiersze, batch_size=50_000):
+        """
+        Wstawia wiersze (krotki w kolejności KOLUMNY_TABEL) do tymczasowej tabeli
+        roboczej temp.staging_<tabela>, tworząc ją przy pierwszym użyciu. Kolumny tabeli
+        roboczej mają typy zadeklarowane w tabeli docelowej, więc wartości są zamieniane
+        (np. liczba na TEXT) tak samo jak w niej i niezmienione wiersze są rozpoznawane.
+        """
+        kolumny = KOLUMNY_TABEL[tabela]
+        typy = {wiersz[1]: wiersz[2] for wiersz in conn.execute(f'PRAGMA table_info({tabela})')}
+        conn.execute(f'CREATE TEMP TABLE IF NOT EXISTS staging_{tabela} '
+                     f'(id INTEGER PRIMARY KEY, {", ".join(f"{k} {typy[k]}" for k in kolumny[1:])})')
+        sql = f'INSERT INTO staging_{tabela} ({", ".join(kolumny)}) VALUES ({", ".join("?" * len(kolumny))})'
+        while paczka := list(islice(wiersze, batch_size)):
+            conn.executemany(sql, paczka)
+
+    def _apply_staged(self, conn, tabele):
+        """
+        Porównuje tabele robocze z docelowymi po kluczu i całym wierszu i wprowadza
+        tylko różnice: nowe i zmienione wiersze jednym INSERT ... ON CONFLICT DO UPDATE
+        na tabelę (najpierw tabele nadrzędne), a potem usuwa wiersze, których nie ma
+        w tabelach roboczych (najpierw tabele podrzędne). Niezmienione wiersze nie są
+        zapisywane, więc nie uruchamiają wyzwalaczy ani nie zmieniają indeksów.
+        Na końcu usuwa tabele robocze.
+        :return: Słownik {tabela: {'inserted': n, 'updated': n, 'deleted': n}}.
+        """
+        statystyki = {}
+        for tabela in [t for t in KOLUMNY_TABEL if t in tabele]:
+            kolumny = KOLUMNY_TABEL[tabela]
+            nowe = conn.execute(f'SELECT COUNT(*) FROM staging_{tabela} s '
+                                f'WHERE NOT EXISTS (SELECT 1 FROM {tabela} t WHERE t.id = s.id)').fetchone()[0]
+            # WHERE jest wymagane przez SQLite, aby ON CONFLICT nie został odczytany jako warunek złączenia
+            zmienione = conn.execute(f'''
+                INSERT INTO {tabela} ({", ".join(kolumny)})
+                SELECT {", ".join(f"s.{k}" for k in kolumny)}
+                FROM staging_{tabela} s LEFT JOIN {tabela} t ON t.id = s.id
+                WHERE t.id IS NULL OR {" OR ".join(f"t.{k} IS NOT s.{k}" for k in kolumny[1:])}
+                ON CONFLICT (id) DO UPDATE SET {", ".join(f"{k} = excluded.{k}" for k in kolumny[1:])}
+            ''').rowcount
+            statystyki[tabela] = {'inserted': nowe, 'updated': zmienione - nowe, 'deleted': 0}
+        for tabela in [t for t in reversed(KOLUMNY_TABEL) if t in tabele]:
+            statystyki[tabela]['deleted'] = conn.execute(
+                f'DELETE FROM {tabela} WHERE id NOT IN (SELECT id FROM staging_{tabela})').rowcount
+        for tabela in tabele:
+            conn.execute(f'DROP TABLE temp.staging_{tabela}')
+        return statystyki
+
+    def sync_chunks(self, chunks, batch_size=50_000):
+        """
+        Import przyrostowy paczek (nazwa_tabeli, DataFrame), np. z generate_scaled_data:
+        dane trafiają do tabel roboczych, a do bazy wprowadzane są tylko nowe, zmienione
+        i usunięte wiersze (zob. _apply_staged), w jednej transakcji.
+        Tabele nieobecne w paczkach pozostają bez zmian.
+        :return: Słownik {tabela: {'inserted': n, 'updated': n, 'deleted': n}}.
+        """
+        try:
+            tabele = []
+            with self._operation('sync_chunks') as op, self.connection() as conn:
+                for tabela, df in chunks:
+                    if tabela not in tabele:
+                        tabele.append(tabela)
+                    op['rows'] += len(df)
+                    self._stage_rows(conn, tabela, df[list(KOLUMNY_TABEL[tabela])].itertuples(index=False, name=None),
+                                     batch_size)
+                statystyki = self._apply_staged(conn, tabele)
+            print(f"Import przyrostowy: {statystyki}")
+            return statystyki
+        except sqlite3.Error as e:
+            print(f"Błąd SQLite podczas importu przyrostowego: {e}")
+            with self.connection() as conn:
+                for tabela in tabele:
+                    conn.execute(f'DROP TABLE IF EXISTS temp.staging_{tabela}')
+
+    def sync_from_json(self, filename, batch_size=10_000):
+        """
+        Import przyrostowy pliku JSON (jak import_from_json_stream, ale bez usuwania
+        danych): plik jest parsowany strumieniowo do tabel roboczych, a do bazy
+        wprowadzane są tylko nowe, zmienione i usunięte wiersze, w jednej transakcji.
+        Czas importu zależy od liczby zmian, a nie od rozmiaru tabel (poza jednorazowym
+        odczytem pliku).
+        :return: Słownik {tabela: {'inserted': n, 'updated': n, 'deleted': n}}.
+        """
+        try:
+            tabele = []
+            with self._operation('sync_from_json') as op, self.connection() as conn:
+                op['bytes'] = os.path.getsize(filename)
+                for tabela, rekordy in iter_json_tables(filename, batch_size):
+                    kolumny = KOLUMNY_TABEL.get(tabela)
+                    if kolumny is None:
+                        print(f"Pominięto nieznaną tabelę '{tabela}' w pliku JSON.")
+                        continue
+                    if tabela not in tabele:
+                        tabele.append(tabela)
+                    op['rows'] += len(rekordy)
+                    self._stage_rows(conn, tabela, (tuple(r.get(k) for k in kolumny) for r in rekordy), batch_size)
+                statystyki = self._apply_staged(conn, tabele)
+            print(f"Import przyrostowy: {statystyki}")
+            return statystyki
+        except sqlite3.Error as e:
+            print(f"Błąd SQLite podczas importu przyrostowego: {e}")
+            with self.connection() as conn:
+                for tabela in tabele:
+                    conn.execute(f'DROP TABLE IF EXISTS temp.staging_{tabela}')
+
+    def explain(self, sql, params=()):
+        """
+        Zwraca plan zapytania (EXPLAIN QUERY PLAN) jako listę wierszy tekstu.
+        """
+        with self.connection() as conn:
+            return [wiersz[3] for wiersz in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+
+    def run_query_workload(self, queries=None, warmup=3, repetitions=20):
+        """
+        Wykonuje nazwany zestaw zapytań (domyślnie ZAPYTANIA_TESTOWE): najpierw warmup
+        przebiegów rozgrzewających, potem repetitions mierzonych, pobierając wszystkie wiersze.
+        Zwraca {nazwa: {'timings_ms': [...], 'rows': n, 'plan': [...]}}.
+        """
+        wyniki = {}
+        with self.connection() as conn:
+            for nazwa, (sql, params) in (queries or ZAPYTANIA_TESTOWE).items():
+                for _ in range(warmup):
+                    conn.execute(sql, params).fetchall()
+                czasy = []
+                for _ in range(repetitions):
+                    start = time.perf_counter()
+                    wiersze = conn.execute(sql, params).fetchall()
+                    czasy.append((time.perf_counter() - start) * 1000)
+                wyniki[nazwa] = {'timings_ms': czasy, 'rows': len(wiersze), 'plan': self.explain(sql, params)}
+        return wyniki
+
+    def dump_table(self, table, batch_size=1000, limit=None, offset=0, after_id=None, out=None):
+        """
+        Wypisuje wiersze tabeli strumieniowo: kursor pobiera je paczkami przez fetchmany,
+        a każda paczka jest zapisywana do out jednym wywołaniem i od razu opróżniana (flush),
+        więc zużycie pamięci jest stałe, a pierwsze wiersze pojawiają się natychmiast.
+        :param limit: Maksymalna liczba wierszy (stronicowanie LIMIT/OFFSET razem z offset).
+        :param after_id: Stronicowanie po kluczu: tylko wiersze z id > after_id, rosnąco po id.
+        :param out: Strumień wyjściowy (domyślnie sys.stdout).
+        :return: Liczba wypisanych wierszy i id ostatniego z nich (do pobrania następnej strony),
+                 None dla tabeli bez kolumny id.
+        """
+        out = out or sys.stdout
+        sql = f'SELECT * FROM {table}'
+        params = []
+        if after_id is not None:
+            sql += ' WHERE id > ?'
+            params.append(after_id)
+        if after_id is not None or offset:
+            sql += ' ORDER BY id'
+        if limit is not None or offset:
+            sql += ' LIMIT ? OFFSET ?'
+            params += [-1 if limit is None else limit, offset]
+        liczba, ostatnie_id = 0, None
+        with self.connection() as conn:
+            cursor = conn.execute(sql, params)
+            nazwy = [opis[0] for opis in cursor.description]
+            indeks_id = nazwy.index('id') if 'id' in nazwy else None
+            while wiersze := cursor.fetchmany(batch_size):
+                out.write(''.join(' | '.join(str(v) for v in w) + '\n' for w in wiersze))
+                out.flush()
+                liczba += len(wiersze)
+                if indeks_id is not None:
+                    ostatnie_id = wiersze[-1][indeks_id]
+        return liczba, ostatnie_id
+
+    def print_all_tables(self, batch_size=1000, limit=None):
         """
         Wyświetla zawartość wszystkich tabel w bazie danych.
+        Wiersze są pobierane i wypisywane paczkami po batch_size (patrz dump_table).
+        :param limit: Maksymalna liczba wierszy wyświetlanych z każdej tabeli (None - wszystkie).
         """
         try:
             print("\n=== Zawartość tabel SQLite ===")
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self.connection() as conn:
+                cursor = conn.cursor()
                 cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
                 tables = cursor.fetchall()
                 
@@ -237,10 +2616,7 @@ class SklepWedkarskiSQLite:
                     print(" | ".join(columns))
                     print("-" * 50)
                     
-                    cursor.execute(f"SELECT * FROM {table}")
-                    rows = cursor.fetchall()
-                    for row in rows:
-                        print(" | ".join(str(value) for value in row))
+                    self.dump_table(table, batch_size, limit)
                     
                     print("-" * 50)
         except sqlite3.Error as e:
@@ -250,11 +2626,875 @@ class SklepWedkarskiSQLite:
         """
         Zamyka połączenie z bazą danych SQLite.
         """
-        if self.conn:
+        if self.instrumentation is not None:
+            self.instrumentation.close()
+        with self._pool_lock:
+            polaczenia, self._pool_connections = self._pool_connections, []
+        self._pool_local = threading.local()
+        for conn in [self.conn] + polaczenia:
+            if conn:
+                try:
+                    conn.close()
+                except Exception as e:
+                    print(f"Błąd zamykania połączenia SQLite: {e}")
+
+
+class GrupowyZapisZamowien:
+    """
+    Zapis grupowy zamówień: wiele wątków zgłasza pojedyncze zamówienia, a jeden
+    wątek zapisujący składa wszystkie oczekujące przez place_orders, w jednej
+    transakcji na paczkę. Pod obciążeniem zamienia wiele małych transakcji na kilka
+    większych, a wątki nie konkurują o blokadę zapisu bazy.
+
+    Użycie:
+        zapis = GrupowyZapisZamowien(sklep)  # sklep w trybie enable_pool
+        zamowienie_id = zapis.place_order(1, [(3, 2)])  # z dowolnego wątku
+        zapis.close()
+    """
+    def __init__(self, sklep, max_batch=100, max_delay=0.0):
+        """
+        :param sklep: SklepWedkarskiSQLite w trybie wielowątkowym (enable_pool).
+        :param max_batch: Największa liczba zamówień w jednej transakcji.
+        :param max_delay: Czas w sekundach, przez jaki wątek zapisujący czeka na kolejne zamówienia;
+                          0 oznacza paczkę z tego, co nazbierało się podczas zapisu poprzedniej.
+        """
+        if sklep._pool_profile is None:
+            raise ValueError("Zapis grupowy wymaga trybu wielowątkowego (enable_pool).")
+        self.sklep = sklep
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.paczki = 0
+        self.zamowienia = 0
+        self._kolejka = queue.Queue()
+        self._watek = threading.Thread(target=self._run, name='zapis-grupowy-zamowien', daemon=True)
+        self._watek.start()
+
+    def submit(self, klient_id, pozycje, metoda_platnosci='karta'):
+        """
+        Dodaje zamówienie do kolejki i zwraca Future z jego id (lub wyjątkiem BrakTowaru).
+        """
+        future = Future()
+        self._kolejka.put(((klient_id, pozycje, metoda_platnosci), future))
+        return future
+
+    def place_order(self, klient_id, pozycje, metoda_platnosci='karta'):
+        """
+        Dodaje zamówienie do kolejki i czeka na zatwierdzenie jego paczki. Zwraca id zamówienia.
+        """
+        return self.submit(klient_id, pozycje, metoda_platnosci).result()
+
+    def _run(self):
+        """
+        Wątek zapisujący: zbiera do max_batch zamówień z kolejki i składa je w jednej transakcji.
+        """
+        koniec = False
+        while not koniec:
+            element = self._kolejka.get()
+            if element is None:
+                break
+            paczka = [element]
+            termin = time.monotonic() + self.max_delay
+            while len(paczka) < self.max_batch:
+                try:
+                    element = self._kolejka.get(timeout=max(termin - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if element is None:
+                    koniec = True
+                    break
+                paczka.append(element)
             try:
-                self.conn.close()
+                wyniki = self.sklep.place_orders([zamowienie for zamowienie, _ in paczka], return_exceptions=True)
             except Exception as e:
-                print(f"Błąd zamykania połączenia SQLite: {e}")
+                wyniki = [e] * len(paczka)
+            self.paczki += 1
+            self.zamowienia += len(paczka)
+            for (_, future), wynik in zip(paczka, wyniki):
+                if isinstance(wynik, Exception):
+                    future.set_exception(wynik)
+                else:
+                    future.set_result(wynik)
+
+    def close(self):
+        """
+        Składa zamówienia pozostałe w kolejce i zatrzymuje wątek zapisujący.
+        """
+        self._kolejka.put(None)
+        self._watek.join()
+
+
+class SklepWedkarskiSQLiteShardowany:
+    """
+    Tryb shardowany SklepWedkarskiSQLite: klienci, ich zamówienia i płatności są rozłożeni
+    na num_shards plików bazy według hasha klient_id (shard_klienta), a kategorie i produkty
+    są kopiowane do każdego shardu. Każdy shard to zwykła baza sklepu (SklepWedkarskiSQLite)
+    z własną blokadą zapisu, więc zamówienia klientów z różnych shardów zapisują się
+    równolegle. Raporty obejmujące wszystkich klientów są wykonywane jednocześnie na
+    wszystkich shardach w puli procesów, a ich częściowe agregaty scalane.
+    Stan magazynowy jest dzielony między shardy (każdy shard sprzedaje swoją część),
+    bo wspólny licznik wymagałby zapisu do jednej bazy przy każdym zamówieniu. Gdy części
+    shardu nie wystarcza, brakująca ilość jest dobierana z pozostałych shardów
+    (_dobierz_stan), więc zamówienie jest odrzucane tylko wtedy, gdy towaru brakuje
+    łącznie, czyli zgodnie ze stock_level.
+    """
+    def __init__(self, db_path='sklepWedkarski.db', num_shards=4, profile=None, workers=None):
+        """
+        :param db_path: Ścieżka bazowa; shard i to plik <nazwa>_shard<i><rozszerzenie>.
+        :param num_shards: Liczba shardów (nie może się zmienić po utworzeniu plików).
+        :param profile: Profil połączenia każdego shardu (jak w SklepWedkarskiSQLite).
+        :param workers: Liczba procesów wykonujących raporty; domyślnie num_shards.
+        """
+        if db_path == ':memory:':
+            raise ValueError("Tryb shardowany wymaga bazy zapisanej w plikach.")
+        rdzen, rozszerzenie = os.path.splitext(db_path)
+        self.db_paths = [f'{rdzen}_shard{numer}{rozszerzenie}' for numer in range(num_shards)]
+        self.shards = [SklepWedkarskiSQLite(sciezka, profile) for sciezka in self.db_paths]
+        for numer, sklep in enumerate(self.shards):
+            sklep.shard = (numer, num_shards)
+        self.workers = workers or num_shards
+        self._pool = None
+
+    def shard_for(self, klient_id):
+        """
+        Zwraca numer shardu klienta (zamówienia bez klienta trafiają do shardu 0).
+        """
+        return 0 if klient_id is None else shard_klienta(klient_id, len(self.shards))
+
+    def set_profile(self, profile):
+        for sklep in self.shards:
+            sklep.set_profile(profile)
+
+    def enable_pool(self, profile='oltp', busy_timeout=5.0):
+        """
+        Włącza tryb wielowątkowy w każdym shardzie (zob. SklepWedkarskiSQLite.enable_pool).
+        """
+        for sklep in self.shards:
+            sklep.enable_pool(profile, busy_timeout)
+
+    def create_tables(self):
+        """
+        Tworzy tabele w każdym shardzie i zapisuje w nim jego numer; sprawdza, czy
+        istniejące pliki należą do zbioru o tej samej liczbie shardów. Dokańcza też
+        przeniesienia stanu przerwane przy poprzednim użyciu plików.
+        """
+        for numer, sklep in enumerate(self.shards):
+            sklep.create_tables()
+            with sklep.connection() as conn:
+                conn.execute(INFORMACJE_SHARDU)
+                for sql in PRZENIESIENIA_STANU:
+                    conn.execute(sql)
+                wiersz = conn.execute('SELECT numer_shardu, liczba_shardow FROM informacje_shardu').fetchone()
+                if wiersz is None:
+                    conn.execute('INSERT INTO informacje_shardu VALUES (?, ?, 0)', sklep.shard)
+                elif tuple(wiersz) != sklep.shard:
+                    raise ValueError(f"Plik {sklep.db_path} jest shardem {wiersz[0]} z {wiersz[1]}, "
+                                     f"a nie {numer} z {len(self.shards)}.")
+        self._dokoncz_przeniesienia()
+
+    def create_indexes(self):
+        for sklep in self.shards:
+            sklep.create_indexes()
+
+    def create_summary_tables(self):
+        for sklep in self.shards:
+            sklep.create_summary_tables()
+
+    def import_chunks(self, chunks, batch_size=50_000):
+        """
+        Importuje paczki (nazwa_tabeli, DataFrame), np. z generate_scaled_data lub ZbiorKolumnowy,
+        rozdzielając je między shardy: kategorie i produkty trafiają do każdego shardu (ze
+        stanem magazynowym podzielonym między shardy), klienci według hasha id, zamówienia
+        według hasha klient_id, a płatności do shardu swojego zamówienia - zamówienia muszą
+        więc poprzedzać swoje płatności, jak w generate_scaled_data. Każdy shard ładuje się
+        we własnej transakcji. Usuwa istniejące dane przed wstawieniem nowych.
+        :raises ValueError: Płatność dotyczy zamówienia, którego nie było we wcześniejszych
+                            paczkach; import jest wtedy wycofywany we wszystkich shardach.
+        """
+        liczba = len(self.shards)
+        # Numer shardu zamówienia według jego id (-1: nieznane zamówienie)
+        shardy_zamowien = np.zeros(0, dtype=np.int8)
+        baza_id = 0
+        wstawione = {}
+        try:
+            with ExitStack() as stos:
+                for sklep in self.shards:
+                    stos.enter_context(sklep._bulk_load_indexes(sklep.conn))
+                    stos.enter_context(sklep.conn)
+                    for tabela in reversed(KOLUMNY_TABEL):
+                        sklep.conn.execute(f'DELETE FROM {tabela}')
+                    # Wczytany stan zastępuje także przeniesienia między shardami
+                    sklep.conn.execute('DELETE FROM przeniesienia_stanu')
+                    sklep.conn.execute('DELETE FROM przyjete_przeniesienia')
+                for tabela, df in chunks:
+                    kolumny = KOLUMNY_TABEL[tabela]
+                    if tabela == 'kategorie':
+                        czesci = [df] * liczba
+                    elif tabela == 'produkty':
+                        stan = df['stan_magazynowy'].to_numpy(dtype=np.int64)
+                        czesci = [df.assign(stan_magazynowy=stan // liczba + (numer < stan % liczba))
+                                  for numer in range(liczba)]
+                    else:
+                        if tabela == 'klienci':
+                            numery = shard_klienta(df['id'].to_numpy(dtype=np.int64), liczba)
+                        elif tabela == 'zamowienia':
+                            klienci = df['klient_id']
+                            numery = np.where(klienci.isna(), 0,
+                                              shard_klienta(klienci.fillna(0).to_numpy(dtype=np.int64), liczba))
+                            ids = df['id'].to_numpy(dtype=np.int64)
+                            if len(ids) and ids.max() >= len(shardy_zamowien):
+                                shardy_zamowien = np.concatenate([
+                                    shardy_zamowien,
+                                    np.full(max(ids.max() + 1, 2 * len(shardy_zamowien)) - len(shardy_zamowien),
+                                            -1, dtype=np.int8)])
+                            shardy_zamowien[ids] = numery
+                        else:
+                            zamowienia = df['zamowienie_id'].fillna(-1).to_numpy(dtype=np.int64)
+                            znane = (zamowienia >= 0) & (zamowienia < len(shardy_zamowien))
+                            numery = np.full(len(df), -1, dtype=np.int64)
+                            numery[znane] = shardy_zamowien[zamowienia[znane]]
+                            if (numery < 0).any():
+                                raise ValueError(
+                                    f"{int((numery < 0).sum())} płatności dotyczy nieznanych zamówień, np. płatność "
+                                    f"{df['id'].to_numpy()[numery < 0][0]} - zamówienia muszą poprzedzać płatności.")
+                        if tabela != 'klienci' and len(df):
+                            baza_id = max(baza_id, int(df['id'].max()))
+                        czesci = [df[numery == numer] for numer in range(liczba)]
+                    sql = (f'INSERT INTO {tabela} ({", ".join(kolumny)}) '
+                           f'VALUES ({", ".join("?" * len(kolumny))})')
+                    for sklep, czesc in zip(self.shards, czesci):
+                        wiersze = czesc[list(kolumny)].itertuples(index=False, name=None)
+                        while paczka := list(islice(wiersze, batch_size)):
+                            sklep.conn.executemany(sql, paczka)
+                    wstawione[tabela] = wstawione.get(tabela, 0) + len(df)
+                # Nowe zamówienia i płatności dostaną id większe od wszystkich wczytanych
+                for sklep in self.shards:
+                    sklep.conn.execute('UPDATE informacje_shardu SET baza_id = ?', (baza_id,))
+            return wstawione
+        except sqlite3.Error as e:
+            print(f"Błąd SQLite podczas importu danych do shardów: {e}")
+
+    def place_orders(self, zamowienia, return_exceptions=False, max_retries=5):
+        """
+        Składa zamówienia w shardach ich klientów: zamówienia jednego shardu w jednej
+        transakcji (zob. SklepWedkarskiSQLite.place_orders). Transakcje shardów są
+        niezależne - gdy zamówienie w jednym shardzie się nie powiedzie (bez
+        return_exceptions), zamówienia shardów obsłużonych wcześniej pozostają zapisane.
+        :return: Lista id nowych zamówień w kolejności zamowienia.
+        """
+        grupy = {}
+        for i, zamowienie in enumerate(zamowienia):
+            grupy.setdefault(self.shard_for(zamowienie[0]), []).append(i)
+        wyniki = [None] * len(zamowienia)
+        for numer, indeksy in sorted(grupy.items()):
+            czesc = self._zloz_w_shardzie(numer, [zamowienia[i] for i in indeksy], return_exceptions, max_retries)
+            for i, wynik in zip(indeksy, czesc):
+                wyniki[i] = wynik
+        return wyniki
+
+    def place_order(self, klient_id, pozycje, metoda_platnosci='karta', max_retries=5):
+        """
+        Składa zamówienie w shardzie klienta (zob. SklepWedkarskiSQLite.place_order).
+        """
+        return self._zloz_w_shardzie(self.shard_for(klient_id), [(klient_id, pozycje, metoda_platnosci)],
+                                     False, max_retries)[0]
+
+    def _zloz_w_shardzie(self, numer, zamowienia, return_exceptions, max_retries):
+        """
+        Składa zamówienia w jednym shardzie. Gdy zamówieniu brakuje towaru, dobiera
+        brakującą część stanu z pozostałych shardów i ponawia je, najwyżej max_retries razy
+        (dobrany stan mogą w międzyczasie wykupić równoległe zamówienia); BrakTowaru zostaje,
+        gdy w żadnym innym shardzie nie ma już tego produktu albo skończyły się ponowienia.
+        """
+        wyniki = [None] * len(zamowienia)
+        do_zlozenia = list(range(len(zamowienia)))
+        for proba in range(max_retries + 1):
+            try:
+                czesc = self.shards[numer].place_orders([zamowienia[i] for i in do_zlozenia],
+                                                        return_exceptions, max_retries)
+            except BrakTowaru as e:
+                # Paczka została wycofana, więc shard potrzebuje produktu dla wszystkich jej zamówień
+                potrzeba = sum(ilosc for i in do_zlozenia for produkt_id, ilosc in zamowienia[i][1]
+                               if produkt_id == e.produkt_id)
+                if proba == max_retries or not self._dobierz_stan(numer, e.produkt_id, potrzeba):
+                    raise
+                continue
+            ponow = []
+            for i, wynik in zip(do_zlozenia, czesc):
+                wyniki[i] = wynik
+                if (isinstance(wynik, BrakTowaru) and proba < max_retries
+                        and self._dobierz_stan(numer, wynik.produkt_id, wynik.ilosc)):
+                    ponow.append(i)
+            if not ponow:
+                break
+            do_zlozenia = ponow
+        return wyniki
+
+    def _dobierz_stan(self, numer, produkt_id, ilosc):
+        """
+        Przenosi do shardu numer stan magazynowy produktu z pozostałych shardów, tak aby
+        miał go co najmniej ilosc. Każda część jest zdejmowana ze shardu oddającego razem
+        z wpisem w jego dzienniku przeniesień, a dopiero potem dodawana, więc towar nigdy
+        nie zostanie sprzedany dwa razy, a przeniesienie przerwane między tymi krokami
+        dokańcza _dokoncz_przeniesienia.
+        Zwraca, czy warto ponowić zamówienie: shard ma już dość towaru (np. po równoległej
+        zmianie stanu) albo przeniesiono do niego jakąkolwiek część.
+        """
+        self._dokoncz_przeniesienia()
+        with self.shards[numer].connection() as conn:
+            wiersz = conn.execute('SELECT stan_magazynowy FROM produkty WHERE id = ?', (produkt_id,)).fetchone()
+        if wiersz is None:
+            return False
+        brak = ilosc - wiersz[0]
+        if brak <= 0:
+            return True
+        przeniesione = 0
+        for inny, sklep in enumerate(self.shards):
+            if inny == numer or przeniesione >= brak:
+                continue
+            with sklep.connection() as conn:
+                if conn.in_transaction:
+                    conn.commit() # BEGIN IMMEDIATE nie może rozpocząć transakcji wewnątrz innej
+                # Blokada zapisu od początku: stan nie zmieni się między odczytem a zdjęciem części
+                conn.execute('BEGIN IMMEDIATE')
+                wiersz = conn.execute('SELECT stan_magazynowy FROM produkty WHERE id = ?', (produkt_id,)).fetchone()
+                czesc = min(wiersz[0] if wiersz else 0, brak - przeniesione)
+                if czesc <= 0:
+                    continue
+                conn.execute('UPDATE produkty SET stan_magazynowy = stan_magazynowy - ? WHERE id = ?',
+                             (czesc, produkt_id))
+                przeniesienie_id = conn.execute(
+                    'INSERT INTO przeniesienia_stanu (produkt_id, ilosc, do_shardu) VALUES (?, ?, ?)',
+                    (produkt_id, czesc, numer)).lastrowid
+            self._przyjmij_przeniesienie(inny, przeniesienie_id, produkt_id, czesc, numer)
+            przeniesione += czesc
+        return przeniesione > 0
+
+    def _przyjmij_przeniesienie(self, z_shardu, przeniesienie_id, produkt_id, ilosc, do_shardu):
+        """
+        Dodaje przeniesiony stan w shardzie docelowym - tylko raz, bo numer przeniesienia
+        trafia do przyjete_przeniesienia w tej samej transakcji - i usuwa wpis z dziennika
+        shardu oddającego.
+        """
+        with self.shards[do_shardu].connection() as conn:
+            if conn.execute('INSERT OR IGNORE INTO przyjete_przeniesienia VALUES (?, ?)',
+                            (z_shardu, przeniesienie_id)).rowcount:
+                conn.execute('UPDATE produkty SET stan_magazynowy = stan_magazynowy + ? WHERE id = ?',
+                             (ilosc, produkt_id))
+        with self.shards[z_shardu].connection() as conn:
+            conn.execute('DELETE FROM przeniesienia_stanu WHERE id = ?', (przeniesienie_id,))
+
+    def _dokoncz_przeniesienia(self):
+        """
+        Dokańcza przeniesienia stanu zapisane w dziennikach shardów, ale jeszcze nieprzyjęte,
+        np. po przerwaniu procesu między zdjęciem stanu a jego dodaniem.
+        """
+        for z_shardu, sklep in enumerate(self.shards):
+            with sklep.connection() as conn:
+                zalegle = conn.execute('SELECT id, produkt_id, ilosc, do_shardu FROM przeniesienia_stanu').fetchall()
+            for przeniesienie_id, produkt_id, ilosc, do_shardu in zalegle:
+                self._przyjmij_przeniesienie(z_shardu, przeniesienie_id, produkt_id, ilosc, do_shardu)
+
+    def stock_level(self, produkt_id):
+        """
+        Zwraca łączny stan magazynowy produktu, czyli sumę części przydzielonych shardom.
+        """
+        stan = 0
+        for sklep in self.shards:
+            with sklep.connection() as conn:
+                wiersz = conn.execute('SELECT stan_magazynowy FROM produkty WHERE id = ?', (produkt_id,)).fetchone()
+            stan += wiersz[0] if wiersz else 0
+        return stan
+
+    def _rozeslij(self, raport, parametry=()):
+        """
+        Wykonuje raport jednocześnie na wszystkich shardach w puli procesów
+        i zwraca listę ich częściowych wyników.
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        liczba = len(self.shards)
+        return list(self._pool.map(_raport_shardu, self.db_paths, [raport] * liczba, [parametry] * liczba))
+
+    def top_customers(self, limit=10):
+        """
+        Zwraca klientów o największej sumie zakupów ze wszystkich shardów jako krotki
+        (klient_id, imie, nazwisko, liczba_platnosci, suma_zakupow). Każdy klient jest
+        w jednym shardzie, więc najlepsi ogółem są wśród najlepszych limit każdego shardu.
+        """
+        wiersze = [wiersz for czesc in self._rozeslij('top_customers', (limit,)) for wiersz in czesc]
+        return sorted(wiersze, key=lambda wiersz: wiersz[4], reverse=True)[:limit]
+
+    def customer_total_spend(self, klient_id):
+        """
+        Zwraca sumę zakupów klienta z jego shardu (wymaga tabel podsumowań).
+        """
+        return self.shards[self.shard_for(klient_id)].customer_total_spend(klient_id)
+
+    def revenue_by_month(self, metoda_platnosci=None):
+        """
+        Zwraca przychody według miesięcy ze wszystkich shardów jako krotki
+        (miesiac, liczba_platnosci, suma_kwot), opcjonalnie dla jednej metody płatności.
+        """
+        return _scal_sumy(self._rozeslij('revenue_by_month', (metoda_platnosci, metoda_platnosci)))
+
+    def revenue_by_payment_method(self):
+        """
+        Zwraca przychody według metody płatności ze wszystkich shardów jako krotki
+        (metoda_platnosci, liczba_platnosci, suma_kwot).
+        """
+        return _scal_sumy(self._rozeslij('revenue_by_payment_method'))
+
+    def close_connection(self):
+        """
+        Zamyka pulę procesów raportów i połączenia wszystkich shardów.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        for sklep in self.shards:
+            sklep.close_connection()
+
+
+class AsyncSklepWedkarskiSQLite:
+    """
+    Asynchroniczna nakładka na SklepWedkarskiSQLite dla aplikacji asyncio.
+    Moduł sqlite3 jest synchroniczny, więc wywołania wykonują się w osobnych wątkach,
+    a pętla zdarzeń tylko czeka na ich wynik:
+    - zapisy (tworzenie tabel, import, składanie zamówień) w jednym dedykowanym wątku,
+      bo SQLite i tak dopuszcza tylko jednego piszącego naraz;
+    - odczyty (raporty, katalog) w puli `readers` wątków, każdy z własnym połączeniem
+      (tryb enable_pool), więc w trybie WAL nie czekają na zapisy.
+
+    Użycie:
+        async with AsyncSklepWedkarskiSQLite('sklepWedkarski.db') as sklep:
+            await sklep.place_order(1, [(3, 2)])
+    """
+    def __init__(self, db_path='sklepWedkarski.db', profile='oltp', readers=4):
+        """
+        :param db_path: Ścieżka do pliku bazy danych.
+        :param profile: Profil połączenia z PROFILE_POLACZENIA (musi używać trybu WAL).
+        :param readers: Liczba wątków wykonujących odczyty.
+        """
+        self.db_path = db_path
+        self.profile = profile
+        self._zapis = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-zapis')
+        self._odczyt = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='sqlite-odczyt')
+        self.sklep = None
+
+    async def _zapisz(self, metoda, *args, **kwargs):
+        """
+        Wykonuje metodę SklepWedkarskiSQLite w wątku zapisów.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._zapis, partial(metoda, *args, **kwargs))
+
+    async def _odczytaj(self, metoda, *args, **kwargs):
+        """
+        Wykonuje metodę SklepWedkarskiSQLite w jednym z wątków odczytów.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._odczyt, partial(metoda, *args, **kwargs))
+
+    async def open(self):
+        """
+        Otwiera bazę danych. Połączenie self.sklep.conn powstaje w wątku zapisów i tylko tam jest używane.
+        """
+        def otworz():
+            sklep = SklepWedkarskiSQLite(self.db_path, self.profile)
+            sklep.enable_pool(self.profile)
+            return sklep
+        self.sklep = await asyncio.get_running_loop().run_in_executor(self._zapis, otworz)
+
+    async def close(self):
+        """
+        Zamyka połączenia i wątki.
+        """
+        if self.sklep is not None:
+            await self._zapisz(self.sklep.close_connection)
+            self.sklep = None
+        self._zapis.shutdown()
+        self._odczyt.shutdown()
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def create_tables(self):
+        """
+        Tworzy tabele (zob. SklepWedkarskiSQLite.create_tables).
+        """
+        await self._zapisz(self.sklep.create_tables)
+
+    async def create_indexes(self):
+        """
+        Tworzy indeksy pomocnicze z INDEKSY.
+        """
+        await self._zapisz(self.sklep.create_indexes)
+
+    async def create_summary_tables(self):
+        """
+        Tworzy tabele podsumowań i ich wyzwalacze.
+        """
+        await self._zapisz(self.sklep.create_summary_tables)
+
+    async def import_chunks(self, chunks, batch_size=50_000):
+        """
+        Importuje paczki (nazwa_tabeli, DataFrame), np. z generate_scaled_data (zob. SklepWedkarskiSQLite.import_chunks).
+        """
+        return await self._zapisz(self.sklep.import_chunks, chunks, batch_size)
+
+    async def import_from_json_stream(self, filename, batch_size=10_000, progress_callback=None):
+        """
+        Importuje dane z pliku JSON strumieniowo (zob. SklepWedkarskiSQLite.import_from_json_stream).
+        progress_callback jest wywoływany w wątku zapisów.
+        """
+        return await self._zapisz(self.sklep.import_from_json_stream, filename, batch_size, progress_callback)
+
+    async def place_order(self, klient_id, pozycje, metoda_platnosci='karta'):
+        """
+        Składa zamówienie klienta (zob. SklepWedkarskiSQLite.place_order).
+        """
+        return await self._zapisz(self.sklep.place_order, klient_id, pozycje, metoda_platnosci)
+
+    async def top_customers(self, limit=10):
+        """
+        Zwraca klientów o największej sumie zakupów.
+        """
+        return await self._odczytaj(self.sklep.top_customers, limit)
+
+    async def customer_total_spend(self, klient_id):
+        """
+        Zwraca sumę zakupów klienta.
+        """
+        return await self._odczytaj(self.sklep.customer_total_spend, klient_id)
+
+    async def revenue_by_month(self, metoda_platnosci=None):
+        """
+        Zwraca przychody według miesięcy.
+        """
+        return await self._odczytaj(self.sklep.revenue_by_month, metoda_platnosci)
+
+    async def revenue_by_payment_method(self):
+        """
+        Zwraca przychody według metody płatności.
+        """
+        return await self._odczytaj(self.sklep.revenue_by_payment_method)
+
+    async def get_product(self, produkt_id):
+        """
+        Zwraca produkt jako słownik (przez pamięć podręczną katalogu, jeśli jest włączona).
+        """
+        return await self._odczytaj(self.sklep.get_product, produkt_id)
+
+
+async def _wykonaj_obciazenie(sklep, zadania, operacje, liczba_klientow, liczba_produktow, seed):
+    """
+    Rozdziela operacje między podaną liczbę współbieżnych zadań; każde zadanie
+    na przemian składa zamówienie i odczytuje sumę zakupów klienta.
+    Zwraca liczbę operacji na sekundę.
+    """
+    async def zadanie(nr, liczba):
+        rng = random.Random(seed + nr)
+        for i in range(liczba):
+            if i % 2 == 0:
+                await sklep.place_order(rng.randint(1, liczba_klientow),
+                                        [(rng.randint(1, liczba_produktow), rng.randint(1, 3))])
+            else:
+                await sklep.customer_total_spend(rng.randint(1, liczba_klientow))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(zadanie(nr, operacje // zadania + (nr < operacje % zadania)) for nr in range(zadania)))
+    return operacje / (time.perf_counter() - start)
+
+
+def benchmark_async_concurrency(concurrency=(1, 16, 128), operations=4000, num_orders=100_000, readers=4,
+                                db_path='benchmark_async.db', seed=42):
+    """
+    Mierzy przepustowość AsyncSklepWedkarskiSQLite (operacje na sekundę) dla kolejnych
+    liczb współbieżnych zadań. Połowa operacji składa zamówienie, połowa odczytuje raport klienta.
+    Zwraca słownik {liczba zadań: operacje na sekundę}.
+    """
+    for sciezka in (db_path, db_path + '-wal', db_path + '-shm'):
+        if os.path.exists(sciezka):
+            os.remove(sciezka)
+
+    async def uruchom():
+        wyniki = {}
+        async with AsyncSklepWedkarskiSQLite(db_path, readers=readers) as sklep:
+            await sklep.create_tables()
+            await sklep.import_chunks(sklep.sklep.generate_scaled_data(num_orders=num_orders, seed=seed))
+            await sklep.create_indexes()
+            await sklep.create_summary_tables()
+            def policz():
+                with sklep.sklep.connection() as conn:
+                    return conn.execute('SELECT (SELECT MAX(id) FROM klienci), (SELECT MAX(id) FROM produkty)').fetchone()
+            liczba_klientow, liczba_produktow = await sklep._odczytaj(policz)
+            for zadania in concurrency:
+                wyniki[zadania] = await _wykonaj_obciazenie(sklep, zadania, operations, liczba_klientow, liczba_produktow, seed)
+                print(f"Współbieżne zadania: {zadania}, {wyniki[zadania]:.0f} operacji/s")
+        return wyniki
+
+    return asyncio.run(uruchom())
+
+
+def benchmark_order_contention(threads=16, orders=4000, hot_products=2, max_batch=100, num_orders=10_000,
+                               db_path='benchmark_zamowienia.db', seed=42):
+    """
+    Test rywalizacji przy składaniu zamówień: wątki składają jednopozycyjne zamówienia
+    tylko na hot_products produktów, najpierw każde we własnej transakcji (place_order),
+    a potem przez GrupowyZapisZamowien. Sprawdza, czy ubytek stanu magazynowego
+    zgadza się z zamówionymi ilościami.
+    Zwraca słownik {tryb: zamówienia na sekundę}.
+    """
+    for sciezka in (db_path, db_path + '-wal', db_path + '-shm'):
+        if os.path.exists(sciezka):
+            os.remove(sciezka)
+    stan = 10_000_000
+    sklep = SklepWedkarskiSQLite(db_path, profile='oltp')
+    sklep.create_tables()
+    sklep.import_chunks(sklep.generate_scaled_data(num_orders=num_orders, seed=seed))
+    with sklep.conn:
+        sklep.conn.execute('UPDATE produkty SET stan_magazynowy = ?', (stan,))
+    liczba_klientow = sklep.conn.execute('SELECT MAX(id) FROM klienci').fetchone()[0]
+    sklep.enable_pool('oltp', busy_timeout=30.0)
+    zapis = GrupowyZapisZamowien(sklep, max_batch=max_batch)
+
+    def uruchom(place_order):
+        def watek(nr):
+            rng = random.Random(seed + nr)
+            zamowiono = 0
+            for _ in range(orders // threads):
+                ilosc = rng.randint(1, 3)
+                place_order(rng.randint(1, liczba_klientow), [(rng.randint(1, hot_products), ilosc)])
+                zamowiono += ilosc
+            return zamowiono
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            zamowiono = sum(executor.map(watek, range(threads)))
+        return (orders // threads) * threads / (time.perf_counter() - start), zamowiono
+
+    wyniki = {}
+    razem = 0
+    for tryb, place_order in (('place_order', sklep.place_order), ('group_commit', zapis.place_order)):
+        wyniki[tryb], zamowiono = uruchom(place_order)
+        razem += zamowiono
+        zarezerwowano = sklep.conn.execute('SELECT SUM(? - stan_magazynowy) FROM produkty', (stan,)).fetchone()[0]
+        print(f"{tryb}: {wyniki[tryb]:.0f} zamówień/s ({threads} wątków, {hot_products} produkty), "
+              f"stan magazynowy {'zgodny' if zarezerwowano == razem else 'NIEZGODNY'}")
+    print(f"Zapis grupowy: {zapis.zamowienia} zamówień w {zapis.paczki} transakcjach.")
+    zapis.close()
+    sklep.close_connection()
+    return wyniki
+
+
+def benchmark_load_profiles(num_orders=1_000_000, profiles=(None, 'bulk_load', 'oltp'), filename='dane_benchmark.json'):
+    """
+    Mierzy czas importu wygenerowanego zbioru danych (import_from_json_stream)
+    dla kolejnych profili połączenia; każdy pomiar startuje od pustej bazy z indeksami,
+    więc czas profilu bulk_load obejmuje ich usunięcie i odbudowę po imporcie.
+    Zwraca słownik {profil: czas w sekundach}.
+    """
+    generator = SklepWedkarskiSQLite(':memory:')
+    generator.export_chunks_to_json(generator.generate_scaled_data(num_orders=num_orders), filename)
+    generator.close_connection()
+    wyniki = {}
+    for profile in profiles:
+        db_path = f'benchmark_{profile or "default"}.db'
+        for sciezka in (db_path, db_path + '-wal', db_path + '-shm'):
+            if os.path.exists(sciezka):
+                os.remove(sciezka)
+        sklep = SklepWedkarskiSQLite(db_path, profile)
+        sklep.create_tables()
+        sklep.create_indexes()
+        start = time.perf_counter()
+        sklep.import_from_json_stream(filename)
+        wyniki[profile] = time.perf_counter() - start
+        sklep.close_connection()
+        print(f"Profil {profile or 'domyślny'}: {wyniki[profile]:.2f} s dla {num_orders} zamówień")
+    return wyniki
+
+
+def benchmark_product_search(num_products=1_000_000, repetitions=20, db_path='benchmark_wyszukiwanie.db', seed=42):
+    """
+    Porównuje wyszukiwanie produktów przez LIKE (pełny skan tabeli) z indeksem FTS5
+    (search_products, search_products_by_prefix) na katalogu num_products produktów.
+    Dla każdej pary podaje medianę czasu i liczbę znalezionych wierszy - LIKE nie
+    znajduje wariantów bez polskich znaków.
+    Zwraca słownik {nazwa: {'like_ms', 'like_rows', 'search_ms', 'search_rows'}}.
+    """
+    for sciezka in (db_path, db_path + '-wal', db_path + '-shm'):
+        if os.path.exists(sciezka):
+            os.remove(sciezka)
+    sklep = SklepWedkarskiSQLite(db_path, profile='bulk_load')
+    sklep.create_tables()
+    sklep.create_indexes()
+    # Tylko kategorie i produkty - generator nie musi tworzyć klientów ani zamówień
+    sklep.import_chunks(takewhile(lambda paczka: paczka[0] in ('kategorie', 'produkty'),
+                                  sklep.generate_scaled_data(num_orders=num_products, seed=seed, orders_per_product=1)))
+    start = time.perf_counter()
+    sklep.create_search_index()
+    print(f"Indeks wyszukiwania utworzony w {time.perf_counter() - start:.2f} s.")
+    sklep.conn.execute('ANALYZE')
+    sklep.set_profile('read_only_analytics')
+    kolumny = 'id, nazwa, opis, cena, stan_magazynowy, kategoria_id'
+    przypadki = {
+        'slowo_w_nazwie_lub_opisie': (
+            f"SELECT {kolumny} FROM produkty WHERE nazwa LIKE ? OR opis LIKE ? LIMIT 20", ('%kołowrotek%',) * 2,
+            lambda: sklep.search_products('kołowrotek')),
+        'bez_polskich_znakow': (
+            f"SELECT {kolumny} FROM produkty WHERE nazwa LIKE ? OR opis LIKE ? LIMIT 20", ('%zylka%',) * 2,
+            lambda: sklep.search_products('zylka')),
+        'dwa_slowa_selektywne': (
+            f"SELECT {kolumny} FROM produkty WHERE nazwa LIKE ? AND nazwa LIKE ? LIMIT 20", ('%Żyłka%', '%#4242%'),
+            lambda: sklep.search_products('żyłka 4242')),
+        'prefiks_nazwy': (
+            f"SELECT {kolumny} FROM produkty WHERE nazwa LIKE ? LIMIT 20", ('Koł%',),
+            lambda: sklep.search_products_by_prefix('koł')),
+    }
+
+    def zmierz(funkcja):
+        funkcja() # rozgrzewka
+        czasy = []
+        for _ in range(repetitions):
+            start = time.perf_counter()
+            wynik = funkcja()
+            czasy.append((time.perf_counter() - start) * 1000)
+        return float(np.median(czasy)), len(wynik)
+
+    wyniki = {}
+    for nazwa, (sql, params, wyszukaj) in przypadki.items():
+        like_ms, like_wiersze = zmierz(lambda: sklep.conn.execute(sql, params).fetchall())
+        search_ms, search_wiersze = zmierz(wyszukaj)
+        wyniki[nazwa] = {'like_ms': like_ms, 'like_rows': like_wiersze,
+                         'search_ms': search_ms, 'search_rows': search_wiersze}
+        print(f"{nazwa:<28} LIKE {like_ms:8.2f} ms ({like_wiersze} wierszy)   "
+              f"indeks {search_ms:8.2f} ms ({search_wiersze} wierszy)")
+    sklep.close_connection()
+    return wyniki
+
+
+def benchmark_sharding(num_shards=4, threads=16, orders=4000, num_orders=1_000_000, repetitions=5,
+                       db_path='benchmark_shardy.db', seed=42):
+    """
+    Porównuje jedną bazę z trybem shardowanym (SklepWedkarskiSQLiteShardowany) na tych samych
+    danych: przepustowość zamówień składanych z threads wątków (place_order) oraz medianę
+    czasu raportów liczonych wprost z tabel - w jednej bazie zwykłym zapytaniem, w shardach
+    równolegle w puli procesów ze scaleniem wyników. Sprawdza, czy wyniki raportów są zgodne.
+    Zwraca słownik {pomiar: {'single': ..., 'sharded': ...}}.
+    """
+    rdzen, rozszerzenie = os.path.splitext(db_path)
+    for sciezka in [db_path] + [f'{rdzen}_shard{numer}{rozszerzenie}' for numer in range(num_shards)]:
+        for plik in (sciezka, sciezka + '-wal', sciezka + '-shm'):
+            if os.path.exists(plik):
+                os.remove(plik)
+    zbior = SklepWedkarskiSQLite(':memory:').generate_dataset(num_orders=num_orders, seed=seed)
+    stan = 10_000_000
+    pojedyncza = SklepWedkarskiSQLite(db_path, profile='oltp')
+    pojedyncza.create_tables()
+    pojedyncza.create_indexes()
+    pojedyncza.import_chunks(zbior)
+    with pojedyncza.conn:
+        pojedyncza.conn.execute('UPDATE produkty SET stan_magazynowy = ?', (stan,))
+    shardy = SklepWedkarskiSQLiteShardowany(db_path, num_shards, profile='oltp')
+    shardy.create_tables()
+    shardy.create_indexes()
+    shardy.import_chunks(zbior)
+    for sklep in shardy.shards:
+        with sklep.conn:
+            sklep.conn.execute('UPDATE produkty SET stan_magazynowy = ?', (stan // num_shards,))
+    liczba_klientow = pojedyncza.conn.execute('SELECT MAX(id) FROM klienci').fetchone()[0]
+    liczba_produktow = pojedyncza.conn.execute('SELECT MAX(id) FROM produkty').fetchone()[0]
+
+    def raporty_pojedynczej():
+        return {raport: pojedyncza.conn.execute(ZAPYTANIA_RAPORTOW_Z_TABEL[raport], parametry).fetchall()
+                for raport, parametry in (('top_customers', (10,)), ('revenue_by_month', (None, None)),
+                                          ('revenue_by_payment_method', ()))}
+
+    def raporty_shardow():
+        return {'top_customers': shardy.top_customers(10), 'revenue_by_month': shardy.revenue_by_month(),
+                'revenue_by_payment_method': shardy.revenue_by_payment_method()}
+
+    def zmierz(funkcja):
+        wynik = funkcja()
+        czasy = []
+        for _ in range(repetitions):
+            start = time.perf_counter()
+            funkcja()
+            czasy.append((time.perf_counter() - start) * 1000)
+        return float(np.median(czasy)), wynik
+
+    def zgodne(a, b):
+        return len(a) == len(b) and all(
+            x[:-1] == y[:-1] and abs(x[-1] - y[-1]) <= 1e-6 * max(1.0, abs(x[-1])) for x, y in zip(a, b))
+
+    wyniki = {'reports_ms': {}}
+    pojedyncza_ms, oczekiwane = zmierz(raporty_pojedynczej)
+    shardy_ms, otrzymane = zmierz(raporty_shardow)
+    wyniki['reports_ms'] = {'single': pojedyncza_ms, 'sharded': shardy_ms}
+    print(f"Raporty: jedna baza {pojedyncza_ms:.1f} ms, {num_shards} shardy {shardy_ms:.1f} ms, wyniki "
+          f"{'zgodne' if all(zgodne(oczekiwane[r], otrzymane[r]) for r in oczekiwane) else 'NIEZGODNE'}")
+
+    def przepustowosc(sklep):
+        def watek(nr):
+            rng = random.Random(seed + nr)
+            for _ in range(orders // threads):
+                sklep.place_order(rng.randint(1, liczba_klientow), [(rng.randint(1, liczba_produktow), 1)])
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(watek, range(threads)))
+        return (orders // threads) * threads / (time.perf_counter() - start)
+
+    pojedyncza.enable_pool('oltp', busy_timeout=30.0)
+    shardy.enable_pool('oltp', busy_timeout=30.0)
+    wyniki['orders_per_s'] = {'single': przepustowosc(pojedyncza), 'sharded': przepustowosc(shardy)}
+    print(f"Zamówienia: jedna baza {wyniki['orders_per_s']['single']:.0f}/s, "
+          f"{num_shards} shardy {wyniki['orders_per_s']['sharded']:.0f}/s ({threads} wątków)")
+    pojedyncza.close_connection()
+    shardy.close_connection()
+    return wyniki
+
+
+def benchmark_snapshot_restore(num_orders=1_000_000, db_path='benchmark_kopia.db', seed=42):
+    """
+    Porównuje odtworzenie bazy przez ponowne wygenerowanie i import danych (create_tables
+    + import_chunks w profilu 'bulk_load') z kopią zapasową: snapshot, restore do pliku
+    i restore do bazy w pamięci. Sprawdza, czy odtworzone bazy mają tyle samo wierszy.
+    Zwraca słownik {pomiar: czas w sekundach}.
+    """
+    sciezka_kopii = db_path.replace('.db', '_snapshot.db')
+    for sciezka in (db_path, sciezka_kopii):
+        for plik in (sciezka, sciezka + '-wal', sciezka + '-shm'):
+            if os.path.exists(plik):
+                os.remove(plik)
+    wyniki = {}
+    sklep = SklepWedkarskiSQLite(db_path, profile='bulk_load')
+    start = time.perf_counter()
+    sklep.create_tables()
+    sklep.create_indexes()
+    sklep.import_chunks(sklep.generate_scaled_data(num_orders=num_orders, seed=seed))
+    wyniki['reload'] = time.perf_counter() - start
+    sklep.set_profile('oltp')
+
+    def liczby_wierszy():
+        return [sklep.conn.execute(f'SELECT COUNT(*) FROM {tabela}').fetchone()[0] for tabela in KOLUMNY_TABEL]
+
+    oczekiwane = liczby_wierszy()
+    for pomiar, wykonaj in (('snapshot', lambda: sklep.snapshot(sciezka_kopii)),
+                            ('restore', lambda: sklep.restore(sciezka_kopii)),
+                            ('restore_in_memory', lambda: sklep.restore(sciezka_kopii, in_memory=True))):
+        start = time.perf_counter()
+        wykonaj()
+        wyniki[pomiar] = time.perf_counter() - start
+    zgodne = liczby_wierszy() == oczekiwane
+    sklep.close_connection()
+    for pomiar, sekundy in wyniki.items():
+        print(f"{pomiar}: {sekundy:.2f} s")
+    print(f"Liczby wierszy po odtworzeniu {'zgodne' if zgodne else 'NIEZGODNE'} ({num_orders} zamówień).")
+    return wyniki
+
 
 if __name__ == "__main__":
     sklep = SklepWedkarskiSQLite()
@@ -262,11 +3502,13 @@ if __name__ == "__main__":
     # Tworzenie tabel
     print("Tworzenie tabel...")
     sklep.create_tables()
+    sklep.create_indexes()
     
     # Generowanie i eksport danych
     print("Generowanie i eksport danych...")
     kategorie, produkty, klienci = sklep.generate_test_data()
-    sklep.export_to_json(kategorie, produkty, klienci)
+    zamowienia, platnosci = sklep.generate_test_orders(len(klienci))
+    sklep.export_to_json(kategorie, produkty, klienci, zamowienia, platnosci)
     
     # Import danych
     print("Importowanie danych...")
@@ -0,0 +1,51 @@
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_backend(name):
+    """
+    Loads sqlite/lib.py or postgresql/lib.py under its own module name. The module is
+    registered in sys.modules so that its functions can be pickled for process pools.
+    """
+    spec = importlib.util.spec_from_file_location(f'{name}_lib', os.path.join(BASE_DIR, name, 'lib.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope='session')
+def sqlite_lib():
+    return load_backend('sqlite')
+
+
+@pytest.fixture(scope='session')
+def pg_lib():
+    pytest.importorskip('psycopg')
+    return load_backend('postgresql')
+
+
+@pytest.fixture
+def pg_shop(pg_lib):
+    """
+    A SklepWedkarskiPostgreSQL connected to the database from the credentials file named by
+    SKLEP_TEST_PG_CREDS (same format as database_creds.json). The tests empty its tables,
+    so it must point to a scratch database; without it the PostgreSQL tests are skipped.
+    """
+    path = os.environ.get('SKLEP_TEST_PG_CREDS')
+    if not path:
+        pytest.skip("SKLEP_TEST_PG_CREDS is not set.")
+    with open(path) as db_con_file:
+        creds = json.loads(db_con_file.read())
+    sklep = pg_lib.SklepWedkarskiPostgreSQL(creds)
+    if sklep.conn is None:
+        pytest.skip("Cannot connect to the PostgreSQL test database.")
+    sklep.create_tables()
+    yield sklep
+    sklep.close_connection()
@@ -0,0 +1,136 @@
+import gzip
+
+import pandas as pd
+
+
+def rows_of(df):
+    return df.astype(object).where(df.notna(), None).values.tolist()
+
+
+def table_rows(sklep, table_columns):
+    with sklep.connection() as conn:
+        return {table: conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id").fetchall()
+                for table, columns in table_columns.items()}
+
+
+def test_generate_scaled_data_is_repeatable(pg_shop):
+    chunks = list(pg_shop.generate_scaled_data(num_orders=250, seed=7, chunk_size=40))
+    repeated = list(pg_shop.generate_scaled_data(num_orders=250, seed=7, chunk_size=40))
+
+    assert [table for table, _ in chunks] == [table for table, _ in repeated]
+    for (_, df), (_, repeated_df) in zip(chunks, repeated):
+        pd.testing.assert_frame_equal(df, repeated_df)
+    assert all(len(df) <= 40 for _, df in chunks)
+
+    customer_ids = pd.concat([df['id'] for table, df in chunks if table == 'klienci'])
+    orders = pd.concat([df for table, df in chunks if table == 'zamowienia'])
+    assert len(orders) == 250
+    assert orders['klient_id'].isin(customer_ids).all()
+
+
+def test_split_csv_writer_cuts_files_at_line_ends(pg_lib, tmp_path):
+    lines = [f'{i},{"x" * (i % 17)}\n'.encode() for i in range(500)]
+    data = b''.join(lines)
+    writer = pg_lib.SplitCsvWriter(str(tmp_path), 'tabela', ['id', 'tekst'], max_file_size=256)
+    # Blocks of 13 bytes end in the middle of lines
+    for start in range(0, len(data), 13):
+        writer.write(data[start:start + 13])
+    files = writer.close()
+
+    assert len(files) > 1
+    read = b''
+    for file in files:
+        content = (tmp_path / file['file']).read_bytes()
+        assert content.startswith(b'id,tekst\n')
+        assert len(content) == file['bytes'] <= 256
+        assert content.count(b'\n') - 1 == file['rows']
+        read += content[len(b'id,tekst\n'):]
+    assert read == data
+
+
+def test_split_csv_writer_ends_an_unfinished_last_line(pg_lib, tmp_path):
+    writer = pg_lib.SplitCsvWriter(str(tmp_path), 'tabela', ['id'])
+    writer.write(b'1\n2')
+    files = writer.close()
+    assert (tmp_path / files[0]['file']).read_bytes() == b'id\n1\n2\n'
+    assert files[0]['rows'] == 2
+
+
+def test_split_csv_writer_keeps_an_overlong_line_split_across_blocks_whole(pg_lib, tmp_path):
+    writer = pg_lib.SplitCsvWriter(str(tmp_path), 'tabela', ['id'], compression='gzip', max_file_size=16)
+    data = b'1\n' + b'2' * 40 + b'\n3\n'
+    for start in range(0, len(data), 5):
+        writer.write(data[start:start + 5])
+    files = writer.close()
+
+    assert [file['file'] for file in files] == ['tabela.0000.csv.gz', 'tabela.0001.csv.gz', 'tabela.0002.csv.gz']
+    assert [file['rows'] for file in files] == [1, 1, 1]
+    assert gzip.decompress((tmp_path / files[1]['file']).read_bytes()) == b'id\n' + b'2' * 40 + b'\n'
+
+
+def test_fold_search_text(pg_lib):
+    assert pg_lib.fold_search_text('Żyłka ŁOSOSIOWA świecąca') == 'zylka lososiowa swiecaca'
+
+
+def test_columnar_dataset_round_trip(pg_lib):
+    products = pd.DataFrame({
+        'id': [1, 2, 3], 'nazwa': ['Żyłka', 'Kołowrotek', 'Spławik'], 'opis': ['mocna', None, ''],
+        'cena': [12.5, 0.1, 1999.99], 'stan_magazynowy': [3, 0, 7], 'kategoria_id': [1, 1, 2]})
+    payments = pd.DataFrame({
+        'id': [1, 2, 3], 'zamowienie_id': [1, 2, 3], 'kwota': [1.0, 2.25, 3.5],
+        'metoda_platnosci': ['karta', 'przelew', None], 'data_platnosci': ['2024-01-01', '2024-02-29', None]})
+    dataset = pg_lib.ColumnarDataset.from_chunks([('produkty', products), ('platnosci', payments)], batch_size=2)
+
+    read = {}
+    for table, df in dataset:
+        assert len(df) <= 2
+        read.setdefault(table, []).extend(rows_of(df))
+    assert read == {'produkty': rows_of(products), 'platnosci': rows_of(payments)}
+    assert len(dataset) == 6
+
+
+def test_sync_chunks_is_idempotent(pg_lib, pg_shop):
+    chunks = list(pg_shop.generate_scaled_data(num_orders=300, chunk_size=100))
+    pg_shop.import_binary(chunks)
+    before = table_rows(pg_shop, pg_lib.TABLE_COLUMNS)
+
+    stats = pg_shop.sync_chunks(chunks)
+
+    assert all(s == {'inserted': 0, 'updated': 0, 'deleted': 0} for s in stats.values())
+    assert table_rows(pg_shop, pg_lib.TABLE_COLUMNS) == before
+
+    products = [(table, df.copy()) for table, df in chunks if table == 'produkty']
+    products[0][1].loc[0, 'cena'] += 1
+    assert pg_shop.sync_chunks(products)['produkty'] == {'inserted': 0, 'updated': 1, 'deleted': 0}
+    assert pg_shop.sync_chunks(products)['produkty'] == {'inserted': 0, 'updated': 0, 'deleted': 0}
+
+
+def test_search_folds_polish_diacritics(pg_shop):
+    pg_shop.import_binary([
+        ('kategorie', [{'id': 1, 'nazwa': 'Żyłki', 'opis': ''}]),
+        ('produkty', [
+            {'id': 1, 'nazwa': 'Żyłka Łososiowa', 'opis': 'mocna', 'cena': 10, 'stan_magazynowy': 1, 'kategoria_id': 1},
+            {'id': 2, 'nazwa': 'Kołowrotek', 'opis': 'z hamulcem', 'cena': 10, 'stan_magazynowy': 1, 'kategoria_id': 1},
+            {'id': 3, 'nazwa': 'Spławik', 'opis': 'lekki, świecący', 'cena': 10, 'stan_magazynowy': 1, 'kategoria_id': 1},
+        ]),
+    ])
+    pg_shop.create_search_index()
+
+    assert [row[0] for row in pg_shop.search_products('zylka')][:1] == [1]
+    assert [row[0] for row in pg_shop.search_products('ŻYŁKA łososiowa')][:1] == [1]
+    assert [row[0] for row in pg_shop.search_products('swiecacy')][:1] == [3]
+    assert [row[0] for row in pg_shop.search_products_by_prefix('kolow')] == [2]
+
+
+def test_snapshot_restore_round_trip(pg_lib, pg_shop, tmp_path):
+    pg_shop.import_binary(pg_shop.generate_scaled_data(num_orders=500))
+    before = table_rows(pg_shop, pg_lib.TABLE_COLUMNS)
+    directory = str(tmp_path / 'snapshot')
+    pg_shop.snapshot(directory, workers=2, part_rows=100)
+
+    with pg_shop.connection() as conn:
+        conn.execute('DELETE FROM platnosci')
+        conn.execute("UPDATE produkty SET nazwa = 'zmieniona'")
+    pg_shop.restore(directory, workers=2)
+
+    assert table_rows(pg_shop, pg_lib.TABLE_COLUMNS) == before
@@ -0,0 +1,230 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def sklep(sqlite_lib):
+    sklep = sqlite_lib.SklepWedkarskiSQLite(':memory:')
+    sklep.create_tables()
+    yield sklep
+    sklep.close_connection()
+
+
+def table_rows(conn, kolumny_tabel):
+    return {tabela: [tuple(wiersz) for wiersz in conn.execute(f'SELECT * FROM {tabela} ORDER BY id')]
+            for tabela in kolumny_tabel}
+
+
+def test_generate_scaled_data_is_repeatable(sklep):
+    paczki = list(sklep.generate_scaled_data(num_orders=250, seed=7, chunk_size=40))
+    powtorzone = list(sklep.generate_scaled_data(num_orders=250, seed=7, chunk_size=40))
+
+    assert [tabela for tabela, _ in paczki] == [tabela for tabela, _ in powtorzone]
+    for (_, df), (_, df_powtorzone) in zip(paczki, powtorzone):
+        pd.testing.assert_frame_equal(df, df_powtorzone)
+    assert all(len(df) <= 40 for _, df in paczki)
+
+    tabele = {tabela: pd.concat([df for t, df in paczki if t == tabela], ignore_index=True)
+              for tabela, _ in paczki}
+    assert len(tabele['zamowienia']) == len(tabele['platnosci']) == 250
+    assert tabele['zamowienia']['klient_id'].isin(tabele['klienci']['id']).all()
+    assert tabele['platnosci']['zamowienie_id'].isin(tabele['zamowienia']['id']).all()
+    assert tabele['produkty']['kategoria_id'].isin(tabele['kategorie']['id']).all()
+
+
+def test_iter_json_tables_matches_json_load(sqlite_lib, tmp_path):
+    dane = {
+        'kategorie': [{'id': i, 'nazwa': f'Kategoria {i} "ż" {{}} [,]', 'opis': 'a\\b\nc'} for i in range(1, 6)],
+        'puste': [],
+        'klienci': [{'id': 1, 'imie': 'Łucja', 'email': None, 'zagniezdzone': {'lista': [1, [2, 3]]}}],
+    }
+    plik = tmp_path / 'dane.json'
+    plik.write_text(json.dumps(dane, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    # A tiny buffer puts block boundaries inside strings, escapes and nested values
+    paczki = list(sqlite_lib.iter_json_tables(str(plik), batch_size=2, buffer_size=7))
+
+    assert all(0 < len(rekordy) <= 2 for _, rekordy in paczki)
+    odczytane = {}
+    for tabela, rekordy in paczki:
+        odczytane.setdefault(tabela, []).extend(rekordy)
+    assert odczytane == {tabela: rekordy for tabela, rekordy in dane.items() if rekordy}
+
+
+def test_iter_json_tables_rejects_invalid_json(sqlite_lib, tmp_path):
+    plik = tmp_path / 'dane.json'
+    plik.write_text('{"kategorie": [{"id": 1}', encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(sqlite_lib.iter_json_tables(str(plik), buffer_size=4))
+
+
+def test_sync_chunks_is_idempotent(sqlite_lib, sklep):
+    paczki = list(sklep.generate_scaled_data(num_orders=300, chunk_size=100))
+    sklep.import_chunks(paczki)
+    przed = table_rows(sklep.conn, sqlite_lib.KOLUMNY_TABEL)
+
+    statystyki = sklep.sync_chunks(paczki)
+
+    assert all(s == {'inserted': 0, 'updated': 0, 'deleted': 0} for s in statystyki.values())
+    assert table_rows(sklep.conn, sqlite_lib.KOLUMNY_TABEL) == przed
+
+    produkty = [(tabela, df.copy()) for tabela, df in paczki if tabela == 'produkty']
+    produkty[0][1].loc[0, 'cena'] += 1
+    assert sklep.sync_chunks(produkty)['produkty'] == {'inserted': 0, 'updated': 1, 'deleted': 0}
+    assert sklep.sync_chunks(produkty)['produkty'] == {'inserted': 0, 'updated': 0, 'deleted': 0}
+
+
+def test_split_csv_writer_cuts_files_at_line_ends(sqlite_lib, tmp_path):
+    wiersze = [f'{i},{"x" * (i % 17)}\n'.encode() for i in range(500)]
+    zapis = sqlite_lib.PodzielonyPlikCsv(str(tmp_path), 'tabela', ['id', 'tekst'], max_file_size=256)
+    for start in range(0, len(wiersze), 7):
+        zapis.write(b''.join(wiersze[start:start + 7]))
+    pliki = zapis.close()
+
+    assert len(pliki) > 1
+    odczytane = b''
+    for plik in pliki:
+        zawartosc = (tmp_path / plik['file']).read_bytes()
+        assert zawartosc.startswith(b'id,tekst\n')
+        assert len(zawartosc) == plik['bytes'] <= 256
+        assert zawartosc.count(b'\n') - 1 == plik['rows']
+        odczytane += zawartosc[len(b'id,tekst\n'):]
+    assert odczytane == b''.join(wiersze)
+
+
+def test_split_csv_writer_gives_an_overlong_line_its_own_file(sqlite_lib, tmp_path):
+    zapis = sqlite_lib.PodzielonyPlikCsv(str(tmp_path), 'tabela', ['id'], max_file_size=16)
+    zapis.write(b'1\n' + b'2' * 40 + b'\n3\n')
+    pliki = zapis.close()
+    assert [plik['rows'] for plik in pliki] == [1, 1, 1]
+
+
+def test_split_csv_writer_gives_an_empty_table_a_header_only_file(sqlite_lib, tmp_path):
+    pliki = sqlite_lib.PodzielonyPlikCsv(str(tmp_path), 'tabela', ['id', 'tekst']).close()
+    assert [plik['file'] for plik in pliki] == ['tabela.csv']
+    assert (tmp_path / 'tabela.csv').read_bytes() == b'id,tekst\n'
+    assert pliki[0]['rows'] == 0
+
+
+def test_search_folds_polish_diacritics(sklep):
+    sklep.conn.execute("INSERT INTO kategorie (id, nazwa, opis) VALUES (1, 'Żyłki', '')")
+    sklep.conn.executemany(
+        'INSERT INTO produkty (id, nazwa, opis, cena, stan_magazynowy, kategoria_id) VALUES (?, ?, ?, 10, 1, 1)',
+        [(1, 'Żyłka Łososiowa', 'mocna'), (2, 'Kołowrotek', 'z hamulcem'), (3, 'Spławik', 'lekki, świecący')])
+    sklep.conn.commit()
+    sklep.create_search_index()
+
+    assert [w['id'] for w in sklep.search_products('zylka')] == [1]
+    assert [w['id'] for w in sklep.search_products('ŻYŁKA łososiowa')] == [1]
+    assert [w['id'] for w in sklep.search_products('swiecacy')] == [3]
+    assert [w['id'] for w in sklep.search_products_by_prefix('kolow')] == [2]
+    assert sklep.search_products_by_prefix('owrotek') == []
+
+    # The triggers keep the index in sync with changed names
+    sklep.conn.execute("UPDATE produkty SET nazwa = 'Wędka' WHERE id = 2")
+    sklep.conn.commit()
+    assert [w['id'] for w in sklep.search_products('wedka')] == [2]
+    assert sklep.search_products('kolowrotek') == []
+
+
+def test_columnar_dataset_round_trip(sqlite_lib, sklep):
+    paczki = list(sklep.generate_scaled_data(num_orders=200, chunk_size=70))
+    zbior = sqlite_lib.ZbiorKolumnowy.from_chunks(paczki, batch_size=50)
+
+    for tabela in sqlite_lib.KOLUMNY_TABEL:
+        oczekiwane = pd.concat([df for t, df in paczki if t == tabela], ignore_index=True)
+        odczytane = [df for t, df in zbior if t == tabela]
+        assert all(len(df) <= 50 for df in odczytane)
+        assert zbior.num_rows(tabela) == len(oczekiwane)
+        pd.testing.assert_frame_equal(pd.concat(odczytane, ignore_index=True),
+                                      oczekiwane[list(sqlite_lib.KOLUMNY_TABEL[tabela])], check_dtype=False)
+
+
+def test_sharded_ids_are_unique(sqlite_lib, tmp_path):
+    sklep = sqlite_lib.SklepWedkarskiSQLiteShardowany(str(tmp_path / 'sklep.db'), num_shards=3)
+    try:
+        sklep.create_tables()
+        sklep.import_chunks(sklep.shards[0].generate_scaled_data(num_orders=300))
+        produkty = [wiersz[0] for wiersz in sklep.shards[0].conn.execute('SELECT id FROM produkty')]
+        ids = sklep.place_orders([(klient_id, [(produkty[klient_id % len(produkty)], 1)])
+                                  for klient_id in range(1, 31)])
+        ids.append(sklep.place_order(31, [(produkty[0], 1)]))
+
+        zamowienia = [wiersz[0] for shard in sklep.shards for wiersz in shard.conn.execute('SELECT id FROM zamowienia')]
+        platnosci = [wiersz[0] for shard in sklep.shards for wiersz in shard.conn.execute('SELECT id FROM platnosci')]
+        assert len(set(ids)) == len(ids)
+        assert set(ids) <= set(zamowienia)
+        assert len(set(zamowienia)) == len(zamowienia)
+        assert len(set(platnosci)) == len(platnosci)
+    finally:
+        sklep.close_connection()
+
+
+def test_sharded_order_borrows_stock_from_other_shards(sqlite_lib, tmp_path):
+    sklep = sqlite_lib.SklepWedkarskiSQLiteShardowany(str(tmp_path / 'sklep.db'), num_shards=3)
+    try:
+        sklep.create_tables()
+        sklep.import_chunks(sklep.shards[0].generate_scaled_data(num_orders=300))
+        produkt_id = sklep.shards[0].conn.execute('SELECT MIN(id) FROM produkty').fetchone()[0]
+        stan = sklep.stock_level(produkt_id)
+
+        sklep.place_order(1, [(produkt_id, stan)])
+
+        assert sklep.stock_level(produkt_id) == 0
+        with pytest.raises(sqlite_lib.BrakTowaru):
+            sklep.place_order(2, [(produkt_id, 1)])
+    finally:
+        sklep.close_connection()
+
+
+def test_interrupted_stock_transfer_is_completed(sqlite_lib, tmp_path, monkeypatch):
+    sciezka = str(tmp_path / 'sklep.db')
+    sklep = sqlite_lib.SklepWedkarskiSQLiteShardowany(sciezka, num_shards=3)
+    try:
+        sklep.create_tables()
+        sklep.import_chunks(sklep.shards[0].generate_scaled_data(num_orders=300))
+        produkt_id = sklep.shards[0].conn.execute('SELECT MIN(id) FROM produkty').fetchone()[0]
+        stan = sklep.stock_level(produkt_id)
+
+        def przerwij(*args):
+            raise RuntimeError("przerwano")
+        monkeypatch.setattr(sklep, '_przyjmij_przeniesienie', przerwij)
+        with pytest.raises(RuntimeError):
+            sklep.place_order(1, [(produkt_id, stan)])
+        assert sklep.stock_level(produkt_id) < stan
+    finally:
+        sklep.close_connection()
+
+    sklep = sqlite_lib.SklepWedkarskiSQLiteShardowany(sciezka, num_shards=3)
+    try:
+        sklep.create_tables()
+        assert sklep.stock_level(produkt_id) == stan
+    finally:
+        sklep.close_connection()
+
+
+def test_snapshot_restore_round_trip(sqlite_lib, tmp_path):
+    sklep = sqlite_lib.SklepWedkarskiSQLite(str(tmp_path / 'sklep.db'))
+    try:
+        sklep.create_tables()
+        sklep.create_indexes()
+        sklep.import_chunks(sklep.generate_scaled_data(num_orders=500))
+        przed = table_rows(sklep.conn, sqlite_lib.KOLUMNY_TABEL)
+        kopia = str(tmp_path / 'kopia.db')
+        sklep.snapshot(kopia, pages=8)
+
+        sklep.conn.execute('DELETE FROM platnosci')
+        sklep.conn.execute("UPDATE produkty SET nazwa = 'zmieniona'")
+        sklep.conn.commit()
+        sklep.restore(kopia, pages=8)
+        assert table_rows(sklep.conn, sqlite_lib.KOLUMNY_TABEL) == przed
+
+        sklep.restore(kopia, in_memory=True)
+        assert sklep.db_path == ':memory:'
+        assert table_rows(sklep.conn, sqlite_lib.KOLUMNY_TABEL) == przed
+        assert os.path.exists(tmp_path / 'sklep.db')
+    finally:
+        sklep.close_connection()